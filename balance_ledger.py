@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+from file_io import atomic_write_json
+from planner_aggregates import month_key
+from planner_config import MANUAL_MARKERS
+
+
+# --- Libro de Balances Mensuales ---
+# El cierre de cada mes pasa a ser la apertura del siguiente. Un
+# Balance_Inicial cargado a mano en algún día de un mes (marcado con
+# Balance_Inicial_Manual, así 0 también es un valor válido) fija la apertura
+# de ese mes y la cadena sigue desde ahí. Aperturas y cierres de todo el
+# historial se calculan con sumas acumuladas vectorizadas sobre los flujos
+# mensuales (que salen del índice de rangos en una sola resta) y se
+# persisten como instantáneas: el balance de un día es la apertura de su mes
+# más los movimientos desde el inicio del mes, y el gráfico histórico lee
+# las instantáneas sin recalcular nada.
+LEDGER_FILE = 'balance_ledger.json'
+LEDGER_COLUMNS = ['Apertura', 'Ingresos', 'Gastos', 'Cierre', 'Manual']
+
+
+def manual_values(frame_df, column):
+    # Valores de `column` cargados a mano: los marcados y, como en los datos
+    # anteriores a la marca, los distintos de cero
+    values = frame_df[column]
+    manual = values != 0
+    marker = MANUAL_MARKERS.get(column)
+    if marker in frame_df:
+        manual |= frame_df[marker].astype(bool)
+    return values[manual]
+
+
+def monthly_overrides(frame_df, column='Balance_Inicial'):
+    # {mes: último Balance_Inicial cargado a mano en ese mes}
+    values = manual_values(frame_df, column)
+    if values.empty:
+        return {}
+    last = values.groupby(values.index.to_period('M').strftime('%Y-%m')).last()
+    return {month: float(value) for month, value in last.items()}
+
+
+def _type_totals(totals, tipo):
+    columns = [name for name in totals.columns if name.startswith(f"{tipo}:")]
+    return totals[columns].sum(axis=1) if columns else pd.Series(0.0, index=totals.index)
+
+
+class BalanceLedger:
+    def __init__(self, path):
+        self.path = path
+        self.months = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    # --- Persistencia ---
+    def load(self, signature):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                payload = json.load(f)
+        except ValueError:
+            return False
+        if payload.get('signature') != signature:
+            return False
+        self.months = payload.get('months', {})
+        self._signature = signature
+        return True
+
+    def save(self, signature):
+        self._signature = signature
+        atomic_write_json({'signature': signature, 'months': self.months}, self.path)
+
+    # --- Construcción ---
+    def rebuild(self, finance_index, overrides, until):
+        # Un registro por mes, desde el primer mes con movimientos o con un
+        # balance manual hasta el mes de `until` (o el último con movimientos)
+        first = [pd.Period(month, freq='M') for month in overrides]
+        last = [pd.Period(until, freq='M')]
+        covered = finance_index.covered()
+        if covered is not None:
+            first.append(pd.Period(covered[0], freq='M'))
+            last.append(pd.Period(covered[1] - pd.Timedelta(days=1), freq='M'))
+        if not first:
+            self.months = {}
+            return
+        periods = pd.period_range(min(first), max(last), freq='M')
+        boundaries = [period.start_time for period in periods] + [(periods[-1] + 1).start_time]
+        totals = finance_index.totals_between(boundaries)
+        keys = periods.strftime('%Y-%m')
+
+        ingresos = _type_totals(totals, 'Ingreso').to_numpy()
+        gastos = _type_totals(totals, 'Gasto').to_numpy()
+        net = pd.Series(ingresos - gastos, index=keys)
+        manual = pd.Series(overrides, dtype=float).reindex(keys)
+        # Cada balance manual abre un tramo: la apertura es el valor manual más
+        # lo acumulado en el tramo antes de ese mes
+        segment = manual.notna().cumsum()
+        base = manual.ffill().fillna(0.0)
+        opening = base + net.groupby(segment).cumsum() - net
+        closing = opening + net
+
+        self.months = {
+            key: {
+                'Apertura': float(opening[key]), 'Ingresos': float(ingresos[i]), 'Gastos': float(gastos[i]),
+                'Cierre': float(closing[key]), 'Manual': bool(pd.notna(manual[key])),
+            }
+            for i, key in enumerate(keys)
+        }
+
+    def refresh(self, finance_index, overrides, revision, until):
+        # Sólo se recalcula si cambiaron las transacciones, los balances
+        # manuales o el mes en curso
+        signature = [revision, overrides, month_key(until)]
+        with self._lock:
+            if signature == self._signature:
+                return self
+            if not self.load(signature):
+                self.rebuild(finance_index, overrides, until)
+                self.save(signature)
+            return self
+
+    # --- Consultas ---
+    def month(self, day):
+        return self.months.get(month_key(day))
+
+    def balance_at(self, day, finance_index):
+        # Balance al final de `day`: apertura del mes más lo movido hasta ese día
+        month = self.month(day)
+        if month is None:
+            return None
+        start = pd.Timestamp(day).replace(day=1)
+        end = pd.Timestamp(day) + pd.Timedelta(days=1)
+        moved = finance_index.totals(start, end)
+        ingresos = moved[[name for name in moved.index if name.startswith('Ingreso:')]].sum()
+        gastos = moved[[name for name in moved.index if name.startswith('Gasto:')]].sum()
+        return month['Apertura'] + ingresos - gastos
+
+    def history(self):
+        df = pd.DataFrame.from_dict(self.months, orient='index', columns=LEDGER_COLUMNS)
+        return df.sort_index().rename_axis('Mes')
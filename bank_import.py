@@ -0,0 +1,309 @@
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+
+# --- Importación Masiva de Extractos Bancarios ---
+# Los archivos (CSV u OFX) se leen en bloques de IMPORT_CHUNK_ROWS filas. Cada
+# bloque se normaliza a Fecha/Tipo/Categoría/Monto/Descripción de forma
+# vectorizada, se descartan los movimientos ya importados (índice persistente
+# de hashes) y se guarda con un único commit.
+IMPORT_CHUNK_ROWS = 5000
+DEFAULT_CATEGORY = 'Otros'
+
+# Reglas por defecto: expresión regular sobre la descripción -> categoría.
+# Se aplican en orden y gana la primera que coincide (Deudas va antes que
+# Servicios: "Préstamo personal" no es la telefónica). Los patrones se anclan
+# a comienzo de palabra, y las palabras cortas también al final ("gas" no es
+# "Vegas"). Se pueden reemplazar con un archivo JSON {"patrón": "Categoría", ...}.
+DEFAULT_CATEGORY_RULES = {
+    r'\b(?:super|mercado|almac[eé]n|carnicer|verduler|panader)': 'Alimentos',
+    r'\b(?:uber|cabify|taxi|sube|nafta|combustible|peaje|ypf|shell)\b': 'Transporte',
+    r'\b(?:alquiler|expensas|hipoteca)': 'Vivienda',
+    r'\b(?:netflix|spotify|cine|teatro|disney)': 'Entretenimiento',
+    r'\b(?:farmacia|m[eé]dic|cl[ií]nica|osde|swiss medical|odont)': 'Salud',
+    r'\b(?:colegio|universidad|curso|libr[eo]r[ií]a)': 'Educación',
+    r'\b(?:pr[eé]stamo|cuota|tarjeta)': 'Deudas',
+    r'\b(?:luz|edenor|edesur|gas|agua|aysa|internet|tel[eé]fono|movistar|personal|claro)\b': 'Servicios',
+    r'\b(?:zara|ropa|indumentaria|calzado)': 'Ropa',
+    r'\b(?:sueldo|haberes|salario|n[oó]mina)': 'Sueldo',
+    r'\b(?:plazo fijo|inversi[oó]n|fci|broker)': 'Inversión',
+    r'\bregalo': 'Regalos',
+}
+
+
+def load_category_rules(path):
+    # Los patrones se compilan al cargar: uno inválido es un ValueError con
+    # el nombre de la regla, no un re.error en medio de la importación
+    if not (path and os.path.exists(path)):
+        return dict(DEFAULT_CATEGORY_RULES)
+    with open(path, encoding='utf-8') as f:
+        rules = json.load(f)
+    if not isinstance(rules, dict):
+        raise ValueError(f"{path}: las reglas tienen que ser un objeto {{\"patrón\": \"Categoría\"}}.")
+    for pattern, category in rules.items():
+        if not isinstance(category, str):
+            raise ValueError(f"Regla '{pattern}': la categoría tiene que ser un texto.")
+        try:
+            re.compile(pattern, re.IGNORECASE)
+        except re.error as exc:
+            raise ValueError(f"Regla de '{category}': el patrón '{pattern}' no es una expresión regular válida ({exc}).") from exc
+    return rules
+
+
+class ColumnMapping:
+    # Nombres de columna del CSV del banco y cómo interpretar sus valores.
+    # Sin columna de tipo, el signo del monto decide: negativo = Gasto.
+    def __init__(self, fecha='Fecha', monto='Monto', descripcion='Descripción', tipo=None,
+                 categoria=None, date_format=None, dayfirst=True, decimal='.', thousands=None, sep=','):
+        self.fecha = fecha
+        self.monto = monto
+        self.descripcion = descripcion
+        self.tipo = tipo
+        self.categoria = categoria
+        self.date_format = date_format
+        self.dayfirst = dayfirst
+        self.decimal = decimal
+        self.thousands = thousands
+        self.sep = sep
+
+    def source_columns(self):
+        return [col for col in (self.fecha, self.monto, self.descripcion, self.tipo, self.categoria) if col]
+
+
+# --- Índice persistente de movimientos importados ---
+# La versión del formato de hash va en PRAGMA user_version. Los hashes de la
+# versión 1 no incluían el tipo (un reintegro y un gasto del mismo monto el
+# mismo día chocaban): al abrir una base vieja se pasan a una tabla aparte y
+# sólo cuentan como duplicado si la transacción con ese tipo está guardada.
+HASH_VERSION = 2
+
+
+class ImportHashIndex:
+    def __init__(self, db_path):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            with self._conn:
+                (version,), = self._conn.execute('PRAGMA user_version').fetchall()
+                if version < HASH_VERSION and self._table_exists('import_hashes'):
+                    self._conn.execute('ALTER TABLE import_hashes RENAME TO legacy_import_hashes')
+                self._conn.execute('CREATE TABLE IF NOT EXISTS import_hashes (hash TEXT PRIMARY KEY)')
+                self._conn.execute(f'PRAGMA user_version = {HASH_VERSION}')
+            self.has_legacy = self._table_exists('legacy_import_hashes')
+
+    def _table_exists(self, table):
+        # Se llama con el lock tomado
+        return bool(self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchall())
+
+    def existing(self, hashes, batch_size=500, table='import_hashes'):
+        found = set()
+        with self._lock:
+            for i in range(0, len(hashes), batch_size):
+                batch = hashes[i:i + batch_size]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT hash FROM {table} WHERE hash IN ({placeholders})', batch
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def existing_legacy(self, hashes):
+        return self.existing(hashes, table='legacy_import_hashes') if self.has_legacy else set()
+
+    def add(self, hashes):
+        with self._lock:
+            with self._conn:
+                self._conn.executemany('INSERT OR IGNORE INTO import_hashes (hash) VALUES (?)', [(h,) for h in hashes])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _normalize_description(series):
+    return series.fillna('').astype(str).str.strip().str.lower().str.replace(r'\s+', ' ', regex=True)
+
+
+def _base_keys(chunk, with_type=True):
+    keys = chunk['Fecha'].astype(str) + '|'
+    if with_type:
+        keys = keys + chunk['Tipo'] + '|'
+    return keys + chunk['Monto'].map('{:.2f}'.format) + '|' + _normalize_description(chunk['Descripción'])
+
+
+def transaction_hashes(chunk, seen_counts, with_type=True):
+    # Hash de (fecha, tipo, monto, descripción, n). `n` numera los
+    # movimientos idénticos dentro del mismo extracto, así dos cafés iguales
+    # el mismo día no se confunden con un duplicado, pero reimportar el
+    # extracto sí lo es. Sin el tipo es el hash de la versión 1.
+    base_keys = _base_keys(chunk, with_type)
+    hashes = []
+    for key in base_keys:
+        occurrence = seen_counts.get(key, 0)
+        seen_counts[key] = occurrence + 1
+        hashes.append(hashlib.sha1(f"{key}|{occurrence}".encode('utf-8')).hexdigest())
+    return hashes
+
+
+def categorize(descriptions, rules, default=DEFAULT_CATEGORY):
+    categories = pd.Series(default, index=descriptions.index, dtype=object)
+    pending = pd.Series(True, index=descriptions.index)
+    text = descriptions.fillna('').astype(str)
+    for pattern, category in rules.items():
+        matched = pending & text.str.contains(pattern, case=False, regex=True)
+        categories[matched] = category
+        pending &= ~matched
+    return categories
+
+
+def _parse_amounts(series, mapping):
+    text = series.astype(str).str.strip().str.replace(r'[$\s]', '', regex=True)
+    if mapping.thousands:
+        text = text.str.replace(mapping.thousands, '', regex=False)
+    if mapping.decimal != '.':
+        text = text.str.replace(mapping.decimal, '.', regex=False)
+    return pd.to_numeric(text, errors='coerce')
+
+
+def normalize_chunk(raw, mapping, rules):
+    # Lleva un bloque crudo del banco al formato de transacciones del planner
+    missing = [col for col in (mapping.fecha, mapping.monto) if col not in raw]
+    if missing:
+        raise ValueError(f"Faltan columnas en el extracto: {', '.join(missing)}")
+    fechas = pd.to_datetime(raw[mapping.fecha], format=mapping.date_format, dayfirst=mapping.dayfirst, errors='coerce')
+    montos = _parse_amounts(raw[mapping.monto], mapping)
+    descripciones = raw[mapping.descripcion].fillna('').astype(str).str.strip() if mapping.descripcion in raw else pd.Series('', index=raw.index)
+    if mapping.tipo and mapping.tipo in raw:
+        tipos = raw[mapping.tipo].astype(str).str.strip().str.capitalize()
+        tipos = tipos.where(tipos.isin(['Gasto', 'Ingreso']), montos.lt(0).map({True: 'Gasto', False: 'Ingreso'}))
+    else:
+        tipos = montos.lt(0).map({True: 'Gasto', False: 'Ingreso'})
+    if mapping.categoria and mapping.categoria in raw:
+        categorias = raw[mapping.categoria].fillna('').astype(str)
+        sin_categoria = categorias.str.strip() == ''
+        categorias[sin_categoria] = categorize(descripciones[sin_categoria], rules)
+    else:
+        categorias = categorize(descripciones, rules)
+    chunk = pd.DataFrame({
+        'Fecha': fechas.dt.date,
+        'Tipo': tipos,
+        'Categoría': categorias,
+        'Monto': montos.abs().round(2),
+        'Descripción': descripciones,
+    })
+    valid = fechas.notna() & montos.notna() & (chunk['Monto'] > 0)
+    return chunk[valid], int((~valid).sum())
+
+
+# --- Lectores por formato ---
+def iter_csv_chunks(source, mapping, chunk_rows=IMPORT_CHUNK_ROWS):
+    reader = pd.read_csv(
+        source, sep=mapping.sep, dtype=str, chunksize=chunk_rows,
+        usecols=lambda col: col in mapping.source_columns(), skipinitialspace=True,
+    )
+    for raw in reader:
+        yield raw
+
+
+OFX_FIELDS = {'DTPOSTED': 'Fecha', 'TRNAMT': 'Monto', 'NAME': 'Nombre', 'MEMO': 'Memo', 'TRNTYPE': 'TipoOFX'}
+_OFX_TAG = re.compile(r'<(/?)([A-Z0-9.]+)>([^<]*)')
+
+
+def iter_ofx_chunks(source, chunk_rows=IMPORT_CHUNK_ROWS, encoding='latin-1'):
+    # Lector incremental de OFX (SGML o XML): recorre el archivo línea por
+    # línea y arma un registro por cada bloque <STMTTRN>.
+    if isinstance(source, (str, os.PathLike)):
+        stream = open(source, encoding=encoding, errors='replace')
+    else:
+        stream = io.TextIOWrapper(source, encoding=encoding, errors='replace')
+    records = []
+    current = None
+    with stream:
+        for line in stream:
+            for closing, tag, value in _OFX_TAG.findall(line):
+                if tag == 'STMTTRN':
+                    if closing and current is not None:
+                        records.append(current)
+                        current = None
+                    elif not closing:
+                        current = {}
+                elif current is not None and not closing and tag in OFX_FIELDS:
+                    current[OFX_FIELDS[tag]] = value.strip()
+            if len(records) >= chunk_rows:
+                yield _ofx_frame(records)
+                records = []
+    if records:
+        yield _ofx_frame(records)
+
+
+def _ofx_frame(records):
+    raw = pd.DataFrame.from_records(records, columns=list(OFX_FIELDS.values()))
+    # DTPOSTED: AAAAMMDD[HHMMSS...]
+    raw['Fecha'] = raw['Fecha'].fillna('').str[:8]
+    raw['Descripción'] = raw['Nombre'].fillna('').str.cat(raw['Memo'].fillna(''), sep=' ').str.strip()
+    return raw
+
+
+OFX_MAPPING = ColumnMapping(fecha='Fecha', monto='Monto', descripcion='Descripción', date_format='%Y%m%d')
+
+
+# --- Importación ---
+def import_statement(source, transaction_store, hash_index, kind='csv', mapping=None, rules=None,
+                     chunk_rows=IMPORT_CHUNK_ROWS):
+    rules = DEFAULT_CATEGORY_RULES if rules is None else rules
+    if kind == 'ofx':
+        mapping = OFX_MAPPING
+        chunks = iter_ofx_chunks(source, chunk_rows=chunk_rows)
+    else:
+        mapping = mapping or ColumnMapping()
+        chunks = iter_csv_chunks(source, mapping, chunk_rows=chunk_rows)
+
+    result = {'leidas': 0, 'importadas': 0, 'duplicadas': 0, 'invalidas': 0}
+    seen_counts = {}
+    legacy_counts = {}
+    for raw in chunks:
+        result['leidas'] += len(raw)
+        chunk, invalid = normalize_chunk(raw, mapping, rules)
+        result['invalidas'] += invalid
+        if chunk.empty:
+            continue
+        hashes = transaction_hashes(chunk, seen_counts)
+        already = hash_index.existing(hashes)
+        if hash_index.has_legacy:
+            legacy_hashes = transaction_hashes(chunk, legacy_counts, with_type=False)
+            already |= _confirmed_legacy(chunk, hashes, legacy_hashes, already, hash_index, transaction_store)
+        is_new = [h not in already for h in hashes]
+        new_rows = chunk[is_new]
+        new_hashes = [h for h, new in zip(hashes, is_new) if new]
+        result['duplicadas'] += len(chunk) - len(new_rows)
+        if not new_rows.empty:
+            # Primero las transacciones, después los hashes: si se corta en el
+            # medio, reimportar como mucho repite este bloque, nunca lo pierde.
+            transaction_store.add_many(new_rows.itertuples(index=False, name=None))
+            hash_index.add(new_hashes)
+            result['importadas'] += len(new_rows)
+    return result
+
+
+def _confirmed_legacy(chunk, hashes, legacy_hashes, already, hash_index, transaction_store):
+    # Filas con un hash viejo (sin tipo) ya importado: son duplicadas sólo si
+    # el store tiene la transacción con el mismo tipo. Las confirmadas se
+    # registran con el hash nuevo, así la próxima vez no se consulta el store.
+    found = hash_index.existing_legacy(legacy_hashes)
+    candidates = [i for i, (h, legacy) in enumerate(zip(hashes, legacy_hashes)) if h not in already and legacy in found]
+    if not candidates:
+        return set()
+    rows = chunk.iloc[candidates]
+    stored = transaction_store.range(min(rows['Fecha']), max(rows['Fecha']) + timedelta(days=1))
+    stored_keys = set(_base_keys(stored)) if not stored.empty else set()
+    confirmed = {hashes[i] for i, key in zip(candidates, _base_keys(rows)) if key in stored_keys}
+    hash_index.add(sorted(confirmed))
+    return confirmed
@@ -0,0 +1,126 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from planner_config import MANUAL_MARKERS
+from planner_storage import atomic_write_csv
+from status_events import EVENTS_FILE, StatusEventLog, daily_config, status_items
+from transaction_store import TRANSACTION_COLUMNS
+
+
+# --- Datos Sintéticos para Benchmarks ---
+# Genera planner_data.csv (una fila por día), status_events.jsonl y
+# financial_transactions.csv con el mismo formato que escribe la app,
+# terminando en la fecha de hoy.
+EXPENSE_CATEGORIES = ["Alimentos", "Transporte", "Vivienda", "Entretenimiento", "Salud", "Educación", "Servicios", "Ropa", "Deudas", "Otros"]
+INCOME_CATEGORIES = ["Sueldo", "Inversión", "Regalos"]
+DESCRIPTIONS = ["supermercado", "colectivo", "alquiler", "cine", "farmacia", "curso", "luz", "zapatillas", "tarjeta", "varios", ""]
+
+
+def _date_range(years, end=None):
+    end = pd.Timestamp(end or datetime.now().date())
+    start = end - pd.DateOffset(years=years) + pd.Timedelta(days=1)
+    return pd.date_range(start, end, freq='D')
+
+
+def generate_planner(years, objectives_config, seed=0, end=None):
+    rng = np.random.default_rng(seed)
+    dates = _date_range(years, end)
+    n = len(dates)
+    data = {'Fecha': dates.strftime('%Y-%m-%d')}
+    for col_name, config in daily_config(objectives_config).items():
+        col_type = config['type']
+        if col_type == 'bool':
+            data[col_name] = rng.random(n) < 0.5
+        elif col_type == 'float':
+            step = config.get('step', 0.5)
+            data[col_name] = rng.integers(0, 8, n) * step
+        elif col_type == 'int':
+            step = config.get('step', 1)
+            data[col_name] = rng.integers(0, 5, n) * step
+        elif col_type == 'str':
+            data[col_name] = rng.choice(config.get('options') or [''], n)
+    # El balance inicial se carga una sola vez: después lo encadena el libro
+    # de balances mes a mes
+    if 'Balance_Inicial' in data:
+        data['Balance_Inicial'] = np.zeros(n)
+        data['Balance_Inicial'][0] = 10000.0
+    for marker in MANUAL_MARKERS.values():
+        if marker in data:
+            data[marker] = np.arange(n) == 0
+    return pd.DataFrame(data)
+
+
+def generate_status_events(years, objectives_config, seed=0, end=None):
+    # Cada ítem de salud/proyectos cambia de estado unas pocas veces por año
+    rng = np.random.default_rng(seed + 2)
+    dates = _date_range(years, end)
+    events = []
+    for item, default in status_items(objectives_config).items():
+        options = objectives_config[item].get('options') or [False, True]
+        for day in sorted(rng.choice(dates, size=3 * years, replace=False)):
+            events.append({'Ítem': item, 'Fecha': pd.Timestamp(day).strftime('%Y-%m-%d'), 'Estado': rng.choice(options).item(), 'Registrado': 'sintético'})
+    return events
+
+
+def generate_transactions(count, years, seed=0, end=None):
+    rng = np.random.default_rng(seed + 1)
+    dates = _date_range(years, end)
+    is_income = rng.random(count) < 0.1
+    categories = np.where(
+        is_income,
+        rng.choice(INCOME_CATEGORIES, count),
+        rng.choice(EXPENSE_CATEGORIES, count),
+    )
+    amounts = np.where(is_income, rng.uniform(1000, 5000, count), rng.uniform(1, 300, count)).round(2)
+    df = pd.DataFrame({
+        'Fecha': rng.choice(dates, count),
+        'Tipo': np.where(is_income, 'Ingreso', 'Gasto'),
+        'Categoría': categories,
+        'Monto': amounts,
+        'Descripción': rng.choice(DESCRIPTIONS, count),
+    })
+    df = df.sort_values(by='Fecha', kind='stable')
+    df['Fecha'] = df['Fecha'].dt.strftime('%Y-%m-%d')
+    return df[TRANSACTION_COLUMNS]
+
+
+def write_dataset(directory, years, transactions, objectives_config, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    planner_path = os.path.join(directory, 'planner_data.csv')
+    financial_path = os.path.join(directory, 'financial_transactions.csv')
+    atomic_write_csv(generate_planner(years, objectives_config, seed), planner_path)
+    event_log = StatusEventLog(os.path.join(directory, EVENTS_FILE), status_items(objectives_config))
+    event_log.append_events(generate_status_events(years, objectives_config, seed))
+    atomic_write_csv(generate_transactions(transactions, years, seed), financial_path)
+    return planner_path, financial_path
+
+
+def load_objectives_config():
+    # La configuración vive fuera del script de la app: no hace falta
+    # Streamlit. Incluye los cambios de objectives_config.json, si existe.
+    from planner_objectives import load_objectives
+    return load_objectives().objectives
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos del planner")
+    parser.add_argument('directory')
+    parser.add_argument('--years', type=int, default=1)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    paths = write_dataset(args.directory, args.years, args.transactions, load_objectives_config(), args.seed)
+    for path in paths:
+        print(f"{path}: {os.path.getsize(path)} bytes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
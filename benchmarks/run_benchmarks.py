@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from generate_data import load_objectives_config, write_dataset
+from planner_storage import wait_for_writers
+
+
+# --- Benchmarks Headless del Planner ---
+# Ejecuta planner_app.py con AppTest sobre datos sintéticos de distintos
+# tamaños y mide, por sección e interacción: latencia del rerun, pico de
+# memoria (tracemalloc) y bytes escritos. El resultado es un JSON que se puede
+# comparar entre commits con --compare.
+APP_PATH = os.path.join(REPO_DIR, 'planner_app.py')
+SECTIONS = ['seguimiento', 'salud', 'proyectos', 'finanzas', 'resumen', 'periodos', 'guia']
+DEFAULT_SCALES = ['1:10000', '5:100000', '20:1000000']
+
+
+def _bytes_written():
+    # wchar de /proc cuenta todo lo que el proceso pasó a write(); fuera de
+    # Linux no hay un equivalente barato y se informa None.
+    try:
+        with open('/proc/self/io', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _select_section(at, url_path):
+    # Cada sección es una página en sections/ (ver la navegación de planner_app.py)
+    at.switch_page(f'sections/{url_path}.py')
+
+
+def _measure(action, repeat):
+    latencies = []
+    written = 0
+    for _ in range(repeat):
+        wait_for_writers()
+        before = _bytes_written()
+        start = time.perf_counter()
+        at = action()
+        latencies.append((time.perf_counter() - start) * 1000)
+        # Los guardados del planner los hace un hilo después de la ventana de
+        # coalescencia: se esperan (fuera de la latencia) para contar sus bytes
+        wait_for_writers()
+        after = _bytes_written()
+        if before is not None and after is not None:
+            written += after - before
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    tracemalloc.start()
+    action()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies.sort()
+    return {
+        'latency_ms': {
+            'min': round(latencies[0], 3),
+            'median': round(statistics.median(latencies), 3),
+            'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            'mean': round(statistics.fmean(latencies), 3),
+        },
+        'peak_memory_kb': round(peak / 1024, 1),
+        'bytes_written_per_run': written // repeat if _bytes_written() is not None else None,
+    }
+
+
+def run_scale(years, transactions, repeat, sections, workdir, objectives_config):
+    write_dataset(workdir, years, transactions, objectives_config)
+    st.cache_resource.clear()
+    results = []
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=600)
+        start = time.perf_counter()
+        at.run()
+        cold_ms = (time.perf_counter() - start) * 1000
+        results.append({'section': 'seguimiento', 'interaction': 'cold_start', 'latency_ms': {'median': round(cold_ms, 3)}})
+
+        for section in sections:
+            _select_section(at, section)
+            at.run()
+            results.append({'section': section, 'interaction': 'rerun', **_measure(at.run, repeat)})
+
+        if 'seguimiento' in sections:
+            _select_section(at, 'seguimiento')
+            at.run()
+
+            def toggle_checkbox():
+                checkbox = at.checkbox(key='daily_Entrenamiento_Hecho')
+                return checkbox.set_value(not checkbox.value).run()
+
+            results.append({'section': 'seguimiento', 'interaction': 'checkbox_toggle', **_measure(toggle_checkbox, repeat)})
+
+        if 'finanzas' in sections:
+            _select_section(at, 'finanzas')
+            at.run()
+
+            def submit_transaction():
+                at.number_input(key='trans_amount_input').set_value(12.5)
+                return at.button(key='FormSubmitter:transaction_form-Guardar Transacción').click().run()
+
+            results.append({'section': 'finanzas', 'interaction': 'transaction_submit', **_measure(submit_transaction, repeat)})
+
+        if 'resumen' in sections:
+            _select_section(at, 'resumen')
+            at.run()
+            results.append({'section': 'resumen', 'interaction': 'month_summary', **_measure(at.run, repeat)})
+    finally:
+        os.chdir(previous_dir)
+        st.cache_resource.clear()
+
+    for row in results:
+        row.update({'years': years, 'transactions': transactions})
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path, threshold=1.10):
+    # Muestra la relación nueva/vieja de la mediana y marca las regresiones
+    with open(old_path, encoding='utf-8') as f:
+        old = {(r['years'], r['transactions'], r['section'], r['interaction']): r for r in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)['results']
+    regressions = 0
+    for row in new:
+        key = (row['years'], row['transactions'], row['section'], row['interaction'])
+        if key not in old:
+            continue
+        ratio = row['latency_ms']['median'] / max(old[key]['latency_ms']['median'], 1e-9)
+        flag = 'REGRESIÓN' if ratio > threshold else ''
+        regressions += bool(flag)
+        print(f"{key[0]:>3}a {key[1]:>8}tx {key[2]:<12} {key[3]:<18} "
+              f"{old[key]['latency_ms']['median']:>10.1f} -> {row['latency_ms']['median']:>10.1f} ms  x{ratio:.2f} {flag}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks headless del planner")
+    parser.add_argument('--scale', action='append', help="AÑOS:TRANSACCIONES, se puede repetir (por defecto 1:10000, 5:100000, 20:1000000)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--section', action='append', choices=SECTIONS)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('VIEJO', 'NUEVO'))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare)
+
+    objectives_config = load_objectives_config()
+    results = []
+    for scale in args.scale or DEFAULT_SCALES:
+        years, transactions = (int(part) for part in scale.split(':'))
+        with tempfile.TemporaryDirectory(prefix='planner-bench-') as workdir:
+            print(f"Escala: {years} años, {transactions} transacciones", file=sys.stderr)
+            results.extend(run_scale(years, transactions, args.repeat, args.section or SECTIONS, workdir, objectives_config))
+
+    payload = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'streamlit': st.__version__,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    print(f"Resultados escritos en {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
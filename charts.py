@@ -0,0 +1,137 @@
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from profiling import span
+
+
+# --- Capa de Gráficos ---
+# Cada gráfico se describe con un ChartSpec (datos + estilo). La clave del
+# cache es un hash de ese contenido: si nada cambió se devuelve el PNG ya
+# renderizado y matplotlib ni siquiera se importa.
+CHART_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+class ChartSpec:
+    def __init__(self, kind, x, y, title, xlabel, ylabel, color=None, figsize=(10, 4),
+                 marker=None, grid=False, hline=None, hline_label=None, xtick_rotation=45, xtick_ha='center'):
+        # kind: 'bar' o 'line'
+        self.kind = kind
+        self.x = list(x)
+        self.y = np.asarray(y, dtype=float)
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.color = color
+        self.figsize = tuple(figsize)
+        self.marker = marker
+        self.grid = grid
+        self.hline = hline
+        self.hline_label = hline_label
+        self.xtick_rotation = xtick_rotation
+        self.xtick_ha = xtick_ha
+
+    def style(self):
+        return {
+            'kind': self.kind, 'title': self.title, 'xlabel': self.xlabel, 'ylabel': self.ylabel,
+            'color': self.color, 'figsize': self.figsize, 'marker': self.marker, 'grid': self.grid,
+            'hline': self.hline, 'hline_label': self.hline_label,
+            'xtick_rotation': self.xtick_rotation, 'xtick_ha': self.xtick_ha,
+        }
+
+    def to_frame(self):
+        # Datos en formato tabla para los gráficos nativos de Streamlit
+        import pandas as pd
+        return pd.DataFrame({self.ylabel: self.y}, index=pd.Index(self.x, name=self.xlabel))
+
+    def cache_key(self):
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.style(), sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        digest.update('\x1f'.join(str(value) for value in self.x).encode('utf-8'))
+        digest.update(self.y.tobytes())
+        return digest.hexdigest()
+
+
+def render_png(spec, dpi=100):
+    # Figure sin pyplot: no queda registrada en el estado global de matplotlib,
+    # y se limpia explícitamente después de guardar el PNG.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=spec.figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if spec.kind == 'bar':
+        if spec.x and not isinstance(spec.x[0], str):
+            ax.bar(spec.x, spec.y, color=spec.color)
+        else:
+            ax.bar(range(len(spec.x)), spec.y, color=spec.color, tick_label=[str(value) for value in spec.x])
+    else:
+        ax.plot(spec.x, spec.y, marker=spec.marker, linestyle='-', color=spec.color)
+    if spec.hline is not None:
+        ax.axhline(y=spec.hline, color='r', linestyle='--', label=spec.hline_label)
+        ax.legend()
+    ax.set_title(spec.title)
+    ax.set_xlabel(spec.xlabel)
+    ax.set_ylabel(spec.ylabel)
+    if spec.grid:
+        ax.grid(True)
+    for label in ax.get_xticklabels():
+        label.set_rotation(spec.xtick_rotation)
+        label.set_horizontalalignment(spec.xtick_ha)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi)
+    fig.clear()
+    return buffer.getvalue()
+
+
+class ChartCache:
+    # LRU acotado por bytes: al superar max_bytes se desalojan primero los
+    # gráficos usados hace más tiempo.
+    def __init__(self, max_bytes=CHART_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size_bytes(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_png(self, spec):
+        key = spec.cache_key()
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return png
+        with span('chart_draw', tipo=spec.kind, titulo=spec.title):
+            png = render_png(spec)
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries:
+                self._entries[key] = png
+                self._size += len(png)
+            self._evict()
+        return png
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            _, png = self._entries.popitem(last=False)
+            self._size -= len(png)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
@@ -0,0 +1,12 @@
+from datetime import date
+
+
+# --- Fechas ---
+def month_bounds(day):
+    # Devuelve [inicio, inicio del mes siguiente) para el mes de `day`
+    start = date(day.year, day.month, 1)
+    if day.month == 12:
+        end = date(day.year + 1, 1, 1)
+    else:
+        end = date(day.year, day.month + 1, 1)
+    return start, end
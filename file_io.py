@@ -0,0 +1,63 @@
+import contextlib
+import json
+import os
+import tempfile
+
+
+# --- Firmas y Escritura Atómica de Archivos ---
+# Los archivos derivados (agregados, índices, instantáneas) se validan con la
+# firma (mtime, tamaño) de los datos de los que salen, y todo se escribe en
+# un temporal del mismo directorio que después se renombra: un corte a mitad
+# de escritura nunca deja un archivo truncado. El temporal tiene nombre
+# único, así dos procesos que escriben el mismo archivo a la vez no se pisan
+# el temporal (gana el último rename).
+TEMP_SUFFIX = '.tmp'
+FILE_MODE = 0o644
+
+
+def file_signature(path):
+    # (mtime en ns, tamaño), o None si el archivo no existe
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode='w', encoding='utf-8', newline=None, fsync=True):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=TEMP_SUFFIX)
+    try:
+        # mkstemp crea el temporal sólo para el dueño
+        os.chmod(tmp_path, FILE_MODE)
+        text_options = {} if 'b' in mode else {'encoding': encoding, 'newline': newline}
+        with os.fdopen(fd, mode, **text_options) as f:
+            yield f
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_bytes(data, path):
+    with atomic_open(path, 'wb') as f:
+        f.write(data)
+
+
+def json_default(value):
+    # Tipos de numpy/pandas que json no sabe serializar por sí solo
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def atomic_write_json(payload, path, **options):
+    with atomic_open(path) as f:
+        json.dump(payload, f, ensure_ascii=False, **options)
@@ -0,0 +1,197 @@
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+# --- Índice del Historial de Transacciones ---
+# Una copia columnar en memoria de todas las transacciones: fecha, monto e
+# id como arreglos de numpy; tipo, categoría y descripción como códigos
+# enteros. Encima se mantienen:
+#   - una permutación por fecha descendente (a igual fecha, la última
+#     registrada primero), ordenada una vez y mantenida al agregar: sólo se
+#     ordenan las filas nuevas y se intercalan con searchsorted;
+#   - un índice invertido token -> descripciones distintas que lo contienen.
+# Filtrar es combinar máscaras booleanas y paginar es cortar la permutación
+# filtrada, así que una página cuesta lo mismo con mil o con un millón de
+# transacciones y sólo se arma el DataFrame de las filas visibles.
+HISTORY_PAGE_SIZE = 50
+HISTORY_COLUMNS = ['Fecha', 'Tipo', 'Categoría', 'Monto', 'Descripción']
+
+
+def description_tokens(text):
+    # "Café Martínez 2x1" -> {'cafe', 'martinez', '2x1'}
+    ascii_text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return set(re.findall(r'[a-z0-9]+', ascii_text.lower()))
+
+
+class HistoryFilter:
+    # El texto se parte en tokens; cada uno tiene que aparecer en la
+    # descripción como palabra o comienzo de palabra.
+    def __init__(self, tipo=None, categorias=None, monto_min=None, monto_max=None, texto=''):
+        self.tipo = tipo
+        self.categorias = list(categorias or [])
+        self.monto_min = monto_min
+        self.monto_max = monto_max
+        self.texto = texto or ''
+
+    def tokens(self):
+        return sorted(description_tokens(self.texto))
+
+    def key(self):
+        return (self.tipo, tuple(sorted(self.categorias)), self.monto_min, self.monto_max, tuple(self.tokens()))
+
+
+class _Codes:
+    # Valores de texto <-> códigos enteros, agregando los nuevos al final
+    def __init__(self):
+        self.names = []
+        self.lookup = {}
+
+    def encode(self, values):
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object).fillna('').astype(str))
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, name in enumerate(uniques):
+            code = self.lookup.get(name)
+            if code is None:
+                code = self.lookup[name] = len(self.names)
+                self.names.append(name)
+            mapping[i] = code
+        return mapping[codes]
+
+    def mask(self, names):
+        # Tabla booleana por código, para filtrar con un solo acceso indexado
+        table = np.zeros(len(self.names), dtype=bool)
+        table[[self.lookup[name] for name in names if name in self.lookup]] = True
+        return table
+
+
+class TransactionHistory:
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.fechas = np.empty(0, dtype='datetime64[D]')
+        self.montos = np.empty(0, dtype=np.float64)
+        self.tipos = np.empty(0, dtype=np.int32)
+        self.categorias = np.empty(0, dtype=np.int32)
+        self.descripciones = np.empty(0, dtype=np.int32)
+        self._tipo_codes = _Codes()
+        self._categoria_codes = _Codes()
+        self._descripcion_codes = _Codes()
+        self.postings = {}
+        self._tokens = []
+        self._order = None
+        # Claves de la permutación (-fecha, -id), ascendentes, para ubicar
+        # las filas nuevas sin volver a ordenar todo
+        self._order_days = None
+        self._order_ids = None
+        # Última selección: cambiar de página con el mismo filtro no recalcula
+        self._selection = (None, None)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, rows):
+        # `rows`: columnas Fecha, Tipo, Categoría, Monto, Descripción y, si el
+        # backend los tiene, 'id'. Sin ids se numeran a continuación de los
+        # existentes, que es el orden en que se agregaron.
+        if len(rows) == 0:
+            return
+        if 'id' in rows.columns:
+            ids = rows['id'].to_numpy(dtype=np.int64)
+        else:
+            start = int(self.ids.max()) + 1 if len(self.ids) else 0
+            ids = np.arange(start, start + len(rows), dtype=np.int64)
+        known_descriptions = len(self._descripcion_codes.names)
+        descripciones = self._descripcion_codes.encode(rows['Descripción'])
+        # Sólo las descripciones nuevas se tokenizan
+        new_names = self._descripcion_codes.names[known_descriptions:]
+        for code, name in enumerate(new_names, start=known_descriptions):
+            for token in description_tokens(name):
+                postings = self.postings.get(token)
+                if postings is None:
+                    postings = self.postings[token] = []
+                    bisect.insort(self._tokens, token)
+                postings.append(code)
+
+        self.ids = np.concatenate([self.ids, ids])
+        self.fechas = np.concatenate([self.fechas, pd.to_datetime(rows['Fecha']).to_numpy().astype('datetime64[D]')])
+        self.montos = np.concatenate([self.montos, rows['Monto'].to_numpy(dtype=np.float64)])
+        self.tipos = np.concatenate([self.tipos, self._tipo_codes.encode(rows['Tipo'])])
+        self.categorias = np.concatenate([self.categorias, self._categoria_codes.encode(rows['Categoría'])])
+        self.descripciones = np.concatenate([self.descripciones, descripciones])
+        if self._order is not None:
+            self._merge_order(len(self) - len(rows))
+        self._selection = (None, None)
+
+    def _sort_keys(self, positions):
+        return -self.fechas[positions].astype(np.int64), -self.ids[positions]
+
+    def order(self):
+        # Posiciones de la más reciente a la más antigua
+        if self._order is None:
+            days, ids = self._sort_keys(slice(None))
+            self._order = np.lexsort((ids, days))
+            self._order_days = days[self._order]
+            self._order_ids = ids[self._order]
+        return self._order
+
+    def _merge_order(self, start):
+        # Ordena sólo las filas desde `start` y las intercala en la
+        # permutación existente: búsqueda binaria por fecha y, dentro de cada
+        # fecha, por id
+        new_days, new_ids = self._sort_keys(slice(start, None))
+        new_order = np.lexsort((new_ids, new_days))
+        new_days, new_ids = new_days[new_order], new_ids[new_order]
+        positions = np.empty(len(new_order), dtype=np.int64)
+        unique_days, first, counts = np.unique(new_days, return_index=True, return_counts=True)
+        lows = np.searchsorted(self._order_days, unique_days, side='left')
+        highs = np.searchsorted(self._order_days, unique_days, side='right')
+        for low, high, i, count in zip(lows, highs, first, counts):
+            same_day = slice(i, i + count)
+            positions[same_day] = low + np.searchsorted(self._order_ids[low:high], new_ids[same_day])
+        self._order = np.insert(self._order, positions, new_order + start)
+        self._order_days = np.insert(self._order_days, positions, new_days)
+        self._order_ids = np.insert(self._order_ids, positions, new_ids)
+
+    def categories(self):
+        return list(self._categoria_codes.names)
+
+    def select(self, filters):
+        # Posiciones que pasan el filtro, ya en orden de fecha descendente
+        mask = np.ones(len(self), dtype=bool)
+        if filters.tipo:
+            mask &= self._tipo_codes.mask([filters.tipo])[self.tipos]
+        if filters.categorias:
+            mask &= self._categoria_codes.mask(filters.categorias)[self.categorias]
+        if filters.monto_min is not None:
+            mask &= self.montos >= filters.monto_min
+        if filters.monto_max is not None:
+            mask &= self.montos <= filters.monto_max
+        for query_token in filters.tokens():
+            # Tokens con ese prefijo: un rango contiguo de la lista ordenada
+            start = bisect.bisect_left(self._tokens, query_token)
+            end = bisect.bisect_left(self._tokens, query_token + '\uffff')
+            matching = np.zeros(len(self._descripcion_codes.names), dtype=bool)
+            for token in self._tokens[start:end]:
+                matching[self.postings[token]] = True
+            mask &= matching[self.descripciones]
+        order = self.order()
+        return order[mask[order]]
+
+    def page(self, filters, offset=0, limit=HISTORY_PAGE_SIZE):
+        # (DataFrame de la página, total que pasa el filtro)
+        key, selected = self._selection
+        if key != filters.key():
+            selected = self.select(filters)
+            self._selection = (filters.key(), selected)
+        rows = selected[offset:offset + limit]
+        page_df = pd.DataFrame({
+            'Fecha': pd.to_datetime(self.fechas[rows]).date,
+            'Tipo': [self._tipo_codes.names[code] for code in self.tipos[rows]],
+            'Categoría': [self._categoria_codes.names[code] for code in self.categorias[rows]],
+            'Monto': self.montos[rows],
+            'Descripción': [self._descripcion_codes.names[code] for code in self.descripciones[rows]],
+        }, columns=HISTORY_COLUMNS)
+        return page_df, len(selected)
@@ -0,0 +1,239 @@
+import os
+import sys
+
+import pandas as pd
+
+from file_io import atomic_open
+from file_lock import FileLock
+from planner_storage import atomic_write_csv
+from transaction_store import TRANSACTION_COLUMNS, TransactionStore
+
+
+# --- Almacenamiento Columnar Particionado por Mes (opcional) ---
+# Cada dataset es un directorio con un archivo Parquet por mes (AAAA-MM.parquet).
+# Las lecturas usan memory-map y piden sólo las columnas y meses necesarios;
+# una escritura reescribe únicamente la partición del mes que cambió.
+# Requiere pyarrow, que no es dependencia obligatoria del planner.
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError(
+            "El almacenamiento Parquet necesita pyarrow: pip install pyarrow"
+        ) from exc
+    return pyarrow, pyarrow.parquet
+
+
+def _months_between(start, end):
+    # Claves de mes que cubren el rango [start, end)
+    periods = pd.period_range(pd.Timestamp(start), pd.Timestamp(end) - pd.Timedelta(days=1), freq='M')
+    return [period.strftime('%Y-%m') for period in periods]
+
+
+class MonthPartitionedParquet:
+    def __init__(self, root, date_column='Fecha'):
+        self.pa, self.pq = require_pyarrow()
+        self.root = root
+        self.date_column = date_column
+        os.makedirs(root, exist_ok=True)
+
+    def partition_path(self, month_key):
+        return os.path.join(self.root, f"{month_key}.parquet")
+
+    def months(self):
+        return sorted(
+            name[:-len('.parquet')] for name in os.listdir(self.root)
+            if name.endswith('.parquet')
+        )
+
+    def read(self, months=None, columns=None):
+        available = self.months()
+        selected = available if months is None else [month for month in months if month in available]
+        if columns is not None and self.date_column not in columns:
+            columns = [self.date_column] + list(columns)
+        frames = [
+            self.pq.read_table(self.partition_path(month), columns=columns, memory_map=True).to_pandas()
+            for month in selected
+        ]
+        if not frames:
+            return pd.DataFrame(columns=columns or [self.date_column])
+        if len(frames) == 1:
+            return frames[0]
+        # pd.concat tolera diferencias menores entre particiones (unidad de los
+        # timestamps, categorías vs texto) que concat_tables rechaza
+        return pd.concat(frames, ignore_index=True)
+
+    def write_month(self, month_key, df):
+        # Temporal + rename: una partición nunca queda escrita a medias
+        df = df.reset_index(drop=True)
+        df[self.date_column] = pd.to_datetime(df[self.date_column]).astype('datetime64[ns]')
+        table = self.pa.Table.from_pandas(df, preserve_index=False)
+        with atomic_open(self.partition_path(month_key), 'wb') as f:
+            self.pq.write_table(table, f)
+
+    def upsert(self, df, key_column=None):
+        # Mezcla `df` con las particiones de sus meses y reescribe sólo esas.
+        # Con key_column, la fila nueva reemplaza a la existente con la misma clave.
+        if df.empty:
+            return []
+        dates = pd.to_datetime(df[self.date_column])
+        touched = []
+        for month_key, month_rows in df.groupby(dates.dt.strftime('%Y-%m')):
+            existing = self.read(months=[month_key])
+            if not existing.empty:
+                month_rows = pd.concat([existing, month_rows], ignore_index=True)
+            if key_column is not None:
+                month_rows = month_rows.drop_duplicates(subset=key_column, keep='last')
+            month_rows = month_rows.sort_values(by=self.date_column, kind='stable')
+            self.write_month(month_key, month_rows)
+            touched.append(month_key)
+        return touched
+
+
+# --- Conversores CSV <-> Parquet ---
+def csv_to_parquet(csv_path, root, date_column='Fecha'):
+    df = pd.read_csv(csv_path)
+    df[date_column] = pd.to_datetime(df[date_column], errors='coerce', format='ISO8601')
+    df = df.dropna(subset=[date_column])
+    dataset = MonthPartitionedParquet(root, date_column=date_column)
+    months = df[date_column].dt.strftime('%Y-%m')
+    for month_key, month_rows in df.groupby(months):
+        dataset.write_month(month_key, month_rows.sort_values(by=date_column, kind='stable'))
+    return dataset.months()
+
+
+def parquet_to_csv(root, csv_path, date_column='Fecha'):
+    df = MonthPartitionedParquet(root, date_column=date_column).read()
+    if not df.empty:
+        df[date_column] = pd.to_datetime(df[date_column]).dt.strftime('%Y-%m-%d')
+    atomic_write_csv(df, csv_path)
+    return len(df)
+
+
+# --- Store de Transacciones sobre Parquet ---
+class ParquetTransactionStore(TransactionStore):
+    MIGRATED_MARKER = '.csv_migrated'
+
+    def __init__(self, root):
+        self.dataset = MonthPartitionedParquet(root)
+        # upsert lee y reescribe la partición: exclusivo también entre procesos
+        self._lock = FileLock(root)
+        self._init_ranges(os.path.join(root, 'ranges.npz'))
+        self._init_history()
+
+    def add_many(self, rows):
+        df = pd.DataFrame(list(rows), columns=TRANSACTION_COLUMNS)
+        if df.empty:
+            return 0
+        df['Fecha'] = pd.to_datetime(df['Fecha'])
+        df['Monto'] = df['Monto'].astype(float)
+        df['Descripción'] = df['Descripción'].fillna('').astype(str)
+        with self._lock:
+            before = self.revision()
+            self.dataset.upsert(df)
+            after = self.revision()
+        self._index_rows(df[['Fecha', 'Tipo', 'Categoría', 'Monto']], before, after)
+        self._history_added(df, before, after)
+        return len(df)
+
+    def revision(self):
+        # Firma (mtime, tamaño) de cada partición
+        signature = []
+        for month in self.dataset.months():
+            stat = os.stat(self.dataset.partition_path(month))
+            signature.append([month, stat.st_mtime_ns, stat.st_size])
+        return signature
+
+    def add(self, fecha, tipo, categoria, monto, descripcion=''):
+        self.add_many([(fecha, tipo, categoria, monto, descripcion)])
+
+    def is_empty(self):
+        return not self.dataset.months()
+
+    def _read(self, start=None, end=None, columns=None):
+        months = None if start is None else _months_between(start, end)
+        df = self.dataset.read(months=months, columns=columns)
+        if df.empty:
+            return pd.DataFrame(columns=columns or TRANSACTION_COLUMNS)
+        df['Fecha'] = pd.to_datetime(df['Fecha'])
+        if start is not None:
+            df = df[(df['Fecha'] >= pd.Timestamp(start)) & (df['Fecha'] < pd.Timestamp(end))]
+        return df
+
+    def _to_frame(self, df):
+        df = df.reindex(columns=TRANSACTION_COLUMNS)
+        if not df.empty:
+            df['Fecha'] = df['Fecha'].dt.date
+        return df.reset_index(drop=True)
+
+    def all(self):
+        df = self._read()
+        if not df.empty:
+            df = df.iloc[::-1].sort_values(by='Fecha', ascending=False, kind='stable')
+        return self._to_frame(df)
+
+    def range(self, start, end):
+        return self._to_frame(self._read(start, end))
+
+    def totals_by_type(self, start, end):
+        df = self._read(start, end, columns=['Tipo', 'Monto'])
+        totals = df.groupby('Tipo')['Monto'].sum() if not df.empty else {}
+        return {tipo: float(totals.get(tipo, 0.0)) for tipo in ('Ingreso', 'Gasto')}
+
+    def totals_by_category(self, start, end, tipo='Gasto'):
+        df = self._read(start, end, columns=['Tipo', 'Categoría', 'Monto'])
+        df = df[df['Tipo'] == tipo]
+        return df.groupby('Categoría')['Monto'].sum().astype(float).sort_values(ascending=False)
+
+    def totals_by_day(self, start, end, tipo='Gasto'):
+        df = self._read(start, end, columns=['Tipo', 'Monto'])
+        df = df[df['Tipo'] == tipo]
+        totals = df.groupby(df['Fecha'].dt.date)['Monto'].sum().astype(float)
+        return totals.rename_axis('Fecha')
+
+    def daily_totals(self):
+        df = self._read(columns=['Tipo', 'Categoría', 'Monto'])
+        if df.empty:
+            return pd.DataFrame(columns=['Fecha', 'Tipo', 'Categoría', 'Monto'])
+        return df.groupby([df['Fecha'].dt.date, 'Tipo', 'Categoría'])['Monto'].sum().reset_index()
+
+    def _history_rows(self):
+        # Sin ids: el orden de lectura (por fecha, en orden de llegada) los reemplaza
+        return self._read()
+
+    def migrate_from_csv(self, csv_path):
+        marker = os.path.join(self.dataset.root, self.MIGRATED_MARKER)
+        if os.path.exists(marker):
+            return 0
+        imported = 0
+        if os.path.exists(csv_path) and self.is_empty():
+            legacy_df = pd.read_csv(csv_path)
+            legacy_df['Fecha'] = pd.to_datetime(legacy_df['Fecha'], errors='coerce').dt.date
+            legacy_df = legacy_df.dropna(subset=['Fecha', 'Monto'])
+            imported = self.add_many(legacy_df[TRANSACTION_COLUMNS].itertuples(index=False, name=None))
+        with open(marker, 'w', encoding='utf-8') as f:
+            f.write(str(imported))
+        return imported
+
+
+# --- Línea de comandos ---
+# python parquet_storage.py a-parquet planner_data.csv planner_data_parquet
+# python parquet_storage.py a-csv planner_data_parquet planner_data.csv
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3 or argv[0] not in ('a-parquet', 'a-csv'):
+        print("Uso: python parquet_storage.py (a-parquet CSV DIRECTORIO | a-csv DIRECTORIO CSV)")
+        return 2
+    command, source, target = argv
+    if command == 'a-parquet':
+        months = csv_to_parquet(source, target)
+        print(f"{len(months)} particiones mensuales escritas en {target}")
+    else:
+        rows = parquet_to_csv(source, target)
+        print(f"{rows} filas escritas en {target}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
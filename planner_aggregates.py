@@ -0,0 +1,94 @@
+import json
+import os
+
+import pandas as pd
+
+from file_io import atomic_write_json
+
+
+# --- Agregados Mensuales Materializados ---
+# Por cada mes se guarda: cantidad de días registrados y sumas acumuladas de
+# cada objetivo diario. Cada cambio de celda aplica un delta, así que el
+# progreso de cualquier mes es una consulta a este diccionario en lugar de
+# recorrer las filas. El estado de salud/proyectos viene del registro de
+# eventos (status_events.py) y el puntaje, de planner_objectives.py.
+PROJECT_DONE_STATE = 'Completado ✅'
+
+
+def month_key(day):
+    return pd.Timestamp(day).strftime('%Y-%m')
+
+
+def _signature_to_json(signature):
+    return [list(part) if part is not None else None for part in signature]
+
+
+class MonthlyAggregates:
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        config = schema.config
+        self.sum_columns = [
+            name for name, cfg in config.items()
+            if cfg['section'] == 'daily' and cfg['type'] in ('bool', 'float', 'int')
+        ]
+        self.months = {}
+        self._signature = None
+
+    # --- Persistencia ---
+    def load(self, signature):
+        # Devuelve True si el archivo persistido corresponde a los datos actuales
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                payload = json.load(f)
+        except ValueError:
+            return False
+        # Otra configuración de objetivos suma otras columnas
+        if payload.get('signature') != _signature_to_json(signature) or payload.get('columns') != self.sum_columns:
+            return False
+        self.months = payload.get('months', {})
+        self._signature = signature
+        return True
+
+    def save(self, signature):
+        self._signature = signature
+        payload = {'signature': _signature_to_json(signature), 'columns': self.sum_columns, 'months': self.months}
+        atomic_write_json(payload, self.path)
+
+    # --- Construcción completa (sólo cuando no hay archivo válido) ---
+    def rebuild(self, frame_df):
+        self.months = {}
+        if frame_df.empty:
+            return
+        months = frame_df.index.to_period('M').strftime('%Y-%m')
+        sums = frame_df[self.sum_columns].astype(float).groupby(months).sum()
+        days = frame_df.groupby(months).size()
+        for key in days.index:
+            self.months[key] = {
+                'days': int(days[key]),
+                'sums': {col: float(sums.at[key, col]) for col in self.sum_columns},
+            }
+
+    # --- Actualización por deltas ---
+    def add_day(self, day, row):
+        key = month_key(day)
+        month = self.months.setdefault(key, {
+            'days': 0,
+            'sums': {col: 0.0 for col in self.sum_columns},
+        })
+        month['days'] += 1
+        for col in self.sum_columns:
+            month['sums'][col] = month['sums'].get(col, 0.0) + float(row[col])
+
+    def apply_change(self, day, col_name, old_value, new_value):
+        month = self.months.get(month_key(day))
+        if month is None:
+            return
+        if col_name in self.sum_columns:
+            month['sums'][col_name] = month['sums'].get(col_name, 0.0) + float(new_value) - float(old_value)
+
+    def month(self, day):
+        return self.months.get(month_key(day))
+
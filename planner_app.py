@@ -2,241 +2,321 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import os
-import matplotlib.pyplot as plt
 import random 
 
+from balance_ledger import manual_values
+from bank_import import ColumnMapping, ImportHashIndex, import_statement, load_category_rules
+from charts import ChartCache, ChartSpec
+from history_index import HISTORY_PAGE_SIZE, HistoryFilter
+from planner_aggregates import PROJECT_DONE_STATE
+from planner_config import (
+    ARCHIVE_HOT_MONTHS, CATEGORY_RULES_FILE, IMPORT_HASH_DB_FILE, MANUAL_MARKERS, STORAGE_FORMAT,
+)
+from planner_engine import (
+    budgets_path, finance_summary, open_balance_ledger, open_planner_store, open_status_log, open_transaction_store,
+    progress_table, refresh_ledger, refresh_spending_monitor,
+)
+from planner_objectives import ObjectivesConfig, ProgressScorer, load_objectives
+from profiles import DEFAULT_PROFILE, create_profile, list_profiles, profile_path
+from profiling import PROFILER, profiling_enabled_by_env, span, to_chrome_trace, to_jsonl
+from range_index import DAYS_SERIES, finance_breakdown, preset_ranges, previous_range
+from spending_alerts import SpendingMonitor, budget_status, load_budgets, save_budgets
+
 
 # --- Configuración Inicial ---
-DATA_FILE = 'planner_data.csv' 
-FINANCIAL_DATA_FILE = 'financial_transactions.csv' 
-
-# --- Definición de columnas de la aplicación ---
-APP_OBJECTIVES_CONFIG = {
-    # Objetivos Diarios
-    'Entrenamiento_Hecho': {'display': '✅ Entrenamiento Hecho', 'type': 'bool', 'section': 'daily'},
-    'Entrenamiento_Minutos': {'display': 'Minutos de Entrenamiento', 'type': 'float', 'section': 'daily', 'step': 15.0, 'goal_monthly': 900}, 
-    'Comida Saludable': {'display': '✅ Comida Saludable', 'type': 'bool', 'section': 'daily'},
-    'Agua_Litros': {'display': 'Litros de Agua', 'type': 'float', 'section': 'daily', 'step': 0.5, 'goal_daily_avg': 2.0}, 
-    'Horas Extra': {'display': 'Horas Extra', 'type': 'float', 'section': 'daily', 'step': 0.5, 'goal_monthly': 40}, 
-    'Meditacion_Minutos': {'display': 'Minutos de Meditación', 'type': 'float', 'section': 'daily', 'step': 5.0, 'goal_daily_avg': 10.0}, 
-    'Lectura_Paginas': {'display': 'Páginas Leídas', 'type': 'int', 'section': 'daily', 'step': 10, 'goal_monthly': 300}, 
-
-    # Objetivos de Salud
-    'Otorrino (vos)': {'display': 'Otorrino (vos)', 'type': 'bool', 'section': 'health'},
-    'Otorrino (Guille)': {'display': 'Otorrino (Guille)', 'type': 'bool', 'section': 'health'},
-    'Dentista (vos)': {'display': 'Dentista (vos)', 'type': 'bool', 'section': 'health'},
-    'Dentista (Guille)': {'display': 'Dentista (Guille)', 'type': 'bool', 'section': 'health'},
-    'Neumonólogo (Guille)': {'display': 'Neumonólogo (Guille)', 'type': 'bool', 'section': 'health'},
-    'Brackets (averiguar - ambos)': {'display': 'Brackets (averiguar - ambos)', 'type': 'bool', 'section': 'health'},
-    'Rinoseptoplastia (consulta)': {'display': 'Rinoseptoplastia (consulta)', 'type': 'bool', 'section': 'health'},
-
-    # Proyectos
-    'App ingresos y salidas': {'display': 'App ingresos y salidas', 'type': 'str', 'section': 'projects', 'options': ['Pendiente', 'En Curso', 'Completado ✅']},
-    'App progreso personal': {'display': 'App progreso personal', 'type': 'str', 'section': 'projects', 'options': ['Pendiente', 'En Curso', 'Completado ✅']},
-
-    # Finanzas - Balance Inicial
-    'Balance_Inicial': {'display': 'Balance Inicial del Mes', 'type': 'float', 'section': 'finance', 'default': 0.0}
-}
-
-# Generar la lista de nombres de columnas a partir de la configuración
-APP_COLUMNS_NAMES = ['Fecha'] + list(APP_OBJECTIVES_CONFIG.keys())
+# Archivos, objetivos y pesos viven en planner_config.py (compartidos con el
+# motor headless y la CLI de reportes); acá sólo queda lo propio de la UI.
+
+# Guardado del planner: las ediciones se juntan durante esta ventana y las
+# escribe un hilo en segundo plano (0 = escribir en cada edición)
+FLUSH_INTERVAL_MS = 250
+
+# Navegación: 'secciones' ejecuta sólo la sección activa; 'pestañas' usa st.tabs
+NAVIGATION_MODE = 'secciones'
+
+# Motores de gráficos: imágenes de matplotlib cacheadas o gráficos nativos de Streamlit
+CHART_RENDERERS = ['Imagen (matplotlib)', 'Nativo (Streamlit)']
+
+# --- Perfilado ---
+# Apagado por defecto. Se activa para todo el proceso con PLANNER_PROFILING=1 o
+# para una sesión con ?tiempos=1; ?diagnostico=1 además muestra el panel de
+# tiempos en la barra lateral.
+SHOW_DIAGNOSTICS = st.query_params.get('diagnostico') == '1'
+PROFILING_ACTIVE = profiling_enabled_by_env() or SHOW_DIAGNOSTICS or st.query_params.get('tiempos') == '1'
+if 'profiling_session' not in st.session_state:
+    st.session_state.profiling_session = f"{random.getrandbits(32):08x}"
+PROFILER.begin_rerun(st.session_state.profiling_session, enabled=PROFILING_ACTIVE)
+
+# --- Perfil Activo ---
+# Cada perfil (persona u hogar) es un shard de datos independiente. Las
+# sesiones que eligen el mismo perfil comparten sus stores en memoria.
+def add_profile():
+    try:
+        st.session_state.profile = create_profile(st.session_state.new_profile_name)
+        st.session_state.new_profile_name = ''
+    except ValueError as exc:
+        st.session_state.profile_error = str(exc)
+
+profile = st.sidebar.selectbox("Perfil", list_profiles(), key='profile')
+with st.sidebar.expander("Nuevo perfil"):
+    st.text_input("Nombre", key='new_profile_name')
+    st.button("Crear perfil", on_click=add_profile)
+    if 'profile_error' in st.session_state:
+        st.error(st.session_state.pop('profile_error'))
+
+# --- Objetivos ---
+# Objetivos, metas y pesos salen de objectives_config.json (ver
+# planner_objectives.py), que se relee sólo si cambió. Si el archivo tiene
+# errores se avisa y se usan los valores por defecto.
+try:
+    objectives = load_objectives()
+except ValueError as exc:
+    st.sidebar.error(f"Configuración de objetivos inválida: {exc}")
+    objectives = ObjectivesConfig.defaults()
 
 # --- Funciones para Guardar y Cargar Datos ---
-def save_main_data(dataframe):
-    temp_df = dataframe.copy()
-    if 'Fecha' in temp_df.columns:
-        temp_df['Fecha'] = temp_df['Fecha'].astype(str)
-    temp_df.to_csv(DATA_FILE, index=False)
-
-def load_financial_data():
-    if os.path.exists(FINANCIAL_DATA_FILE):
-        financial_df = pd.read_csv(FINANCIAL_DATA_FILE)
-        financial_df['Fecha'] = pd.to_datetime(financial_df['Fecha']).dt.date
-        return financial_df
+# Un único store por perfil y por proceso: el journal, los agregados y la
+# compactación en segundo plano se comparten entre reruns y sesiones, así que
+# la memoria crece con la cantidad de perfiles y no con la de pestañas.
+# Salud y proyectos se guardan como eventos de cambio de estado, no como
+# columnas de cada día. Los stores quedan atados a las columnas de la
+# configuración (schema_hash): si cambian, se abren de nuevo.
+@st.cache_resource
+def get_status_log(profile=DEFAULT_PROFILE, schema_hash=None):
+    return open_status_log(profile, objectives=objectives)
+
+@st.cache_resource
+def get_planner_store(profile=DEFAULT_PROFILE, schema_hash=None):
+    # La configuración diaria se compila a dtypes una sola vez por perfil
+    # Los meses anteriores a los ARCHIVE_HOT_MONTHS más recientes se archivan solos
+    return open_planner_store(profile, get_status_log(profile, schema_hash), STORAGE_FORMAT, FLUSH_INTERVAL_MS,
+                              hot_months=ARCHIVE_HOT_MONTHS, objectives=objectives)
+
+@st.cache_resource
+def get_open_schemas():
+    # {perfil: schema_hash con el que están abiertos sus stores}
+    return {}
+
+def open_profile_stores(profile):
+    open_schemas = get_open_schemas()
+    previous = open_schemas.get(profile)
+    if previous is not None and previous != objectives.schema_hash:
+        # Cambiaron las columnas: lo pendiente se escribe y los stores viejos se descartan
+        get_planner_store(profile, previous).close()
+        get_planner_store.clear(profile, previous)
+        get_status_log.clear(profile, previous)
+    open_schemas[profile] = objectives.schema_hash
+    return get_planner_store(profile, objectives.schema_hash), get_status_log(profile, objectives.schema_hash)
+
+planner_store, status_log = open_profile_stores(profile)
+
+def save_main_data():
+    # Encola el guardado: el escritor en segundo plano agrega al journal sólo
+    # las filas marcadas como modificadas
+    planner_store.save()
+
+def set_main_value(day, col_name, value):
+    # Marca la fila como modificada sólo si el valor realmente cambió
+    planner_store.set_value(day, col_name, value)
+
+def on_planner_widget_change(day, col_name, key):
+    set_main_value(day, col_name, st.session_state[key])
+
+def planner_widget(day, col_name, current_value, key, on_change=on_planner_widget_change):
+    # El store manda: el widget se sincroniza con el valor guardado en cada
+    # rerun y sólo escribe cuando el usuario lo cambia, así un widget de esta
+    # sesión no pisa lo que otra sesión (u otro perfil) guardó mientras tanto.
+    st.session_state[key] = current_value
+    return {'key': key, 'on_change': on_change, 'args': (day, col_name, key)}
+
+@st.cache_resource
+def get_transaction_store(profile=DEFAULT_PROFILE):
+    return open_transaction_store(profile, STORAGE_FORMAT)
+
+# Aperturas y cierres de cada mes, encadenados y persistidos como instantáneas
+@st.cache_resource
+def get_balance_ledger(profile=DEFAULT_PROFILE):
+    return open_balance_ledger(profile)
+
+def current_ledger(transaction_store):
+    return refresh_ledger(get_balance_ledger(profile), planner_store, transaction_store, today)
+
+# Líneas de base de gastos (por categoría y mes, y por día) de todo el
+# historial; una transacción del mes en curso sólo recalcula ese mes
+@st.cache_resource
+def get_spending_monitor(profile=DEFAULT_PROFILE):
+    return SpendingMonitor()
+
+def current_spending_monitor(transaction_store):
+    return refresh_spending_monitor(get_spending_monitor(profile), transaction_store, today)
+
+# Puntajes de todos los meses, recalculados sólo si cambian la
+# configuración, el planner o los estados
+@st.cache_resource
+def get_progress_scorer(profile=DEFAULT_PROFILE):
+    return ProgressScorer()
+
+def current_progress():
+    return progress_table(planner_store, status_log, objectives, today, get_progress_scorer(profile))
+
+@st.cache_resource
+def get_import_hash_index(profile=DEFAULT_PROFILE):
+    return ImportHashIndex(profile_path(profile, IMPORT_HASH_DB_FILE))
+
+
+# Cache de PNGs compartido por todas las sesiones, acotado en memoria
+@st.cache_resource
+def get_chart_cache():
+    return ChartCache()
+
+def show_chart(spec):
+    if chart_renderer == CHART_RENDERERS[1]:
+        if spec.kind == 'bar':
+            st.bar_chart(spec.to_frame())
+        else:
+            st.line_chart(spec.to_frame())
     else:
-        return pd.DataFrame(columns=['Fecha', 'Tipo', 'Categoría', 'Monto', 'Descripción'])
+        st.image(get_chart_cache().get_png(spec))
 
-def save_financial_data(financial_df_to_save): 
-    financial_df_to_save['Fecha'] = financial_df_to_save['Fecha'].astype(str)
-    financial_df_to_save.to_csv(FINANCIAL_DATA_FILE, index=False)
 
+def on_status_widget_change(log, day, item, key):
+    log.set_state(item, day, st.session_state[key])
 
-# --- Cargar/Inicializar el DataFrame Principal ---
-# TODO: Verificar si esta indentación es la causa raíz
-if os.path.exists(DATA_FILE):
-    df = pd.read_csv(DATA_FILE)
-    df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce').dt.date
-    df.dropna(subset=['Fecha'], inplace=True)
-    
-    for col_name in APP_COLUMNS_NAMES:
-        if col_name == 'Fecha':
-            continue
-        
-        config = APP_OBJECTIVES_CONFIG.get(col_name)
-        if not config: 
-            continue
-
-        col_type = config['type']
-        
-        if col_name not in df.columns:
-            if col_type == 'bool':
-                df[col_name] = False
-            elif col_type == 'float':
-                df[col_name] = config.get('default', 0.0)
-            elif col_type == 'int':
-                df[col_name] = config.get('default', 0)
-            elif col_type == 'str':
-                df[col_name] = config.get('options', [''])[0] if config.get('options') else ''
+def status_widget(item, key):
+    # Igual que planner_widget, pero contra el registro de eventos de estado
+    st.session_state[key] = status_log.current(item)
+    return {'key': key, 'on_change': on_status_widget_change, 'args': (status_log, today, item, key)}
+
+def show_status_history(items):
+    history = status_log.history()
+    history = history[history['Ítem'].isin(items)]
+    with st.expander("Historial de cambios"):
+        if history.empty:
+            st.info("Todavía no hay cambios registrados.")
         else:
-            if col_type == 'bool':
-                df[col_name] = df[col_name].fillna(False).astype(bool)
-            elif col_type == 'float':
-                df[col_name] = pd.to_numeric(df[col_name], errors='coerce').fillna(config.get('default', 0.0))
-            elif col_type == 'int':
-                df[col_name] = pd.to_numeric(df[col_name], errors='coerce').fillna(config.get('default', 0)).astype(int)
-
-else: # Este 'else' debe estar al mismo nivel que el 'if os.path.exists'
-    initial_data = {col: [] for col in APP_COLUMNS_NAMES}
-    df = pd.DataFrame(initial_data)
-    
-    for col_name in APP_COLUMNS_NAMES:
-        if col_name == 'Fecha':
-            continue
-        config = APP_OBJECTIVES_CONFIG.get(col_name)
-        if config:
-            col_type = config['type']
-            if col_type == 'bool':
-                df[col_name] = False
-            elif col_type == 'float':
-                df[col_name] = config.get('default', 0.0)
-            elif col_type == 'int':
-                df[col_name] = config.get('default', 0)
-            elif col_type == 'str':
-                df[col_name] = config.get('options', [''])[0] if config.get('options') else ''
-
-# Cargar los datos financieros al inicio del script.
-# Este bloque DEBE estar al mismo nivel que la carga/inicialización de df.
-if 'financial_df' not in st.session_state:
-    st.session_state.financial_df = load_financial_data() 
+            st.dataframe(history.iloc[::-1].set_index('Fecha'))
+
+
+# --- Cargar/Inicializar el DataFrame Principal ---
+# El store devuelve el frame ya tipado según el esquema compilado e indexado
+# por fecha, y lo mantiene en memoria mientras los archivos no cambien. Sólo
+# lo piden las secciones que lo usan.
+def load_planner():
+    planner = planner_store.load()
+    if not planner.has_day(today):
+        planner_store.ensure_day(today)
+        save_main_data()
+    return planner
 
 # --- Título de la Aplicación ---
 st.title("🗓️ Mi Planner Mensual Interactivo")
 
-# Obtener la fecha de hoy y el inicio del mes actual
-# Estos también deben estar al mismo nivel global.
-today = datetime.now().date()
-current_month_start = datetime(today.year, today.month, 1).date()
+chart_renderer = st.sidebar.radio("Motor de Gráficos", CHART_RENDERERS, key='chart_renderer')
 
-# --- Pestañas de Navegación ---
-# Esta definición también debe estar al mismo nivel global.
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "Seguimiento Diario", "Salud / Turnos", "Proyectos", 
-    "Control Financiero", "Resumen y Bonificación", "Mi Guía Espiritual"
-])
+# Obtener la fecha de hoy (los límites del mes los calcula el motor)
+# Esto también debe estar al mismo nivel global.
+today = datetime.now().date()
 
 # --- Pestaña 1: Seguimiento Diario ---
-with tab1:
+def render_daily():
     st.header("Seguimiento Diario")
 
-    if today not in df['Fecha'].values:
-        new_row_data = {'Fecha': today}
-        for col_name, config in APP_OBJECTIVES_CONFIG.items():
-            if col_name == 'Fecha': continue 
-            if config['type'] == 'bool':
-                new_row_data[col_name] = False
-            elif config['type'] == 'float':
-                new_row_data[col_name] = config.get('default', 0.0)
-            elif config['type'] == 'int':
-                new_row_data[col_name] = config.get('default', 0)
-            elif config['type'] == 'str':
-                 new_row_data[col_name] = config.get('options', [''])[0] if config.get('options') else ''
-        
-        new_row = pd.DataFrame([new_row_data])
-        df = pd.concat([df, new_row], ignore_index=True).sort_values(by='Fecha', ascending=True).reset_index(drop=True)
-        save_main_data(df)
-
-    row_index = df[df['Fecha'] == today].index[0]
+    planner = load_planner()
 
     st.write(f"### Hoy es: {today.strftime('%d/%m/%Y')}")
 
     daily_columns_for_display = []
-    for col_name, config in APP_OBJECTIVES_CONFIG.items():
+    for col_name, config in objectives.objectives.items():
         if config['section'] == 'daily':
-            current_value = df.loc[row_index, col_name]
+            current_value = planner.get(today, col_name)
             if config['type'] == 'bool':
-                new_value = st.checkbox(config['display'], value=current_value, key=f'daily_{col_name}')
-                df.loc[row_index, col_name] = new_value
+                st.checkbox(config['display'], **planner_widget(today, col_name, bool(current_value), f'daily_{col_name}'))
             elif config['type'] == 'float':
-                new_value = st.number_input(config['display'], value=float(current_value), min_value=0.0, step=config.get('step', 0.5), key=f'daily_{col_name}')
-                df.loc[row_index, col_name] = new_value
+                st.number_input(config['display'], min_value=0.0, step=config.get('step', 0.5), **planner_widget(today, col_name, float(current_value), f'daily_{col_name}'))
             elif config['type'] == 'int':
-                new_value = st.number_input(config['display'], value=int(current_value), min_value=0, step=config.get('step', 1), key=f'daily_{col_name}')
-                df.loc[row_index, col_name] = new_value
+                st.number_input(config['display'], min_value=0, step=config.get('step', 1), **planner_widget(today, col_name, int(current_value), f'daily_{col_name}'))
             daily_columns_for_display.append(col_name)
 
     st.write("---")
     st.subheader("Registro Diario (últimos 7 días)")
-    df_display = df.tail(7)[['Fecha'] + daily_columns_for_display].copy()
-    df_display['Fecha'] = df_display['Fecha'].astype(str)
-    st.dataframe(df_display.set_index('Fecha'))
+    df_display = planner.tail(7)[daily_columns_for_display].copy()
+    df_display.index = df_display.index.strftime('%Y-%m-%d')
+    st.dataframe(df_display)
 
-    save_main_data(df)
+    save_main_data()
 
 
 # --- Pestaña 2: Salud / Turnos ---
-with tab2:
+def render_health():
     st.header("Salud / Turnos")
     st.subheader("Marcar Turnos Completados:")
 
-    if not df.empty:
-        current_day_row_index = df[df['Fecha'] == today].index[0]
-        for col_name, config in APP_OBJECTIVES_CONFIG.items():
-            if config['section'] == 'health' and config['type'] == 'bool':
-                current_value = df.loc[current_day_row_index, col_name]
-                new_value = st.checkbox(f"✅ {config['display']}", value=current_value, key=f'health_{col_name}')
-                df.loc[current_day_row_index, col_name] = new_value
-    else:
-        st.info("Aún no hay datos. Registra algo en 'Seguimiento Diario' para que aparezcan las opciones de salud.")
-    save_main_data(df)
+    health_items = []
+    for col_name, config in objectives.objectives.items():
+        if config['section'] == 'health' and config['type'] == 'bool':
+            st.checkbox(f"✅ {config['display']}", **status_widget(col_name, f'health_{col_name}'))
+            completed_on = status_log.reached_on(col_name, True)
+            if completed_on:
+                st.caption(f"Completado el {pd.Timestamp(completed_on).strftime('%d/%m/%Y')}")
+            health_items.append(col_name)
+    show_status_history(health_items)
 
 # --- Pestaña 3: Proyectos ---
-with tab3:
+def render_projects():
     st.header("Proyectos")
     st.subheader("Estado de Proyectos:")
 
-    if not df.empty:
-        current_day_row_index = df[df['Fecha'] == today].index[0]
-        for col_name, config in APP_OBJECTIVES_CONFIG.items():
-            if config['section'] == 'projects' and config['type'] == 'str':
-                current_value = df.loc[current_day_row_index, col_name]
-                option = st.selectbox(f"**{config['display']}**", config['options'], index=config['options'].index(current_value), key=f'project_{col_name}')
-                df.loc[current_day_row_index, col_name] = option
-    else:
-        st.info("Aún no hay datos. Registra algo en 'Seguimiento Diario' para que aparezcan las opciones de proyectos.")
-    save_main_data(df)
+    project_items = []
+    for col_name, config in objectives.objectives.items():
+        if config['section'] == 'projects' and config['type'] == 'str':
+            st.selectbox(f"**{config['display']}**", config['options'], **status_widget(col_name, f'project_{col_name}'))
+            completed_on = status_log.reached_on(col_name, PROJECT_DONE_STATE)
+            if completed_on:
+                st.caption(f"Completado el {pd.Timestamp(completed_on).strftime('%d/%m/%Y')}")
+            project_items.append(col_name)
+    show_status_history(project_items)
 
 # --- Pestaña 4: Control Financiero ---
-with tab4:
+def render_finance():
     st.header("💰 Control Financiero")
 
+    planner = load_planner()
+    transaction_store = get_transaction_store(profile)
+
     # --- Balance Inicial ---
+    # La apertura del mes es el cierre del anterior; un valor cargado a mano
+    # la reemplaza para este mes y los siguientes se encadenan desde ahí
     st.subheader("Configuración de Balance Inicial")
-    row_index = df[df['Fecha'] == today].index[0] 
-    
-    balance_inicial_config = APP_OBJECTIVES_CONFIG['Balance_Inicial']
-    current_balance_inicial = df.loc[row_index, 'Balance_Inicial']
+    balance_inicial_config = objectives.objectives['Balance_Inicial']
+    month_ledger = current_ledger(transaction_store).month(today)
+    current_balance_inicial = month_ledger['Apertura'] if month_ledger else 0.0
+
+    def on_balance_inicial_change(day, col_name, key):
+        # La marca hace que un balance de 0 también cuente como cargado
+        on_planner_widget_change(day, col_name, key)
+        set_main_value(day, MANUAL_MARKERS[col_name], True)
+        save_main_data()
+        st.session_state.balance_inicial_updated = True
+
+    def clear_balance_inicial():
+        # Vuelve al automático: se borran los valores manuales de este mes
+        for day in manual_values(planner.month(today), 'Balance_Inicial').index:
+            set_main_value(day, 'Balance_Inicial', 0.0)
+            set_main_value(day, MANUAL_MARKERS['Balance_Inicial'], False)
+        save_main_data()
 
     new_balance_inicial = st.number_input(
         balance_inicial_config['display'],
-        value=float(current_balance_inicial),
-        min_value=0.0,
         step=100.0,
-        key='set_balance_inicial'
+        **planner_widget(today, 'Balance_Inicial', float(current_balance_inicial), 'set_balance_inicial', on_balance_inicial_change)
     )
-    if new_balance_inicial != current_balance_inicial:
-        df.loc[row_index, 'Balance_Inicial'] = new_balance_inicial
-        save_main_data(df)
+    if st.session_state.pop('balance_inicial_updated', False):
         st.success(f"Balance inicial actualizado a ${new_balance_inicial:.2f}")
+    if month_ledger and month_ledger['Manual']:
+        st.caption("Cargado a mano para este mes.")
+        st.button("Usar el cierre del mes anterior", on_click=clear_balance_inicial, key='clear_balance_inicial')
+    else:
+        st.caption("Tomado automáticamente del cierre del mes anterior.")
 
     st.write("---")
 
@@ -264,75 +344,113 @@ with tab4:
             if trans_amount <= 0:
                 st.error("El monto debe ser mayor que cero.")
             else:
-                new_transaction = pd.DataFrame([{
-                    'Fecha': trans_date,
-                    'Tipo': trans_type,
-                    'Categoría': trans_category,
-                    'Monto': trans_amount,
-                    'Descripción': trans_description
-                }])
-                
-                # Acceder al financial_df desde st.session_state
-                st.session_state.financial_df = pd.concat([st.session_state.financial_df, new_transaction], ignore_index=True)
-                save_financial_data(st.session_state.financial_df) 
+                # Un INSERT indexado; el resumen de abajo ya lo ve en este mismo rerun
+                transaction_store.add(trans_date, trans_type, trans_category, trans_amount, trans_description)
                 st.success("Transacción guardada exitosamente!")
-                st.experimental_rerun() 
+                if trans_type == "Gasto":
+                    show_expense_alerts(transaction_store, trans_date, trans_category)
+
+    # --- Importar Extractos Bancarios ---
+    with st.expander("📥 Importar Extracto Bancario (CSV / OFX)"):
+        uploaded_statement = st.file_uploader("Archivo exportado del banco", type=['csv', 'ofx'], key='import_file')
+        is_ofx = uploaded_statement is not None and uploaded_statement.name.lower().endswith('.ofx')
+        import_mapping = None
+        if uploaded_statement is not None and not is_ofx:
+            col_a, col_b, col_c = st.columns(3)
+            fecha_col = col_a.text_input("Columna de fecha", value='Fecha', key='import_col_fecha')
+            monto_col = col_b.text_input("Columna de monto", value='Monto', key='import_col_monto')
+            descripcion_col = col_c.text_input("Columna de descripción", value='Descripción', key='import_col_descripcion')
+            separador = col_a.selectbox("Separador", [',', ';', 'Tabulación'], key='import_sep')
+            decimal = col_b.selectbox("Separador decimal", ['.', ','], key='import_decimal')
+            dayfirst = col_c.checkbox("Fechas con el día primero (DD/MM/AAAA)", value=True, key='import_dayfirst')
+            import_mapping = ColumnMapping(
+                fecha=fecha_col, monto=monto_col, descripcion=descripcion_col,
+                sep='\t' if separador == 'Tabulación' else separador, decimal=decimal,
+                thousands='.' if decimal == ',' else None, dayfirst=dayfirst
+            )
+        if uploaded_statement is not None and st.button("Importar Movimientos", key='import_button'):
+            try:
+                # Un commit por bloque y ningún rerun: el resumen de abajo ya los incluye
+                import_result = import_statement(
+                    uploaded_statement, transaction_store, get_import_hash_index(profile),
+                    kind='ofx' if is_ofx else 'csv', mapping=import_mapping,
+                    rules=load_category_rules(CATEGORY_RULES_FILE)
+                )
+            except ValueError as exc:
+                st.error(f"No se pudo importar el extracto: {exc}")
+            else:
+                st.success(
+                    f"Se importaron {import_result['importadas']} transacciones "
+                    f"({import_result['duplicadas']} duplicadas y {import_result['invalidas']} inválidas omitidas)."
+                )
 
     st.write("---")
 
     # --- Resumen Financiero ---
     st.subheader("Resumen del Mes")
     
-    # current_month_start está definido globalmente arriba.
-    # Acceder a financial_df desde st.session_state
-    financial_df_month = st.session_state.financial_df[st.session_state.financial_df['Fecha'] >= current_month_start].copy() 
-
-    total_ingresos = financial_df_month[financial_df_month['Tipo'] == 'Ingreso']['Monto'].sum()
-    total_gastos = financial_df_month[financial_df_month['Tipo'] == 'Gasto']['Monto'].sum()
-    
-    balance_actual = current_balance_inicial + total_ingresos - total_gastos
+    # Los totales salen de consultas sobre los índices (tipo, fecha); apertura
+    # y cierre, del libro de balances (actualizado con lo registrado en este rerun)
+    ledger = current_ledger(transaction_store)
+    resumen_mes = finance_summary(transaction_store, ledger, today)
+    total_ingresos = resumen_mes['ingresos']
+    total_gastos = resumen_mes['gastos']
+    current_balance_inicial = resumen_mes['apertura']
+    balance_actual = resumen_mes['cierre']
 
     st.metric(label="Balance Inicial del Mes", value=f"${current_balance_inicial:.2f}")
     st.metric(label="Total Ingresos (este mes)", value=f"${total_ingresos:.2f}", delta=f"${total_ingresos:.2f}")
     st.metric(label="Total Gastos (este mes)", value=f"${total_gastos:.2f}", delta=f"- ${total_gastos:.2f}")
     st.metric(label="Balance Actual", value=f"${balance_actual:.2f}")
 
+    balance_date = st.date_input("Consultar el balance al", value=today, key='balance_date')
+    balance_at_date = ledger.balance_at(balance_date, transaction_store.range_index())
+    if balance_at_date is None:
+        st.info("No hay movimientos registrados hasta esa fecha.")
+    else:
+        st.write(f"Balance al {balance_date.strftime('%d/%m/%Y')}: **${balance_at_date:.2f}**")
+
+    # Un punto por mes leído de las instantáneas, sin recorrer transacciones
+    balance_history = ledger.history()
+    if len(balance_history) > 1:
+        st.write("#### Evolución del Balance (cierre de cada mes)")
+        show_chart(ChartSpec(
+            'line', balance_history.index, balance_history['Cierre'],
+            title="Balance al Cierre del Mes", xlabel="Mes", ylabel="Monto ($)", marker='o', grid=True
+        ))
+
     st.write("---")
     st.subheader("Gráficos de Gastos")
 
-    if not financial_df_month.empty and total_gastos > 0:
-        gastos_por_categoria = financial_df_month[financial_df_month['Tipo'] == 'Gasto'].groupby('Categoría')['Monto'].sum().sort_values(ascending=False)
-        
+    if total_gastos > 0:
+        gastos_por_categoria = resumen_mes['gastos_por_categoria']
+
         st.write("#### Gastos por Categoría (este mes)")
-        fig_cat, ax_cat = plt.subplots(figsize=(10, 6))
-        gastos_por_categoria.plot(kind='bar', ax=ax_cat, color='salmon')
-        ax_cat.set_title("Distribución de Gastos por Categoría")
-        ax_cat.set_xlabel("Categoría")
-        ax_cat.set_ylabel("Monto ($)")
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        st.pyplot(fig_cat)
-
-        if len(financial_df_month['Fecha'].unique()) > 1:
-            gastos_por_dia = financial_df_month[financial_df_month['Tipo'] == 'Gasto'].groupby('Fecha')['Monto'].sum()
+        show_chart(ChartSpec(
+            'bar', gastos_por_categoria.index, gastos_por_categoria.values,
+            title="Distribución de Gastos por Categoría", xlabel="Categoría", ylabel="Monto ($)",
+            color='salmon', figsize=(10, 6), xtick_ha='right'
+        ))
+
+        gastos_por_dia = resumen_mes['gastos_por_dia']
+        if len(gastos_por_dia) > 1:
             st.write("#### Tendencia de Gastos Diarios (este mes)")
-            fig_day, ax_day = plt.subplots(figsize=(10, 4))
-            ax_day.plot(gastos_por_dia.index, gastos_por_dia.values, marker='o', linestyle='-')
-            ax_day.set_title("Gastos Diarios")
-            ax_day.set_xlabel("Fecha")
-            ax_day.set_ylabel("Monto ($)")
-            ax_day.grid(True)
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            st.pyplot(fig_day)
+            show_chart(ChartSpec(
+                'line', gastos_por_dia.index, gastos_por_dia.values,
+                title="Gastos Diarios", xlabel="Fecha", ylabel="Monto ($)", marker='o', grid=True
+            ))
 
     else:
         st.info("Aún no hay gastos registrados este mes para mostrar gráficos.")
 
+    st.write("---")
+    st.subheader("🚨 Presupuestos y Alertas")
+    show_budgets_and_alerts(transaction_store)
+
     st.write("---")
     st.subheader("Historial de Transacciones")
-    if not st.session_state.financial_df.empty: # Acceder desde session_state
-        st.dataframe(st.session_state.financial_df.sort_values(by='Fecha', ascending=False).reset_index(drop=True))
+    if not transaction_store.is_empty():
+        show_transaction_history(transaction_store)
     else:
         st.info("Aún no hay transacciones registradas.")
 
@@ -351,88 +469,137 @@ with tab4:
     st.info(random.choice(financial_tips))
 
 
+# Alertas de un gasto recién guardado: anomalías de su categoría y de su día
+# (contra líneas de base ya calculadas) y presupuesto superado
+def show_expense_alerts(transaction_store, day, categoria):
+    monitor = current_spending_monitor(transaction_store)
+    for alert in monitor.check(day, categoria):
+        st.warning(alert)
+    budget = load_budgets(budgets_path(profile)).get(categoria)
+    spent = monitor.month_spent(day).get(categoria, 0.0)
+    if budget and spent > budget:
+        st.error(f"Superaste el presupuesto de {categoria}: ${spent:.2f} de ${budget:.2f}.")
+
+
+def show_budgets_and_alerts(transaction_store):
+    monitor = current_spending_monitor(transaction_store)
+    path = budgets_path(profile)
+    budgets = load_budgets(path)
+
+    with st.expander("Editar presupuestos mensuales"):
+        budget_categories = sorted(set(monitor.categories) | set(budgets))
+        if not budget_categories:
+            st.info("Registrá algún gasto para asignarle un presupuesto a su categoría.")
+        else:
+            with st.form("budgets_form"):
+                budget_columns = st.columns(3)
+                new_budgets = {
+                    categoria: budget_columns[i % 3].number_input(
+                        categoria, min_value=0.0, step=100.0, value=float(budgets.get(categoria, 0.0)), key=f'budget_{categoria}'
+                    )
+                    for i, categoria in enumerate(budget_categories)
+                }
+                if st.form_submit_button("Guardar Presupuestos"):
+                    save_budgets(path, new_budgets)
+                    budgets = load_budgets(path)
+                    st.success("Presupuestos guardados.")
+
+    if budgets:
+        status = budget_status(monitor.month_spent(today), budgets, today)
+        for categoria, row in status[status['Estado'] == 'Excedido'].iterrows():
+            st.error(f"{categoria}: gastaste ${row['Gastado']:.2f} de un presupuesto de ${row['Presupuesto']:.2f}.")
+        for categoria, row in status[status['Estado'] == 'En riesgo'].iterrows():
+            st.warning(f"{categoria}: a este ritmo cerrarías el mes en ${row['Proyección']:.2f} (presupuesto ${row['Presupuesto']:.2f}).")
+        st.dataframe(status, column_config={
+            'Uso': st.column_config.ProgressColumn("Uso", format='percent', min_value=0.0, max_value=1.0),
+        })
+    else:
+        st.caption("Sin presupuestos cargados.")
+
+    category_alerts = monitor.category_alerts(months=1)
+    day_alerts = monitor.day_alerts()
+    if category_alerts.empty and day_alerts.empty:
+        st.success("No se detectaron gastos inusuales este mes.")
+    for row in category_alerts.itertuples(index=False):
+        st.warning(
+            f"{row.Categoría}: ${row.Gasto:.2f} este mes, contra una mediana de ${row.Mediana:.2f} en los meses anteriores."
+        )
+    if not day_alerts.empty:
+        st.write("#### Días con Gasto Inusual (últimos 30 días)")
+        st.dataframe(day_alerts, hide_index=True)
+    with st.expander("Historial de alertas por categoría"):
+        st.dataframe(monitor.category_alerts(), hide_index=True)
+
+
+# Historial paginado: el filtrado y el orden los resuelve el store (índices
+# por fecha, tipo y categoría, e índice invertido de la descripción) y al
+# navegador sólo viaja la página visible
+def show_transaction_history(transaction_store):
+    col_a, col_b, col_c = st.columns(3)
+    tipo = col_a.selectbox("Tipo", ["Todos", "Gasto", "Ingreso"], key='hist_tipo')
+    categorias = col_b.multiselect(
+        "Categorías", transaction_store.categories(None if tipo == "Todos" else tipo), key='hist_categorias'
+    )
+    texto = col_c.text_input("Buscar en la descripción", key='hist_texto')
+    col_d, col_e = st.columns(2)
+    monto_min = col_d.number_input("Monto mínimo ($)", min_value=0.0, step=10.0, key='hist_monto_min')
+    monto_max = col_e.number_input("Monto máximo ($, 0 = sin límite)", min_value=0.0, step=10.0, key='hist_monto_max')
+    filters = HistoryFilter(
+        tipo=None if tipo == "Todos" else tipo, categorias=categorias, texto=texto,
+        monto_min=monto_min or None, monto_max=monto_max or None,
+    )
+
+    # Cambiar un filtro vuelve a la primera página
+    filter_key = (tipo, tuple(categorias), texto, monto_min, monto_max)
+    if st.session_state.get('hist_filter_key') != filter_key:
+        st.session_state.hist_filter_key = filter_key
+        st.session_state.hist_page = 1
+    page = st.session_state.get('hist_page', 1)
+    page_df, total = transaction_store.history_page(filters, offset=(page - 1) * HISTORY_PAGE_SIZE)
+    pages = max(1, -(-total // HISTORY_PAGE_SIZE))
+    if page > pages:
+        page = st.session_state.hist_page = pages
+        page_df, total = transaction_store.history_page(filters, offset=(page - 1) * HISTORY_PAGE_SIZE)
+
+    if total == 0:
+        st.info("Ninguna transacción coincide con los filtros.")
+        return
+    st.dataframe(page_df, hide_index=True)
+    col_page, col_info = st.columns([1, 3])
+    col_page.number_input("Página", min_value=1, max_value=pages, step=1, key='hist_page')
+    col_info.caption(f"{total} transacciones · página {page} de {pages}")
+
+
 # --- Pestaña 5: Resumen y Bonificación ---
-with tab5: 
+def render_summary():
     st.header("Resumen y Bonificación")
 
+    planner = load_planner()
+
     st.subheader("Progreso General del Mes:")
 
-    df_current_month = df[df['Fecha'] >= current_month_start].copy()
-
-    if not df_current_month.empty:
-        total_days_logged = len(df_current_month)
-        
-        category_progress = {}
-        
-        daily_quant_objectives = [
-            'Entrenamiento_Minutos', 'Agua_Litros', 'Meditacion_Minutos', 'Lectura_Paginas', 'Horas Extra'
-        ]
-        
-        for obj_name in daily_quant_objectives:
-            config = APP_OBJECTIVES_CONFIG[obj_name]
-            goal_monthly = config.get('goal_monthly')
-            goal_daily_avg = config.get('goal_daily_avg')
-            
-            current_value = df_current_month[obj_name].sum()
-            
-            if goal_monthly:
-                progress = min(current_value / goal_monthly, 1.0) if goal_monthly > 0 else 0
-                st.write(f"- **{config['display']}:** {current_value:.1f} (Meta: {goal_monthly:.1f}) - Progreso: {progress:.1%}")
-            elif goal_daily_avg:
-                avg_value = df_current_month[obj_name].mean() if total_days_logged > 0 else 0
-                progress = min(avg_value / goal_daily_avg, 1.0) if goal_daily_avg > 0 else 0
-                st.write(f"- **{config['display']} (promedio/día):** {avg_value:.1f} (Meta: {goal_daily_avg:.1f}) - Progreso: {progress:.1%}")
+    # Partición del mes por búsqueda binaria sobre el índice de fechas
+    df_current_month = planner.month(today)
+    # Sumas, promedios, estados y rachas de todos los meses salen de una sola
+    # pasada sobre los agregados materializados, cacheada entre reruns
+    progress = current_progress()
+    month_score = progress.month(today)
+
+    if not df_current_month.empty and month_score:
+
+        for obj_name, result in month_score['objectives'].items():
+            config = objectives.objectives[obj_name]
+            if result['kind'] == 'monthly':
+                st.write(f"- **{config['display']}:** {result['value']:.1f} (Meta: {result['goal']:.1f}) - Progreso: {result['progress']:.1%}")
+            elif result['kind'] == 'daily_avg':
+                st.write(f"- **{config['display']} (promedio/día):** {result['value']:.1f} (Meta: {result['goal']:.1f}) - Progreso: {result['progress']:.1%}")
             else:
-                progress = 0
-            
-            category_progress[obj_name] = progress
-            
-        bool_daily_objectives = ['Entrenamiento_Hecho', 'Comida Saludable']
-        for obj_name in bool_daily_objectives:
-            config = APP_OBJECTIVES_CONFIG[obj_name]
-            progress = df_current_month[obj_name].mean() if total_days_logged > 0 else 0
-            st.write(f"- **{config['display']} (promedio días):** {progress:.1%}")
-            category_progress[obj_name] = progress
-        
-        salud_completados = 0
-        health_objectives_list = [name for name, config in APP_OBJECTIVES_CONFIG.items() if config['section'] == 'health']
-        total_salud_objetivos = len(health_objectives_list)
-        if not df_current_month.empty:
-            last_month_row = df_current_month[df_current_month['Fecha'] == today].iloc[0] if today in df_current_month['Fecha'].values else df_current_month.iloc[-1]
-            for obj in health_objectives_list:
-                if last_month_row[obj]:
-                    salud_completados += 1
-        progreso_salud = salud_completados / total_salud_objetivos if total_salud_objetivos > 0 else 0
-        st.write(f"- **Objetivos de Salud Completados:** {salud_completados} de {total_salud_objetivos} - Progreso: {progreso_salud:.1%}")
-        category_progress['Salud_General'] = progreso_salud
-
-        proyectos_completados = 0
-        projects_objectives_list = [name for name, config in APP_OBJECTIVES_CONFIG.items() if config['section'] == 'projects']
-        total_proyectos = len(projects_objectives_list)
-        if not df_current_month.empty:
-            last_month_row = df_current_month[df_current_month['Fecha'] == today].iloc[0] if today in df_current_month['Fecha'].values else df_current_month.iloc[-1]
-            for proj in projects_objectives_list:
-                if last_month_row[proj] == 'Completado ✅':
-                    proyectos_completados += 1
-        progreso_proyectos = proyectos_completados / total_proyectos if total_proyectos > 0 else 0
-        st.write(f"- **Proyectos Completados:** {proyectos_completados} de {total_proyectos} - Progreso: {progreso_proyectos:.1%}")
-        category_progress['Proyectos_General'] = progreso_proyectos
-
-        pesos = {
-            'Entrenamiento_Minutos': 0.15,
-            'Entrenamiento_Hecho': 0.05,
-            'Comida Saludable': 0.10,
-            'Agua_Litros': 0.05,
-            'Horas Extra': 0.10,
-            'Meditacion_Minutos': 0.10,
-            'Lectura_Paginas': 0.10,
-            'Salud_General': 0.15,
-            'Proyectos_General': 0.20
-        }
-        
-        overall_progress = sum(category_progress.get(obj, 0) * pesos.get(obj, 0) for obj in pesos.keys())
-        total_weight = sum(pesos.values())
-        overall_progress = overall_progress / total_weight if total_weight > 0 else 0
+                st.write(f"- **{config['display']} (promedio días):** {result['progress']:.1%}")
+
+        st.write(f"- **Objetivos de Salud Completados:** {month_score['salud_completados']} de {month_score['total_salud']} - Progreso: {month_score['category_progress']['Salud_General']:.1%}")
+        st.write(f"- **Proyectos Completados:** {month_score['proyectos_completados']} de {month_score['total_proyectos']} - Progreso: {month_score['category_progress']['Proyectos_General']:.1%}")
+
+        overall_progress = month_score['overall']
 
         st.metric(label="Progreso General del Mes", value=f"{overall_progress:.1%}")
         st.progress(overall_progress)
@@ -442,56 +609,144 @@ with tab5:
 
         if not df_current_month.empty and 'Entrenamiento_Minutos' in df_current_month.columns:
             st.write("#### Minutos de Entrenamiento Diarios")
-            fig, ax = plt.subplots(figsize=(10, 4))
-            ax.plot(df_current_month['Fecha'], df_current_month['Entrenamiento_Minutos'], marker='o', linestyle='-')
-            ax.set_xlabel("Día del Mes")
-            ax.set_ylabel("Minutos")
-            ax.set_title("Registro de Minutos de Entrenamiento")
-            ax.grid(True)
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            st.pyplot(fig)
+            show_chart(ChartSpec(
+                'line', df_current_month.index.date, df_current_month['Entrenamiento_Minutos'],
+                title="Registro de Minutos de Entrenamiento", xlabel="Día del Mes", ylabel="Minutos", marker='o', grid=True
+            ))
 
+        agua_goal = objectives.objectives.get('Agua_Litros', {}).get('goal_daily_avg')
         if not df_current_month.empty and 'Agua_Litros' in df_current_month.columns:
             st.write("#### Litros de Agua Diarios")
-            fig, ax = plt.subplots(figsize=(10, 4))
-            ax.bar(df_current_month['Fecha'], df_current_month['Agua_Litros'], color='skyblue')
-            ax.axhline(y=APP_OBJECTIVES_CONFIG['Agua_Litros']['goal_daily_avg'], color='r', linestyle='--', label=f"Meta Diaria ({APP_OBJECTIVES_CONFIG['Agua_Litros']['goal_daily_avg']}L)")
-            ax.set_xlabel("Día del Mes")
-            ax.set_ylabel("Litros")
-            ax.set_title("Consumo de Agua Diario")
-            ax.legend()
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            st.pyplot(fig)
+            show_chart(ChartSpec(
+                'bar', df_current_month.index.date, df_current_month['Agua_Litros'],
+                title="Consumo de Agua Diario", xlabel="Día del Mes", ylabel="Litros", color='skyblue',
+                hline=agua_goal,
+                hline_label=f"Meta Diaria ({agua_goal}L)" if agua_goal else None
+            ))
             
         if not df_current_month.empty and 'Horas Extra' in df_current_month.columns:
             st.write("#### Horas Extra Diarias")
-            fig, ax = plt.subplots(figsize=(10, 4))
-            ax.bar(df_current_month['Fecha'], df_current_month['Horas Extra'], color='lightgreen')
-            ax.set_xlabel("Día del Mes")
-            ax.set_ylabel("Horas")
-            ax.set_title("Registro de Horas Extra")
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            st.pyplot(fig)
+            show_chart(ChartSpec(
+                'bar', df_current_month.index.date, df_current_month['Horas Extra'],
+                title="Registro de Horas Extra", xlabel="Día del Mes", ylabel="Horas", color='lightgreen'
+            ))
 
         st.write("---")
         st.subheader("Bonificación:")
-        if overall_progress >= 0.85:
-            st.success("¡🎉 Felicidades! Has cumplido con al menos el 85% de tus objetivos.")
+        bonus_threshold = objectives.bonus_threshold
+        if month_score['bonus']:
+            st.success(f"¡🎉 Felicidades! Has cumplido con al menos el {bonus_threshold:.0%} de tus objetivos.")
             st.write("**Recompensa desbloqueada:** ¡Felicitaciones por tu esfuerzo! Aquí puedes escribir la recompensa que te diste.")
             st.markdown("---")
             st.balloons()
         else:
             st.info("Sigue trabajando. ¡Estás cerca de alcanzar tus metas!")
-            st.write(f"Necesitas un {0.85 - overall_progress:.1%} más para la bonificación del 85%.")
+            st.write(f"Necesitas un {bonus_threshold - overall_progress:.1%} más para la bonificación del {bonus_threshold:.0%}.")
+        if month_score['bonus_streak'] > 1:
+            st.write(f"🔥 {month_score['bonus_streak']} meses seguidos con bonificación.")
+
+        st.write("---")
+        st.subheader("Rachas:")
+        # Días seguidos cumpliendo cada objetivo diario
+        rachas = pd.DataFrame({
+            'Objetivo': [objectives.objectives[name]['display'] for name in progress.current_streaks.index],
+            'Racha Actual': progress.current_streaks.to_numpy(),
+            'Mejor Racha del Mes': [month_score['best_streaks'].get(name, 0) for name in progress.current_streaks.index],
+        }).set_index('Objetivo')
+        st.dataframe(rachas)
+
+        st.write("---")
+        st.subheader("Historial de Progreso Mensual:")
+        # Un puntaje por mes, de la misma pasada que el mes en curso
+        historial_progreso = progress.history()
+        historial_progreso['Progreso'] = historial_progreso['Progreso'].map(lambda value: f"{value:.1%}")
+        historial_progreso['Bonificación'] = historial_progreso['Bonificación'].map(lambda bonus: '🎉' if bonus else '')
+        st.dataframe(historial_progreso)
 
     else:
         st.info("Aún no hay datos para calcular el progreso. Empieza a registrar tus actividades.")
 
-# --- Pestaña 6: Mi Guía Espiritual ---
-with tab6: 
+# --- Pestaña 6: Análisis por Período ---
+def render_ranges():
+    st.header("📊 Análisis por Período")
+
+    presets = preset_ranges(today)
+    choice = st.selectbox("Período", list(presets) + ["Personalizado"], key='range_choice')
+    if choice == "Personalizado":
+        col_a, col_b = st.columns(2)
+        range_start = col_a.date_input("Desde", value=today - timedelta(days=29), key='range_start')
+        range_last = col_b.date_input("Hasta (incluido)", value=today, key='range_last')
+        range_end = range_last + timedelta(days=1)
+    else:
+        range_start, range_end = presets[choice]
+    if range_end <= range_start:
+        st.error("La fecha final tiene que ser igual o posterior a la inicial.")
+        return
+    compare = st.checkbox("Comparar con el período anterior", value=True, key='range_compare')
+    prev_start, prev_end = previous_range(range_start, range_end)
+    st.caption(
+        f"Del {range_start.strftime('%d/%m/%Y')} al {(range_end - timedelta(days=1)).strftime('%d/%m/%Y')}"
+        + (f" contra el {prev_start.strftime('%d/%m/%Y')} al {(prev_end - timedelta(days=1)).strftime('%d/%m/%Y')}" if compare else "")
+    )
+
+    # Cada total sale de dos lecturas en las sumas acumuladas por día
+    load_planner()
+    planner_totals = planner_store.ranges.totals(range_start, range_end)
+    planner_prev = planner_store.ranges.totals(prev_start, prev_end)
+
+    st.subheader("Objetivos Diarios")
+    days = planner_totals[DAYS_SERIES]
+    prev_days = planner_prev[DAYS_SERIES]
+    st.write(f"Días registrados: {days:.0f}" + (f" (período anterior: {prev_days:.0f})" if compare else ""))
+    objective_rows = []
+    for obj_name in planner_store.aggregates.sum_columns:
+        config = objectives.objectives[obj_name]
+        total = planner_totals[obj_name]
+        prev_total = planner_prev[obj_name]
+        if config['type'] == 'bool':
+            row = {'Objetivo': config['display'], 'Total': f"{total:.0f} días", 'Promedio': f"{total / days:.1%}" if days else '-'}
+            if compare:
+                row['Promedio anterior'] = f"{prev_total / prev_days:.1%}" if prev_days else '-'
+        else:
+            row = {'Objetivo': config['display'], 'Total': f"{total:.1f}", 'Promedio': f"{total / days:.1f}/día" if days else '-'}
+            if compare:
+                row['Promedio anterior'] = f"{prev_total / prev_days:.1f}/día" if prev_days else '-'
+        if compare:
+            row['Variación'] = f"{(total - prev_total) / prev_total:+.1%}" if prev_total else '-'
+        objective_rows.append(row)
+    st.dataframe(pd.DataFrame(objective_rows).set_index('Objetivo'))
+
+    st.write("---")
+    st.subheader("Finanzas")
+    finance_index = get_transaction_store(profile).range_index()
+    finance_totals = finance_breakdown(finance_index.totals(range_start, range_end))
+    finance_prev = finance_breakdown(finance_index.totals(prev_start, prev_end))
+    empty = pd.Series(dtype=float)
+
+    ingresos = finance_totals.get('Ingreso', empty).sum()
+    gastos = finance_totals.get('Gasto', empty).sum()
+    prev_ingresos = finance_prev.get('Ingreso', empty).sum()
+    prev_gastos = finance_prev.get('Gasto', empty).sum()
+    col_a, col_b, col_c = st.columns(3)
+    col_a.metric("Ingresos", f"${ingresos:.2f}", delta=f"${ingresos - prev_ingresos:.2f}" if compare else None)
+    col_b.metric("Gastos", f"${gastos:.2f}", delta=f"${gastos - prev_gastos:.2f}" if compare else None, delta_color='inverse')
+    col_c.metric("Neto", f"${ingresos - gastos:.2f}", delta=f"${(ingresos - gastos) - (prev_ingresos - prev_gastos):.2f}" if compare else None)
+
+    for tipo, title in (('Gasto', "Gastos por Categoría"), ('Ingreso', "Ingresos por Categoría")):
+        by_category = pd.DataFrame({'Período': finance_totals.get(tipo, empty)})
+        if compare:
+            by_category['Anterior'] = finance_prev.get(tipo, empty)
+        by_category = by_category.fillna(0.0)
+        by_category = by_category[(by_category != 0).any(axis=1)]
+        st.write(f"#### {title}")
+        if by_category.empty:
+            st.info("No hay movimientos en este período.")
+        else:
+            st.dataframe(by_category.sort_values(by='Período', ascending=False).rename_axis('Categoría'))
+
+
+# --- Pestaña 7: Mi Guía Espiritual ---
+def render_guide():
     st.header("✨ Mi Guía Espiritual de Objetivos Personales ✨")
     st.markdown("""
     Aquí encontrarás reflexiones y consejos para mantener tu mente y espíritu alineados con tus metas.
@@ -522,5 +777,67 @@ with tab6:
     Recuerda: **Eres el arquitecto de tu destino.** Cada acción que marques en este planner es un ladrillo más en la construcción de la persona que quieres ser.
     """)
 
+# --- Navegación ---
+# Cada sección es una unidad independiente. En modo 'secciones' sólo corre la
+# sección activa (carga de datos, consultas y gráficos incluidos); el modo
+# 'pestañas' conserva st.tabs, que ejecuta todas en cada rerun.
+# Cada página es un archivo de sections/ que llama al render de esta corrida
+# (guardado en session_state): con páginas de archivo, los tests y benchmarks
+# eligen la sección con AppTest.switch_page('sections/<sección>.py').
+SECTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sections')
+SECTIONS = [
+    ("Seguimiento Diario", render_daily, 'seguimiento'),
+    ("Salud / Turnos", render_health, 'salud'),
+    ("Proyectos", render_projects, 'proyectos'),
+    ("Control Financiero", render_finance, 'finanzas'),
+    ("Resumen y Bonificación", render_summary, 'resumen'),
+    ("Análisis por Período", render_ranges, 'periodos'),
+    ("Mi Guía Espiritual", render_guide, 'guia'),
+]
+
+def profiled_section(render, url_path):
+    def run_section():
+        with span(f'render:{url_path}'):
+            render()
+    return run_section
+
+if NAVIGATION_MODE == 'secciones':
+    st.session_state.section_renders = {url_path: profiled_section(render, url_path) for _, render, url_path in SECTIONS}
+    pages = [
+        st.Page(os.path.join(SECTIONS_DIR, f'{url_path}.py'), title=title, url_path=url_path, default=(i == 0))
+        for i, (title, render, url_path) in enumerate(SECTIONS)
+    ]
+    st.navigation(pages).run()
+else:
+    for tab, (title, render, url_path) in zip(st.tabs([title for title, _, _ in SECTIONS]), SECTIONS):
+        with tab:
+            profiled_section(render, url_path)()
+
 # Guardar los datos del planner principal al final
-save_main_data(df)
\ No newline at end of file
+save_main_data()
+if planner_store.last_write_error is not None:
+    st.sidebar.warning(f"No se pudieron guardar los últimos cambios, se reintentará: {planner_store.last_write_error}")
+PROFILER.end_rerun()
+
+# --- Panel de Diagnóstico (oculto) ---
+# Percentiles por span de esta sesión o de todo el proceso, y exportación en
+# JSON lines o en formato de traza de Chrome (chrome://tracing, Perfetto).
+def render_diagnostics():
+    with st.sidebar.expander("⏱️ Diagnóstico de Rendimiento", expanded=True):
+        scope = st.radio("Alcance", ["Esta sesión", "Todo el proceso"], key='diag_scope', horizontal=True)
+        session_id = st.session_state.profiling_session if scope == "Esta sesión" else None
+        summary = PROFILER.percentiles(session_id)
+        if not summary:
+            st.info("Todavía no hay reruns registrados.")
+            return
+        summary_df = pd.DataFrame.from_dict(summary, orient='index').sort_values(by='total', ascending=False)
+        st.caption("Tiempos en milisegundos; 'writer' es el guardado en segundo plano del planner")
+        st.dataframe(summary_df)
+        reruns = PROFILER.reruns(session_id)
+        st.download_button("Exportar JSONL", to_jsonl(reruns), file_name='planner_perfil.jsonl', mime='application/x-ndjson')
+        st.download_button("Exportar traza de Chrome", to_chrome_trace(reruns), file_name='planner_traza.json', mime='application/json')
+        if st.button("Borrar mediciones", key='diag_clear'):
+            PROFILER.clear(session_id)
+
+if SHOW_DIAGNOSTICS:
+    render_diagnostics()
\ No newline at end of file
@@ -0,0 +1,206 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+
+import pandas as pd
+
+from file_io import atomic_write_bytes, atomic_write_json, file_signature
+
+
+# --- Archivo de Meses Cerrados ---
+# Los meses viejos del planner no cambian, pero seguían en el archivo base y
+# se parseaban (y reescribían al compactar) en cada carga. El archivo los
+# guarda como segmentos inmutables, un CSV comprimido con gzip por mes
+# (AAAA-MM.csv.gz), en un directorio al lado de los datos. Un manifiesto
+# registra de cada segmento su checksum SHA-256, su tamaño y sus filas, más
+# un resumen precalculado del mes (agregados, valores por día para el índice
+# de rangos y últimos valores manuales), así los resúmenes de meses
+# archivados se sirven sin descomprimir nada.
+#
+# Un segmento nunca se reescribe: para editar un mes archivado se restaura
+# al archivo base y se lo vuelve a archivar después. Los meses restaurados
+# quedan retenidos: el archivado automático no los toca hasta que se los
+# archive a mano.
+ARCHIVE_DIR_SUFFIX = '_archive'
+MANIFEST_FILE = 'manifest.json'
+SEGMENT_SUFFIX = '.csv.gz'
+
+
+class MonthArchive:
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_FILE)
+        # Manifiesto ya leído, válido mientras no cambie su firma
+        self._manifest = None
+        self._manifest_signature = None
+
+    # --- Manifiesto ---
+    def signature(self):
+        return file_signature(self.manifest_path)
+
+    def manifest(self):
+        signature = self.signature()
+        if self._manifest is None or signature != self._manifest_signature:
+            manifest = {'months': {}}
+            if signature is not None:
+                with open(self.manifest_path, encoding='utf-8') as f:
+                    manifest = json.load(f)
+            self._manifest = manifest
+            self._manifest_signature = signature
+        return self._manifest
+
+    def _save_manifest(self, manifest):
+        atomic_write_json(manifest, self.manifest_path, sort_keys=True)
+        self._manifest = manifest
+        self._manifest_signature = self.signature()
+
+    def months(self):
+        return sorted(self.manifest()['months'])
+
+    def retained(self):
+        return set(self.manifest().get('retenidos', []))
+
+    def __contains__(self, month):
+        return month in self.manifest()['months']
+
+    def entry(self, month):
+        return self.manifest()['months'][month]
+
+    def segment_path(self, month):
+        return os.path.join(self.root, f"{month}{SEGMENT_SUFFIX}")
+
+    # --- Resúmenes precalculados ---
+    def aggregates(self):
+        # {mes: agregados mensuales} de los meses archivados
+        return {month: entry['agregados'] for month, entry in self.manifest()['months'].items()}
+
+    def day_values(self):
+        # Valores por día de los meses archivados (ver planner_day_values)
+        frames = [
+            pd.DataFrame(entry['diario']['valores'], index=pd.to_datetime(entry['diario']['fechas']),
+                         columns=entry['diario']['columnas'])
+            for entry in self.manifest()['months'].values()
+        ]
+        return pd.concat(frames).sort_index() if frames else pd.DataFrame()
+
+    def last_values(self, column):
+        # {mes: último valor cargado a mano de `column`} de los meses archivados
+        return {
+            month: entry['ultimos'][column]
+            for month, entry in self.manifest()['months'].items() if column in entry['ultimos']
+        }
+
+    # --- Segmentos ---
+    def write_month(self, month, month_df, summary):
+        if month in self:
+            raise ValueError(f"El mes {month} ya está archivado.")
+        os.makedirs(self.root, exist_ok=True)
+        # mtime=0: el mismo mes comprime siempre a los mismos bytes
+        data = gzip.compress(month_df.to_csv(index=False).encode('utf-8'), mtime=0)
+        atomic_write_bytes(data, self.segment_path(month))
+        manifest = self.manifest()
+        manifest['retenidos'] = sorted(self.retained() - {month})
+        manifest['months'][month] = {
+            'archivo': os.path.basename(self.segment_path(month)),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'bytes': len(data),
+            'filas': len(month_df),
+            **summary,
+        }
+        self._save_manifest(manifest)
+
+    def read_month(self, month, dtype=None):
+        # Lee un segmento verificando su checksum
+        entry = self.entry(month)
+        with open(self.segment_path(month), 'rb') as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise ValueError(f"El segmento de {month} no coincide con su checksum.")
+        return pd.read_csv(io.BytesIO(gzip.decompress(data)), dtype=dtype)
+
+    def remove_month(self, month):
+        # Primero el manifiesto: un segmento sin entrada se ignora y se detecta al verificar
+        manifest = self.manifest()
+        manifest['months'].pop(month)
+        manifest['retenidos'] = sorted(self.retained() | {month})
+        self._save_manifest(manifest)
+        os.remove(self.segment_path(month))
+
+    def verify(self):
+        # Lista de (mes o archivo, problema); vacía si todo está en orden
+        problems = []
+        for month, entry in sorted(self.manifest()['months'].items()):
+            path = self.segment_path(month)
+            if not os.path.exists(path):
+                problems.append((month, "falta el segmento"))
+                continue
+            try:
+                rows = len(self.read_month(month))
+            except ValueError as exc:
+                problems.append((month, str(exc)))
+                continue
+            except (OSError, EOFError) as exc:
+                problems.append((month, f"segmento ilegible: {exc}"))
+                continue
+            if rows != entry['filas']:
+                problems.append((month, f"tiene {rows} filas y el manifiesto registra {entry['filas']}"))
+        if os.path.isdir(self.root):
+            known = {entry['archivo'] for entry in self.manifest()['months'].values()}
+            for name in sorted(os.listdir(self.root)):
+                if name.endswith(SEGMENT_SUFFIX) and name not in known:
+                    problems.append((name, "segmento sin entrada en el manifiesto"))
+        return problems
+
+
+# --- Línea de comandos ---
+# python planner_archive.py archivar [--perfil casa] [--meses-activos 2]
+# python planner_archive.py verificar [--perfil casa]
+# python planner_archive.py restaurar [--perfil casa] [--meses 2023-01 2023-02]
+def main(argv=None):
+    import argparse
+
+    from planner_config import ARCHIVE_HOT_MONTHS, STORAGE_FORMAT
+    from planner_engine import open_planner_store
+    from profiles import DEFAULT_PROFILE, PROFILES_DIR
+
+    parser = argparse.ArgumentParser(description="Archivo de meses cerrados del planner")
+    parser.add_argument('comando', choices=['archivar', 'verificar', 'restaurar'])
+    parser.add_argument('--perfil', default=DEFAULT_PROFILE)
+    parser.add_argument('--meses', nargs='+', metavar='AAAA-MM', help="Meses a restaurar (por defecto, todos)")
+    parser.add_argument('--meses-activos', type=int, default=ARCHIVE_HOT_MONTHS,
+                        help="Meses que quedan en el archivo base, el actual incluido")
+    parser.add_argument('--almacenamiento', choices=['csv', 'parquet'], default=STORAGE_FORMAT)
+    parser.add_argument('--raiz-perfiles', default=PROFILES_DIR)
+    args = parser.parse_args(argv)
+
+    # Al archivar, los meses activos pedidos también rigen el archivado
+    # automático del store; verificar y restaurar no archivan nada
+    hot_months = max(args.meses_activos, 1)
+    store = open_planner_store(args.perfil, storage_format=args.almacenamiento, root=args.raiz_perfiles,
+                               hot_months=hot_months if args.comando == 'archivar' else None)
+    try:
+        if args.comando == 'archivar':
+            months = store.archive_cold_months(hot_months=hot_months, include_retained=True)
+            print(f"{len(months)} meses archivados en {store.archive.root}")
+        elif args.comando == 'verificar':
+            problems = store.archive.verify()
+            for name, problem in problems:
+                print(f"{name}: {problem}", file=sys.stderr)
+            print(f"{len(store.archive.months())} meses archivados, {len(problems)} problemas")
+            return 1 if problems else 0
+        else:
+            months = store.restore_months(args.meses)
+            print(f"{len(months)} meses restaurados al archivo base")
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
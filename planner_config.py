@@ -0,0 +1,83 @@
+# --- Configuración del Planner ---
+# Archivos de datos, objetivos y pesos del puntaje. No depende de Streamlit:
+# lo importan la app, el motor headless (planner_engine.py) y la CLI de
+# reportes.
+DATA_FILE = 'planner_data.csv' 
+FINANCIAL_DATA_FILE = 'financial_transactions.csv' 
+FINANCIAL_DB_FILE = 'financial_transactions.db'
+
+# Formato de almacenamiento: 'csv' (planner en CSV + transacciones en SQLite) o
+# 'parquet' (una partición Parquet por mes para cada dataset; requiere pyarrow).
+STORAGE_FORMAT = 'csv'
+FINANCIAL_PARQUET_DIR = 'financial_transactions_parquet'
+
+# Meses del planner que quedan en el archivo base (el actual incluido); los
+# anteriores pasan solos al archivo comprimido (ver planner_archive.py)
+ARCHIVE_HOT_MONTHS = 2
+
+# Importación de extractos: índice de movimientos ya importados y reglas de categorías
+IMPORT_HASH_DB_FILE = 'financial_import_hashes.db'
+CATEGORY_RULES_FILE = 'category_rules.json'
+
+# Presupuestos mensuales por categoría de gasto (uno por perfil)
+BUDGETS_FILE = 'budgets.json'
+
+# Objetivos, metas y pesos editables por el usuario; sin archivo se usan los
+# valores de este módulo (ver planner_objectives.py)
+OBJECTIVES_FILE = 'objectives_config.json'
+
+# --- Definición de columnas de la aplicación ---
+APP_OBJECTIVES_CONFIG = {
+    # Objetivos Diarios
+    'Entrenamiento_Hecho': {'display': '✅ Entrenamiento Hecho', 'type': 'bool', 'section': 'daily'},
+    'Entrenamiento_Minutos': {'display': 'Minutos de Entrenamiento', 'type': 'float', 'section': 'daily', 'step': 15.0, 'goal_monthly': 900}, 
+    'Comida Saludable': {'display': '✅ Comida Saludable', 'type': 'bool', 'section': 'daily'},
+    'Agua_Litros': {'display': 'Litros de Agua', 'type': 'float', 'section': 'daily', 'step': 0.5, 'goal_daily_avg': 2.0}, 
+    'Horas Extra': {'display': 'Horas Extra', 'type': 'float', 'section': 'daily', 'step': 0.5, 'goal_monthly': 40}, 
+    'Meditacion_Minutos': {'display': 'Minutos de Meditación', 'type': 'float', 'section': 'daily', 'step': 5.0, 'goal_daily_avg': 10.0}, 
+    'Lectura_Paginas': {'display': 'Páginas Leídas', 'type': 'int', 'section': 'daily', 'step': 10, 'goal_monthly': 300}, 
+
+    # Objetivos de Salud
+    'Otorrino (vos)': {'display': 'Otorrino (vos)', 'type': 'bool', 'section': 'health'},
+    'Otorrino (Guille)': {'display': 'Otorrino (Guille)', 'type': 'bool', 'section': 'health'},
+    'Dentista (vos)': {'display': 'Dentista (vos)', 'type': 'bool', 'section': 'health'},
+    'Dentista (Guille)': {'display': 'Dentista (Guille)', 'type': 'bool', 'section': 'health'},
+    'Neumonólogo (Guille)': {'display': 'Neumonólogo (Guille)', 'type': 'bool', 'section': 'health'},
+    'Brackets (averiguar - ambos)': {'display': 'Brackets (averiguar - ambos)', 'type': 'bool', 'section': 'health'},
+    'Rinoseptoplastia (consulta)': {'display': 'Rinoseptoplastia (consulta)', 'type': 'bool', 'section': 'health'},
+
+    # Proyectos
+    'App ingresos y salidas': {'display': 'App ingresos y salidas', 'type': 'str', 'section': 'projects', 'options': ['Pendiente', 'En Curso', 'Completado ✅']},
+    'App progreso personal': {'display': 'App progreso personal', 'type': 'str', 'section': 'projects', 'options': ['Pendiente', 'En Curso', 'Completado ✅']},
+
+    # Finanzas - Balance Inicial (y la marca de los días en que se cargó a
+    # mano: sin ella un 0 es "no cargado", con ella es un balance de 0)
+    'Balance_Inicial': {'display': 'Balance Inicial del Mes', 'type': 'float', 'section': 'finance', 'default': 0.0},
+    'Balance_Inicial_Manual': {'display': 'Balance Inicial cargado a mano', 'type': 'bool', 'section': 'finance'},
+}
+
+# Columnas cuyo valor se carga a mano -> columna que lo marca como cargado
+MANUAL_MARKERS = {'Balance_Inicial': 'Balance_Inicial_Manual'}
+
+# Generar la lista de nombres de columnas a partir de la configuración
+APP_COLUMNS_NAMES = ['Fecha'] + list(APP_OBJECTIVES_CONFIG.keys())
+
+# --- Puntaje Mensual (valores por defecto de objectives_config.json) ---
+DAILY_QUANT_OBJECTIVES = [
+    'Entrenamiento_Minutos', 'Agua_Litros', 'Meditacion_Minutos', 'Lectura_Paginas', 'Horas Extra'
+]
+BOOL_DAILY_OBJECTIVES = ['Entrenamiento_Hecho', 'Comida Saludable']
+
+PROGRESS_WEIGHTS = {
+    'Entrenamiento_Minutos': 0.15,
+    'Entrenamiento_Hecho': 0.05,
+    'Comida Saludable': 0.10,
+    'Agua_Litros': 0.05,
+    'Horas Extra': 0.10,
+    'Meditacion_Minutos': 0.10,
+    'Lectura_Paginas': 0.10,
+    'Salud_General': 0.15,
+    'Proyectos_General': 0.20
+}
+
+BONUS_THRESHOLD = 0.85
@@ -0,0 +1,167 @@
+import pandas as pd
+
+from balance_ledger import LEDGER_FILE, BalanceLedger, monthly_overrides
+from dates import month_bounds
+from planner_config import (
+    BUDGETS_FILE, DATA_FILE, FINANCIAL_DATA_FILE, FINANCIAL_DB_FILE, FINANCIAL_PARQUET_DIR,
+    STORAGE_FORMAT,
+)
+from planner_objectives import ProgressScorer, load_objectives, score_history
+from planner_schema import compile_schema
+from planner_storage import PlannerStore
+from profiles import PROFILES_DIR, profile_path
+from status_events import EVENTS_FILE, StatusEventLog, daily_config, migrate_status_columns, status_items
+from transaction_store import SqliteTransactionStore
+
+
+# --- Motor del Planner (sin Streamlit) ---
+# Apertura de los stores de un perfil, puntajes mensuales y resúmenes
+# financieros como funciones puras sobre esos stores. La app los envuelve en
+# st.cache_resource y les agrega la UI; la CLI de reportes (planner_report.py)
+# los usa directamente, sin importar Streamlit ni matplotlib.
+
+# --- Apertura de stores ---
+# Sin `objectives`, la configuración de objectives_config.json (ver
+# planner_objectives.py); los stores quedan atados a sus columnas. El
+# archivado automático (hot_months) es opt-in: sólo lo activa la app, así
+# los reportes y las CLIs no archivan meses como efecto secundario.
+def open_status_log(profile, root=PROFILES_DIR, objectives=None):
+    objectives = objectives or load_objectives()
+    return StatusEventLog(profile_path(profile, EVENTS_FILE, root), status_items(objectives.objectives))
+
+
+def open_planner_store(profile, status_log=None, storage_format=STORAGE_FORMAT, flush_interval_ms=0, root=PROFILES_DIR,
+                       hot_months=None, objectives=None):
+    objectives = objectives or load_objectives()
+    data_file = profile_path(profile, DATA_FILE, root)
+    status_log = status_log or open_status_log(profile, root, objectives)
+    # Datos de versiones anteriores: los estados pasan de las filas al registro
+    migrate_status_columns(data_file, status_log, compile_schema(objectives.objectives), storage_format)
+    return PlannerStore(
+        data_file, compile_schema(daily_config(objectives.objectives)),
+        base_format=storage_format, flush_interval_ms=flush_interval_ms, hot_months=hot_months,
+    )
+
+
+def open_transaction_store(profile, storage_format=STORAGE_FORMAT, root=PROFILES_DIR):
+    # Las transacciones viven en SQLite (o en Parquet); el CSV histórico se migra una sola vez
+    if storage_format == 'parquet':
+        from parquet_storage import ParquetTransactionStore
+        store = ParquetTransactionStore(profile_path(profile, FINANCIAL_PARQUET_DIR, root))
+    else:
+        store = SqliteTransactionStore(profile_path(profile, FINANCIAL_DB_FILE, root))
+    store.migrate_from_csv(profile_path(profile, FINANCIAL_DATA_FILE, root))
+    return store
+
+
+def open_balance_ledger(profile, root=PROFILES_DIR):
+    return BalanceLedger(profile_path(profile, LEDGER_FILE, root))
+
+
+def budgets_path(profile, root=PROFILES_DIR):
+    return profile_path(profile, BUDGETS_FILE, root)
+
+
+class ProfileData:
+    # Los cuatro stores de un perfil, abiertos una sola vez, y sus puntajes
+    def __init__(self, profile, storage_format=STORAGE_FORMAT, root=PROFILES_DIR, objectives=None):
+        self.profile = profile
+        self.objectives = objectives or load_objectives()
+        self.status_log = open_status_log(profile, root, self.objectives)
+        self.planner_store = open_planner_store(profile, self.status_log, storage_format, root=root,
+                                                objectives=self.objectives)
+        self.scorer = ProgressScorer()
+        self.transaction_store = open_transaction_store(profile, storage_format, root)
+        self.ledger = open_balance_ledger(profile, root)
+
+    def close(self):
+        self.planner_store.close()
+        self.transaction_store.close()
+
+
+# --- Progreso ---
+def progress_table(planner_store, status_log, objectives, today, scorer=None):
+    # Puntajes de todos los meses en una sola pasada (ver planner_objectives.py);
+    # con `scorer`, reutilizados mientras nada haya cambiado
+    if scorer is None:
+        return score_history(planner_store, status_log, objectives, today)
+    return scorer.refresh(planner_store, status_log, objectives, today)
+
+
+# --- Finanzas ---
+def refresh_ledger(ledger, planner_store, transaction_store, today):
+    # Libro de balances al día con las transacciones y los balances manuales
+    # (los de meses archivados salen del manifiesto del archivo)
+    planner = planner_store.load()
+    overrides = {**planner_store.archive.last_values('Balance_Inicial'), **monthly_overrides(planner.df)}
+    return ledger.refresh(transaction_store.range_index(), overrides, transaction_store.revision(), today)
+
+
+def prepare_derived(data, today):
+    # Deja persistidos los archivos derivados del perfil (agregados, índices
+    # de rangos y libro de balances): los procesos que lo lean después en
+    # paralelo los cargan en lugar de reconstruirlos a la vez
+    refresh_ledger(data.ledger, data.planner_store, data.transaction_store, today)
+
+
+def refresh_spending_monitor(monitor, transaction_store, today):
+    # Líneas de base de gastos al día con las transacciones (ver spending_alerts.py)
+    return monitor.refresh(transaction_store.range_index(), transaction_store.revision(), today)
+
+
+def finance_summary(transaction_store, ledger, day):
+    # Totales del mes de `day`; `ledger` tiene que estar al día (refresh_ledger)
+    start, end = month_bounds(pd.Timestamp(day))
+    totals = transaction_store.totals_by_type(start, end)
+    month_ledger = ledger.month(day)
+    return {
+        'start': start,
+        'end': end,
+        'ingresos': totals['Ingreso'],
+        'gastos': totals['Gasto'],
+        'apertura': month_ledger['Apertura'] if month_ledger else 0.0,
+        'cierre': month_ledger['Cierre'] if month_ledger else 0.0,
+        'apertura_manual': bool(month_ledger and month_ledger['Manual']),
+        'gastos_por_categoria': transaction_store.totals_by_category(start, end, tipo='Gasto'),
+        'ingresos_por_categoria': transaction_store.totals_by_category(start, end, tipo='Ingreso'),
+        'gastos_por_dia': transaction_store.totals_by_day(start, end, tipo='Gasto'),
+    }
+
+
+# --- Reporte mensual ---
+def monthly_report(data, day, today):
+    # Progreso y finanzas del mes de `day` en tipos simples (listo para JSON)
+    table = progress_table(data.planner_store, data.status_log, data.objectives, today, data.scorer)
+    score = table.month(day)
+    refresh_ledger(data.ledger, data.planner_store, data.transaction_store, today)
+    finance = finance_summary(data.transaction_store, data.ledger, day)
+    progress = None
+    if score is not None:
+        progress = {
+            'dias': score['days'],
+            'general': score['overall'],
+            'bonificacion': score['bonus'],
+            'racha_bonificacion': score['bonus_streak'],
+            'objetivos': {
+                name: {'tipo': result['kind'], 'valor': result['value'], 'meta': result['goal'], 'progreso': result['progress']}
+                for name, result in score['objectives'].items()
+            },
+            'salud': {'completados': score['salud_completados'], 'total': score['total_salud']},
+            'proyectos': {'completados': score['proyectos_completados'], 'total': score['total_proyectos']},
+            'mejores_rachas': score['best_streaks'],
+        }
+    return {
+        'perfil': data.profile,
+        'mes': pd.Timestamp(day).strftime('%Y-%m'),
+        'progreso': progress,
+        'finanzas': {
+            'apertura': finance['apertura'],
+            'apertura_manual': finance['apertura_manual'],
+            'ingresos': finance['ingresos'],
+            'gastos': finance['gastos'],
+            'cierre': finance['cierre'],
+            'gastos_por_categoria': {name: float(value) for name, value in finance['gastos_por_categoria'].items()},
+            'ingresos_por_categoria': {name: float(value) for name, value in finance['ingresos_por_categoria'].items()},
+            'gastos_por_dia': {pd.Timestamp(fecha).strftime('%Y-%m-%d'): float(value) for fecha, value in finance['gastos_por_dia'].items()},
+        },
+    }
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from dates import month_bounds
+
+
+# --- Frame del Planner indexado por fecha ---
+# Las filas viven en un DataFrame con un DatetimeIndex ordenado y sin
+# duplicados. La búsqueda de un día usa la tabla hash del índice y los meses
+# se obtienen por búsqueda binaria sobre el índice ordenado, así que el costo
+# de cada vista depende del tamaño del mes y no del historial completo.
+class PlannerFrame:
+    def __init__(self, df):
+        self.df = df
+
+    @classmethod
+    def from_frame(cls, df):
+        # `df` trae 'Fecha' como columna datetime64 (ver PlannerSchema.coerce)
+        indexed = df.drop_duplicates(subset='Fecha', keep='last').set_index('Fecha')
+        if not indexed.index.is_monotonic_increasing:
+            indexed = indexed.sort_index()
+        return cls(indexed)
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def __len__(self):
+        return len(self.df)
+
+    def has_day(self, day):
+        return pd.Timestamp(day) in self.df.index
+
+    def get(self, day, col_name):
+        return self.df.at[pd.Timestamp(day), col_name]
+
+    def set(self, day, col_name, value):
+        self.df.at[pd.Timestamp(day), col_name] = value
+
+    def row(self, day):
+        return self.df.loc[pd.Timestamp(day)]
+
+    def insert(self, row_df):
+        # Inserción ordenada de filas nuevas (indexadas por fecha): se ubica cada
+        # una con searchsorted en lugar de concatenar y reordenar todo.
+        for ts in row_df.index:
+            new_row = row_df.loc[[ts]]
+            if ts in self.df.index:
+                self.df.loc[ts] = new_row.iloc[0]
+                continue
+            position = self.df.index.searchsorted(ts)
+            if position == len(self.df):
+                self.df = pd.concat([self.df, new_row])
+            else:
+                self.df = pd.concat([self.df.iloc[:position], new_row, self.df.iloc[position:]])
+
+    def between(self, start, end):
+        # Días en [start, end)
+        start_pos = self.df.index.searchsorted(pd.Timestamp(start), side='left')
+        end_pos = self.df.index.searchsorted(pd.Timestamp(end), side='left')
+        return self.df.iloc[start_pos:end_pos]
+
+    def month(self, day):
+        start, end = month_bounds(pd.Timestamp(day))
+        return self.between(start, end)
+
+    def tail(self, n):
+        return self.df.iloc[-n:] if n else self.df.iloc[:0]
+
+    def to_frame(self):
+        # Vuelve al formato plano con 'Fecha' como columna
+        return self.df.reset_index()
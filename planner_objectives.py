@@ -0,0 +1,438 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from file_io import atomic_write_json, file_signature
+from planner_aggregates import PROJECT_DONE_STATE
+from planner_config import (
+    APP_OBJECTIVES_CONFIG, BONUS_THRESHOLD, BOOL_DAILY_OBJECTIVES, DAILY_QUANT_OBJECTIVES, MANUAL_MARKERS,
+    OBJECTIVES_FILE, PROGRESS_WEIGHTS,
+)
+from profiling import span
+from range_index import DAYS_SERIES
+
+
+# --- Objetivos Configurables ---
+# Objetivos, metas, pesos y umbral de bonificación se leen de un JSON que el
+# usuario puede editar (objectives_config.json); las claves que falten toman
+# los valores de planner_config.py. La configuración se identifica por su
+# hash: el de las columnas (schema_hash) decide cuándo reabrir los stores y
+# el completo decide cuándo recalcular los puntajes.
+#
+#   {"objetivos": {...}, "cuantitativos": [...], "booleanos": [...],
+#    "pesos": {...}, "umbral_bonificacion": 0.85}
+SECTIONS = ('daily', 'health', 'projects', 'finance')
+TYPES = ('bool', 'float', 'int', 'str')
+GENERAL_CATEGORIES = ('Salud_General', 'Proyectos_General')
+# Nombres que ya usan los datos o el puntaje: un objetivo así pisaría la
+# columna de fechas, la serie de días registrados o un progreso general
+RESERVED_NAMES = ('Fecha', DAYS_SERIES) + GENERAL_CATEGORIES
+# Claves obligatorias de cada objetivo
+REQUIRED_KEYS = ('display', 'type', 'section')
+# Lo que define las columnas de los datos; el resto (display, metas, step) no
+SCHEMA_KEYS = ('type', 'section', 'options', 'default')
+FILE_KEYS = {
+    'objetivos': 'objectives',
+    'cuantitativos': 'quant',
+    'booleanos': 'bools',
+    'pesos': 'weights',
+    'umbral_bonificacion': 'bonus_threshold',
+}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _hash(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+class ObjectivesConfig:
+    def __init__(self, objectives, quant, bools, weights, bonus_threshold):
+        # Los tipos se revisan antes de convertir: un archivo editado a mano
+        # tiene que dar un ValueError legible, no un TypeError
+        self.check_types(objectives, quant, bools, weights, bonus_threshold)
+        self.objectives = dict(objectives)
+        # Las marcas de carga manual son columnas internas: una configuración
+        # que no las menciona (anterior a ellas) las recibe con sus valores
+        for marker in MANUAL_MARKERS.values():
+            self.objectives.setdefault(marker, APP_OBJECTIVES_CONFIG[marker])
+        self.quant = list(quant)
+        self.bools = list(bools)
+        self.weights = {name: float(weight) for name, weight in weights.items()}
+        self.bonus_threshold = float(bonus_threshold)
+        self.validate()
+        self.hash = _hash(self.to_dict())
+        self.schema_hash = _hash({
+            name: {key: config[key] for key in SCHEMA_KEYS if key in config}
+            for name, config in self.objectives.items()
+        })
+
+    @classmethod
+    def defaults(cls):
+        return cls(APP_OBJECTIVES_CONFIG, DAILY_QUANT_OBJECTIVES, BOOL_DAILY_OBJECTIVES, PROGRESS_WEIGHTS, BONUS_THRESHOLD)
+
+    @classmethod
+    def from_dict(cls, payload):
+        if not isinstance(payload, dict):
+            raise ValueError("La configuración de objetivos tiene que ser un objeto JSON.")
+        defaults = cls.defaults().to_dict()
+        unknown = sorted(set(payload) - set(FILE_KEYS))
+        if unknown:
+            raise ValueError(f"Claves desconocidas en la configuración de objetivos: {', '.join(unknown)}")
+        merged = {**defaults, **payload}
+        return cls(**{FILE_KEYS[key]: value for key, value in merged.items()})
+
+    def to_dict(self):
+        return {
+            'objetivos': self.objectives,
+            'cuantitativos': self.quant,
+            'booleanos': self.bools,
+            'pesos': self.weights,
+            'umbral_bonificacion': self.bonus_threshold,
+        }
+
+    @staticmethod
+    def check_types(objectives, quant, bools, weights, bonus_threshold):
+        if not isinstance(objectives, dict):
+            raise ValueError("'objetivos' tiene que ser un objeto {nombre: configuración}.")
+        for name, config in objectives.items():
+            if not isinstance(config, dict):
+                raise ValueError(f"Objetivo '{name}': la configuración tiene que ser un objeto.")
+            missing = [key for key in REQUIRED_KEYS if key not in config]
+            if missing:
+                raise ValueError(f"Objetivo '{name}': faltan las claves {', '.join(missing)}.")
+            if not isinstance(config['display'], str):
+                raise ValueError(f"Objetivo '{name}': 'display' tiene que ser un texto.")
+            options = config.get('options')
+            if options is not None and (not isinstance(options, list) or not all(isinstance(option, str) for option in options)):
+                raise ValueError(f"Objetivo '{name}': 'options' tiene que ser una lista de textos.")
+            numeric_keys = ('step', 'default') if config['type'] in ('float', 'int') else ('step',)
+            for key in numeric_keys:
+                if key in config and not _is_number(config[key]):
+                    raise ValueError(f"Objetivo '{name}': '{key}' tiene que ser un número.")
+        for key, names in (('cuantitativos', quant), ('booleanos', bools)):
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                raise ValueError(f"'{key}' tiene que ser una lista de nombres de objetivos.")
+        if not isinstance(weights, dict) or not all(_is_number(weight) for weight in weights.values()):
+            raise ValueError("'pesos' tiene que ser un objeto {objetivo: número}.")
+        if not _is_number(bonus_threshold):
+            raise ValueError("'umbral_bonificacion' tiene que ser un número entre 0 y 1.")
+
+    def validate(self):
+        reserved = sorted(set(RESERVED_NAMES) & set(self.objectives))
+        if reserved:
+            raise ValueError(f"Nombres de objetivo reservados: {', '.join(reserved)}.")
+        for name, config in self.objectives.items():
+            if config.get('type') not in TYPES:
+                raise ValueError(f"Objetivo '{name}': tipo inválido {config.get('type')!r}.")
+            if config.get('section') not in SECTIONS:
+                raise ValueError(f"Objetivo '{name}': sección inválida {config.get('section')!r}.")
+            if config['type'] == 'str' and not config.get('options'):
+                raise ValueError(f"Objetivo '{name}': los objetivos de texto necesitan 'options'.")
+            for goal_key in ('goal_monthly', 'goal_daily_avg'):
+                goal = config.get(goal_key)
+                if goal is not None and (not _is_number(goal) or goal <= 0):
+                    raise ValueError(f"Objetivo '{name}': {goal_key} tiene que ser un número positivo.")
+        if self.objectives.get('Balance_Inicial', {}).get('section') != 'finance':
+            raise ValueError("Falta el objetivo 'Balance_Inicial' (sección 'finance'): lo usa el libro de balances.")
+        for column, marker in MANUAL_MARKERS.items():
+            if self.objectives[marker]['type'] != 'bool' or self.objectives[marker]['section'] != self.objectives[column]['section']:
+                raise ValueError(f"'{marker}' tiene que ser un objetivo de sí/no de la misma sección que '{column}'.")
+        for key, names in (('cuantitativos', self.quant), ('booleanos', self.bools)):
+            # Un nombre repetido sumaría su peso dos veces en el progreso general
+            repeated = sorted({name for name in names if names.count(name) > 1})
+            if repeated:
+                raise ValueError(f"'{key}' repite objetivos: {', '.join(repeated)}.")
+        for name in self.quant:
+            config = self.objectives.get(name)
+            if config is None or config['section'] != 'daily' or config['type'] not in ('float', 'int'):
+                raise ValueError(f"'{name}' no es un objetivo diario numérico.")
+        for name in self.bools:
+            config = self.objectives.get(name)
+            if config is None or config['section'] != 'daily' or config['type'] != 'bool':
+                raise ValueError(f"'{name}' no es un objetivo diario de sí/no.")
+        for name, weight in self.weights.items():
+            if name not in GENERAL_CATEGORIES and name not in self.quant and name not in self.bools:
+                raise ValueError(f"El peso '{name}' no corresponde a ningún objetivo puntuado.")
+            if weight < 0:
+                raise ValueError(f"El peso de '{name}' no puede ser negativo.")
+        if not 0 < self.bonus_threshold <= 1:
+            raise ValueError("El umbral de bonificación tiene que estar entre 0 y 1.")
+
+    # --- Vistas derivadas ---
+    def section(self, section, col_type=None):
+        return [
+            name for name, config in self.objectives.items()
+            if config['section'] == section and (col_type is None or config['type'] == col_type)
+        ]
+
+    def goals(self):
+        # Metas de los cuantitativos: (mensuales, promedio diario), NaN si no tienen
+        monthly = np.array([self.objectives[name].get('goal_monthly') or np.nan for name in self.quant], dtype=float)
+        daily_avg = np.array([self.objectives[name].get('goal_daily_avg') or np.nan for name in self.quant], dtype=float)
+        # La meta mensual tiene prioridad, como en la app
+        daily_avg[~np.isnan(monthly)] = np.nan
+        return monthly, daily_avg
+
+
+# Configuraciones ya leídas: {ruta: (firma del archivo, configuración)}
+_LOADED = {}
+_LOADED_LOCK = threading.Lock()
+
+
+def load_objectives(path=OBJECTIVES_FILE):
+    # Sin archivo, los valores de planner_config.py. Se vuelve a leer sólo si
+    # el archivo cambió, así se puede llamar en cada rerun.
+    signature = file_signature(path)
+    with _LOADED_LOCK:
+        cached = _LOADED.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        if signature is None:
+            config = ObjectivesConfig.defaults()
+        else:
+            with open(path, encoding='utf-8') as f:
+                try:
+                    payload = json.load(f)
+                except ValueError as exc:
+                    raise ValueError(f"{path} no es un JSON válido: {exc}") from exc
+            config = ObjectivesConfig.from_dict(payload)
+        _LOADED[path] = (signature, config)
+        return config
+
+
+def save_objectives(config, path=OBJECTIVES_FILE):
+    atomic_write_json(config.to_dict(), path, indent=2)
+
+
+# --- Puntaje Vectorizado ---
+# Todos los meses del historial en una sola pasada: las sumas de los
+# agregados forman una matriz meses × objetivos, los estados de salud y
+# proyectos al cierre de cada mes salen de una tabla meses × ítems, y el
+# progreso general es un producto matricial contra el vector de pesos. Las
+# rachas se calculan sobre los valores por día del índice de rangos (que
+# incluye los meses archivados), también sin recorrer filas en Python.
+def run_lengths(met):
+    # Largo de la racha que termina en cada fila, por columna: la suma
+    # acumulada de aciertos menos la suma en el último fallo
+    met = np.asarray(met, dtype=bool)
+    counts = np.cumsum(met, axis=0)
+    resets = np.where(met, 0, counts)
+    return counts - np.maximum.accumulate(resets, axis=0)
+
+
+def _ratio(values, goals):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(goals > 0, np.clip(values / goals, 0, 1), 0.0)
+
+
+def score_months(config, months, days, sums, states):
+    # months: claves AAAA-MM; days: días registrados por mes; sums: DataFrame
+    # meses × objetivos diarios; states: DataFrame meses × ítems de estado
+    days = np.asarray(days, dtype=float)
+    sums = sums.reindex(index=months, columns=config.quant + config.bools).fillna(0.0)
+    safe_days = np.where(days > 0, days, np.nan)[:, None]
+
+    goal_monthly, goal_daily_avg = config.goals()
+    quant_sums = sums[config.quant].to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        averages = np.nan_to_num(quant_sums / safe_days)
+    monthly_kind = ~np.isnan(goal_monthly)
+    quant_values = np.where(monthly_kind, quant_sums, averages)
+    quant_goals = np.where(monthly_kind, goal_monthly, goal_daily_avg)
+    quant_progress = _ratio(quant_values, np.nan_to_num(quant_goals))
+    with np.errstate(invalid='ignore'):
+        bool_progress = np.nan_to_num(sums[config.bools].to_numpy(dtype=float) / safe_days)
+
+    health = config.section('health', 'bool')
+    projects = config.section('projects')
+    states = states.reindex(index=months, columns=health + projects)
+    health_done = (states[health] == True).sum(axis=1).to_numpy()  # noqa: E712
+    projects_done = (states[projects] == PROJECT_DONE_STATE).sum(axis=1).to_numpy()
+
+    progress = pd.DataFrame(np.hstack([quant_progress, bool_progress]), index=months, columns=config.quant + config.bools)
+    progress['Salud_General'] = health_done / len(health) if health else 0.0
+    progress['Proyectos_General'] = projects_done / len(projects) if projects else 0.0
+
+    weights = pd.Series(config.weights, dtype=float)
+    total_weight = weights.sum()
+    weighted = progress.reindex(columns=weights.index, fill_value=0.0).to_numpy() @ weights.to_numpy()
+    overall = weighted / total_weight if total_weight > 0 else np.zeros(len(months))
+    bonus = (overall >= config.bonus_threshold) & (days > 0)
+
+    return {
+        'days': days.astype(int),
+        'values': pd.DataFrame(np.hstack([quant_values, bool_progress]), index=months, columns=config.quant + config.bools),
+        'goals': quant_goals,
+        'progress': progress,
+        'health_done': health_done,
+        'projects_done': projects_done,
+        'overall': overall,
+        'bonus': bonus,
+        # Meses seguidos con bonificación hasta cada mes (un mes sin datos la corta)
+        'bonus_streak': run_lengths(bonus[:, None])[:, 0],
+    }
+
+
+def daily_streaks(config, day_values):
+    # Días seguidos cumpliendo cada objetivo diario. Un día cuenta si se
+    # registró y: el sí/no está marcado, el valor alcanza la meta diaria, o
+    # alcanza la parte del día de la meta mensual. Devuelve (mejor racha de
+    # cada mes, racha actual por objetivo).
+    goal_monthly, goal_daily_avg = config.goals()
+    scored = [name for name, monthly, daily in zip(config.quant, goal_monthly, goal_daily_avg)
+              if not (np.isnan(monthly) and np.isnan(daily))] + config.bools
+    if day_values.empty:
+        return pd.DataFrame(columns=scored, dtype=int), pd.Series(0, index=scored, dtype=int)
+    values = day_values.reindex(columns=scored + [DAYS_SERIES]).fillna(0.0)
+    registered = values[DAYS_SERIES].to_numpy() > 0
+    days_in_month = day_values.index.days_in_month.to_numpy(dtype=float)[:, None]
+
+    targets = []
+    for name, monthly, daily in zip(config.quant, goal_monthly, goal_daily_avg):
+        if not np.isnan(monthly):
+            targets.append(monthly / days_in_month[:, 0])
+        elif not np.isnan(daily):
+            targets.append(np.full(len(values), daily))
+    targets.extend(np.full(len(values), 0.5) for _ in config.bools)
+    met = registered[:, None] & (values[scored].to_numpy() >= np.column_stack(targets))
+    runs = run_lengths(met)
+
+    months = day_values.index.to_period('M').strftime('%Y-%m')
+    best = pd.DataFrame(runs, index=months, columns=scored).groupby(level=0).max()
+    # La racha actual no se corta porque hoy todavía no se haya cumplido
+    current = np.where(met[-1], runs[-1], runs[-2] if len(runs) > 1 else 0)
+    return best, pd.Series(current, index=scored, dtype=int)
+
+
+class ProgressTable:
+    # Puntajes de todos los meses; month() devuelve un mes con la forma que
+    # usan la app y los reportes
+    def __init__(self, config, months, scores, best_streaks, current_streaks):
+        self.config = config
+        self.months = list(months)
+        self.scores = scores
+        self.best_streaks = best_streaks.reindex(self.months).fillna(0).astype(int)
+        self.current_streaks = current_streaks
+        self._positions = {month: i for i, month in enumerate(self.months)}
+
+    def month(self, day):
+        # None si el mes no tiene días registrados
+        position = self._positions.get(pd.Timestamp(day).strftime('%Y-%m'))
+        if position is None or self.scores['days'][position] == 0:
+            return None
+        scores = self.scores
+        values = scores['values'].iloc[position]
+        progress = scores['progress'].iloc[position]
+        objectives = {}
+        for i, name in enumerate(self.config.quant):
+            goal = scores['goals'][i]
+            if np.isnan(goal):
+                continue
+            kind = 'monthly' if self.config.objectives[name].get('goal_monthly') else 'daily_avg'
+            objectives[name] = {'kind': kind, 'value': float(values[name]), 'goal': float(goal), 'progress': float(progress[name])}
+        for name in self.config.bools:
+            objectives[name] = {'kind': 'bool', 'value': float(values[name]), 'goal': None, 'progress': float(progress[name])}
+        return {
+            'days': int(scores['days'][position]),
+            'objectives': objectives,
+            'category_progress': {name: float(value) for name, value in progress.items()},
+            'salud_completados': int(scores['health_done'][position]),
+            'total_salud': len(self.config.section('health', 'bool')),
+            'proyectos_completados': int(scores['projects_done'][position]),
+            'total_proyectos': len(self.config.section('projects')),
+            'overall': float(scores['overall'][position]),
+            'bonus': bool(scores['bonus'][position]),
+            'bonus_streak': int(scores['bonus_streak'][position]),
+            'best_streaks': {name: int(value) for name, value in self.best_streaks.iloc[position].items()},
+        }
+
+    def history(self):
+        # Un renglón por mes con días registrados, del más reciente al más antiguo
+        registered = self.scores['days'] > 0
+        history = pd.DataFrame({
+            'Mes': self.months,
+            'Días Registrados': self.scores['days'],
+            'Progreso': self.scores['overall'],
+            'Bonificación': self.scores['bonus'],
+            'Racha de Bonificación': self.scores['bonus_streak'],
+        })[registered]
+        return history.iloc[::-1].set_index('Mes')
+
+
+def score_history(planner_store, status_log, config, today):
+    # Puntajes de todos los meses, desde el primero registrado hasta el de `today`
+    planner_store.load()
+    aggregates = planner_store.aggregates.months
+    registered = [pd.Period(month, freq='M') for month in aggregates]
+    current = pd.Period(pd.Timestamp(today), freq='M')
+    periods = pd.period_range(min(registered + [current]), max(registered + [current]), freq='M')
+    months = list(periods.strftime('%Y-%m'))
+    days = [aggregates.get(month, {}).get('days', 0) for month in months]
+    sums = pd.DataFrame([aggregates.get(month, {}).get('sums', {}) for month in months], index=months)
+    # Estados al cierre de cada mes; el mes en curso, con los de hoy
+    closing_days = [min(period.end_time.normalize(), pd.Timestamp(today)) for period in periods]
+    states = status_log.states_on(closing_days)
+    states.index = months
+    scores = score_months(config, months, days, sums, states)
+    day_values = planner_store.ranges.day_values(periods[0].start_time, pd.Timestamp(today) + pd.Timedelta(days=1))
+    best, current_streaks = daily_streaks(config, day_values)
+    return ProgressTable(config, months, scores, best, current_streaks)
+
+
+class ProgressScorer:
+    # Último ProgressTable de un perfil, válido mientras no cambien la
+    # configuración, el planner (su revisión en memoria), el registro de
+    # estados ni el día. Un rerun sin cambios no recalcula nada.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self.table = None
+
+    def refresh(self, planner_store, status_log, config, today):
+        planner_store.load()
+        signature = (config.hash, planner_store.revision, status_log.signature(), str(today))
+        with self._lock:
+            if signature != self._signature:
+                with span('score_history'):
+                    self.table = score_history(planner_store, status_log, config, today)
+                self._signature = signature
+            return self.table
+
+
+# --- Línea de comandos ---
+# python planner_objectives.py plantilla [objectives_config.json]
+# python planner_objectives.py validar [objectives_config.json]
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Configuración de objetivos del planner")
+    parser.add_argument('comando', choices=['plantilla', 'validar'])
+    parser.add_argument('archivo', nargs='?', default=OBJECTIVES_FILE)
+    args = parser.parse_args(argv)
+
+    if args.comando == 'plantilla':
+        if os.path.exists(args.archivo):
+            print(f"{args.archivo} ya existe: no se sobrescribe", file=sys.stderr)
+            return 1
+        save_objectives(ObjectivesConfig.defaults(), args.archivo)
+        print(f"Configuración por defecto escrita en {args.archivo}")
+        return 0
+    try:
+        config = load_objectives(args.archivo)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    print(f"{len(config.objectives)} objetivos, {len(config.weights)} pesos, hash {config.hash}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
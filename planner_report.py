@@ -0,0 +1,167 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from file_io import json_default
+from planner_config import STORAGE_FORMAT
+from planner_engine import ProfileData, monthly_report, prepare_derived
+from profiles import PROFILES_DIR, list_profiles
+
+
+# --- Reportes Mensuales Headless ---
+# Progreso y finanzas de varios perfiles y meses, un trabajo (perfil, mes)
+# por tarea de un pool de procesos. Pensado para cron: no importa Streamlit,
+# y matplotlib sólo se carga si se piden gráficos PNG.
+#
+#   python planner_report.py reportes --perfiles principal casa --ultimos 3 --formatos json csv png
+FORMATS = ('json', 'csv', 'png')
+SUMMARY_COLUMNS = ['perfil', 'mes', 'dias', 'progreso', 'bonificacion', 'apertura', 'ingresos', 'gastos', 'cierre', 'error']
+
+# Stores abiertos por cada proceso del pool, reutilizados entre sus trabajos
+_OPEN_PROFILES = {}
+
+
+def _profile_data(profile, storage_format, root):
+    key = (profile, storage_format, root)
+    if key not in _OPEN_PROFILES:
+        _OPEN_PROFILES[key] = ProfileData(profile, storage_format, root)
+    return _OPEN_PROFILES[key]
+
+
+def last_months(today, count):
+    current = pd.Period(today, freq='M')
+    return [(current - offset).strftime('%Y-%m') for offset in range(count - 1, -1, -1)]
+
+
+# --- Salida ---
+def _write_csv(path, columns, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def write_report(report, directory, formats):
+    os.makedirs(directory, exist_ok=True)
+    prefix = os.path.join(directory, report['mes'])
+    finance = report['finanzas']
+    if 'json' in formats:
+        with open(f"{prefix}.json", 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=json_default)
+    if 'csv' in formats:
+        objectives = (report['progreso'] or {}).get('objetivos', {})
+        _write_csv(f"{prefix}_objetivos.csv", ['Objetivo', 'Tipo', 'Valor', 'Meta', 'Progreso'], [
+            [name, result['tipo'], result['valor'], result['meta'], result['progreso']]
+            for name, result in objectives.items()
+        ])
+        _write_csv(f"{prefix}_categorias.csv", ['Tipo', 'Categoría', 'Monto'], [
+            [tipo, categoria, monto]
+            for tipo, key in (('Ingreso', 'ingresos_por_categoria'), ('Gasto', 'gastos_por_categoria'))
+            for categoria, monto in finance[key].items()
+        ])
+    if 'png' in formats:
+        from charts import ChartSpec, render_png
+
+        charts = []
+        if finance['gastos_por_categoria']:
+            charts.append(('gastos_categoria', ChartSpec(
+                'bar', list(finance['gastos_por_categoria']), list(finance['gastos_por_categoria'].values()),
+                title=f"Gastos por Categoría ({report['mes']})", xlabel="Categoría", ylabel="Monto ($)",
+                color='salmon', figsize=(10, 6), xtick_ha='right'
+            )))
+        if len(finance['gastos_por_dia']) > 1:
+            charts.append(('gastos_diarios', ChartSpec(
+                'line', list(finance['gastos_por_dia']), list(finance['gastos_por_dia'].values()),
+                title=f"Gastos Diarios ({report['mes']})", xlabel="Fecha", ylabel="Monto ($)", marker='o', grid=True
+            )))
+        for name, spec in charts:
+            with open(f"{prefix}_{name}.png", 'wb') as f:
+                f.write(render_png(spec))
+
+
+# --- Trabajos ---
+def run_job(job):
+    # Un mes de un perfil; devuelve la fila del resumen (con el error, si hubo)
+    profile, month, options = job
+    row = {'perfil': profile, 'mes': month}
+    try:
+        data = _profile_data(profile, options['storage_format'], options['root'])
+        report = monthly_report(data, pd.Period(month, freq='M').start_time, options['today'])
+        write_report(report, os.path.join(options['output'], profile), options['formats'])
+    except Exception as exc:
+        row['error'] = f"{type(exc).__name__}: {exc}"
+        return row
+    progress = report['progreso'] or {}
+    row.update({
+        'dias': progress.get('dias', 0),
+        'progreso': progress.get('general'),
+        'bonificacion': progress.get('bonificacion', False),
+        **{key: report['finanzas'][key] for key in ('apertura', 'ingresos', 'gastos', 'cierre')},
+    })
+    return row
+
+
+def run_jobs(jobs, processes):
+    if processes <= 1 or len(jobs) <= 1:
+        return [run_job(job) for job in jobs]
+    # Los trabajos vienen agrupados por perfil: con bloques contiguos cada
+    # proceso tiende a recibir meses del mismo perfil y reusa sus stores
+    chunksize = max(1, len(jobs) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(run_job, jobs, chunksize=chunksize))
+
+
+# --- Línea de comandos ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera reportes mensuales de progreso y finanzas sin abrir la app")
+    parser.add_argument('salida', help="Directorio de salida (un subdirectorio por perfil)")
+    parser.add_argument('--perfiles', nargs='+', help="Perfiles a reportar (por defecto, todos)")
+    parser.add_argument('--meses', nargs='+', metavar='AAAA-MM', help="Meses a reportar")
+    parser.add_argument('--ultimos', type=int, default=1, help="Sin --meses: cantidad de meses hasta el actual")
+    parser.add_argument('--formatos', nargs='+', choices=FORMATS, default=['json', 'csv'])
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--almacenamiento', choices=['csv', 'parquet'], default=STORAGE_FORMAT)
+    parser.add_argument('--raiz-perfiles', default=PROFILES_DIR)
+    args = parser.parse_args(argv)
+
+    today = datetime.now().date()
+    profiles = args.perfiles or list_profiles(args.raiz_perfiles)
+    months = args.meses or last_months(today, args.ultimos)
+    # Migraciones pendientes y archivos derivados de cada perfil: una vez y
+    # acá, no en paralelo desde cada proceso del pool
+    for profile in profiles:
+        data = ProfileData(profile, args.almacenamiento, args.raiz_perfiles)
+        try:
+            prepare_derived(data, today)
+        finally:
+            data.close()
+
+    options = {
+        'storage_format': args.almacenamiento, 'root': args.raiz_perfiles, 'today': today,
+        'output': args.salida, 'formats': args.formatos,
+    }
+    jobs = [(profile, month, options) for profile in profiles for month in months]
+    rows = run_jobs(jobs, args.procesos)
+
+    os.makedirs(args.salida, exist_ok=True)
+    summary_path = os.path.join(args.salida, 'resumen.csv')
+    _write_csv(summary_path, SUMMARY_COLUMNS, [[row.get(col) for col in SUMMARY_COLUMNS] for row in rows])
+    if 'json' in args.formatos:
+        with open(os.path.join(args.salida, 'resumen.json'), 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2, default=json_default)
+
+    failed = [row for row in rows if row.get('error')]
+    for row in failed:
+        print(f"{row['perfil']} {row['mes']}: {row['error']}", file=sys.stderr)
+    print(f"{len(rows) - len(failed)} reportes escritos en {args.salida} ({len(failed)} con errores)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+# --- Esquema compilado del Planner ---
+# APP_OBJECTIVES_CONFIG se traduce una sola vez a dtypes concretos:
+#   bool  -> bool de numpy
+#   float -> float64
+#   int   -> int64
+#   str   -> Categorical con las 'options' del objetivo
+#   Fecha -> datetime64
+# así la coerción es una operación vectorizada por columna y cada fila ocupa
+# unos pocos bytes en lugar de objetos de Python.
+class PlannerSchema:
+    def __init__(self, objectives_config):
+        self.config = objectives_config
+        self.columns = ['Fecha'] + list(objectives_config.keys())
+        self.dtypes = {}
+        self.defaults = {}
+        for col_name, config in objectives_config.items():
+            col_type = config['type']
+            if col_type == 'bool':
+                self.dtypes[col_name] = np.dtype(bool)
+                self.defaults[col_name] = False
+            elif col_type == 'float':
+                self.dtypes[col_name] = np.dtype('float64')
+                self.defaults[col_name] = float(config.get('default', 0.0))
+            elif col_type == 'int':
+                self.dtypes[col_name] = np.dtype('int64')
+                self.defaults[col_name] = int(config.get('default', 0))
+            elif col_type == 'str':
+                options = config.get('options') or ['']
+                self.dtypes[col_name] = pd.CategoricalDtype(categories=options)
+                self.defaults[col_name] = options[0]
+
+    def csv_dtypes(self):
+        # dtypes que read_csv puede aplicar directamente al parsear
+        return {col: 'category' for col, dtype in self.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+
+    def default_row(self, fecha):
+        row = {'Fecha': pd.Timestamp(fecha)}
+        row.update(self.defaults)
+        return row
+
+    def empty_frame(self):
+        df = pd.DataFrame({'Fecha': pd.Series(dtype='datetime64[ns]')})
+        for col_name, dtype in self.dtypes.items():
+            df[col_name] = pd.Series(dtype=dtype)
+        return df
+
+    def coerce(self, df):
+        if df.empty:
+            return self.empty_frame()
+        out = pd.DataFrame(index=df.index)
+        out['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce', format='ISO8601').astype('datetime64[ns]')
+        for col_name, dtype in self.dtypes.items():
+            default = self.defaults[col_name]
+            if col_name not in df.columns:
+                out[col_name] = pd.Series(default, index=df.index).astype(dtype)
+                continue
+            col = df[col_name]
+            if isinstance(dtype, pd.CategoricalDtype):
+                values = col.astype(str).where(col.notna())
+                out[col_name] = values.astype(dtype).fillna(default)
+            elif dtype == np.dtype(bool):
+                if col.dtype != bool:
+                    col = col.map({True: True, False: False, 'True': True, 'False': False, 'true': True, 'false': False})
+                out[col_name] = col.fillna(False).astype(bool)
+            else:
+                out[col_name] = pd.to_numeric(col, errors='coerce').fillna(default).astype(dtype)
+        out = out.dropna(subset=['Fecha'])
+        return out.reset_index(drop=True)
+
+
+def compile_schema(objectives_config):
+    return PlannerSchema(objectives_config)
@@ -0,0 +1,559 @@
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+
+import pandas as pd
+
+from balance_ledger import manual_values
+from file_io import atomic_open, file_signature, json_default
+from file_lock import FileLock
+from planner_aggregates import MonthlyAggregates, month_key
+from planner_archive import ARCHIVE_DIR_SUFFIX, MonthArchive
+from planner_frame import PlannerFrame
+from profiling import PROFILER, span
+from range_index import DAYS_SERIES, PrefixSums, planner_day_values
+
+
+# --- Almacenamiento del Planner: archivo base + journal de solo-agregado ---
+# El archivo base (CSV) sólo se reescribe al compactar. Cada guardado agrega
+# al journal únicamente las filas modificadas (una línea JSON por fila), así
+# que el costo de guardar no depende de cuántos días haya en el historial.
+#
+# Concurrencia: cada línea del journal es un parche con la fecha y sólo las
+# columnas que cambiaron (sólo la fecha cuando se crea el día). Al leer se
+# aplican en orden columna por columna, así dos sesiones o procesos que editan
+# campos distintos del mismo día no se pisan. Append, compactación y lectura
+# se serializan entre procesos con un lock de archivo.
+#
+# Los meses cerrados pueden pasar a un archivo de segmentos comprimidos
+# (planner_archive.py): dejan de leerse en cada carga y sus agregados y
+# valores diarios salen del manifiesto del archivo.
+JOURNAL_SUFFIX = '.journal'
+AGGREGATES_SUFFIX = '.aggregates.json'
+RANGES_SUFFIX = '.ranges.npz'
+PARQUET_DIR_SUFFIX = '_parquet'
+COMPACT_THRESHOLD_BYTES = 256 * 1024
+# Ventana de coalescencia del escritor en segundo plano; 0 = flush por edición
+FLUSH_INTERVAL_MS = 0
+
+
+def _fecha_key(fecha):
+    if hasattr(fecha, 'strftime'):
+        return fecha.strftime('%Y-%m-%d')
+    return str(fecha)
+
+
+def atomic_write_csv(dataframe, path):
+    # Un corte a mitad de escritura nunca deja un CSV truncado (ver file_io.py)
+    with atomic_open(path, newline='') as f:
+        dataframe.to_csv(f, index=False)
+
+
+def merge_patches(base_df, records):
+    # Aplica los parches del journal sobre el base: por día, gana el último
+    # valor no nulo de cada columna.
+    if not records:
+        return base_df
+    journal_df = pd.DataFrame.from_records(records)
+    if base_df.empty:
+        merged = journal_df
+    else:
+        base_df['Fecha'] = base_df['Fecha'].astype(str)
+        merged = pd.concat([base_df, journal_df], ignore_index=True)
+    return merged.groupby('Fecha', sort=True).last().reset_index()
+
+
+# Escritores vivos del proceso, para esperar lo pendiente (benchmarks, tests)
+_WRITERS = weakref.WeakSet()
+
+
+def wait_for_writers(timeout=None):
+    for writer in list(_WRITERS):
+        writer.wait(timeout)
+
+
+class BackgroundWriter:
+    # Un hilo por store. Los pedidos de guardado que llegan dentro de la
+    # ventana se juntan en un solo flush, fuera del hilo de la sesión; al
+    # cerrar el proceso se hace un último flush de lo pendiente. Cada pedido
+    # trae la sesión que lo hizo (si perfila), y los spans del flush se
+    # registran en esas sesiones (ver profiling.py).
+    def __init__(self, flush, interval_ms):
+        self._flush = flush
+        self.interval = interval_ms / 1000
+        self.last_error = None
+        self._wakeup = threading.Event()
+        # Sin pedidos pendientes ni flush en curso
+        self._idle = threading.Event()
+        self._idle.set()
+        self._state_lock = threading.Lock()
+        self._sessions = set()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='planner-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        _WRITERS.add(self)
+
+    def request(self, session_id=None):
+        with self._state_lock:
+            self._sessions.add(session_id)
+            self._idle.clear()
+            self._wakeup.set()
+
+    def wait(self, timeout=None):
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            if self._closed:
+                return
+            time.sleep(self.interval)
+            # Lo que llegue después del clear dispara otra vuelta; lo que llegó
+            # antes ya está incluido en este flush
+            with self._state_lock:
+                self._wakeup.clear()
+                sessions, self._sessions = self._sessions, set()
+            PROFILER.begin_background('writer', sessions)
+            try:
+                self._flush()
+                self.last_error = None
+            except Exception as exc:
+                # Las filas siguen marcadas y se reintentan en la próxima vuelta
+                self.last_error = exc
+            finally:
+                PROFILER.end_rerun()
+            with self._state_lock:
+                if not self._wakeup.is_set():
+                    self._idle.set()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._flush()
+        self._idle.set()
+
+
+class PlannerStore:
+    def __init__(self, data_file, schema, compact_threshold=COMPACT_THRESHOLD_BYTES, base_format='csv',
+                 flush_interval_ms=FLUSH_INTERVAL_MS, hot_months=None):
+        self.data_file = data_file
+        self.journal_file = data_file + JOURNAL_SUFFIX
+        # Base 'csv' (un solo archivo) o 'parquet' (una partición por mes)
+        self.base_format = base_format
+        self.parquet = None
+        if base_format == 'parquet':
+            from parquet_storage import MonthPartitionedParquet
+            self.base_path = os.path.splitext(data_file)[0] + PARQUET_DIR_SUFFIX
+            self.parquet = MonthPartitionedParquet(self.base_path)
+        else:
+            self.base_path = data_file
+        self.schema = schema
+        self.columns = list(schema.columns)
+        self.compact_threshold = compact_threshold
+        # Meses que quedan en el archivo base (el actual incluido); los
+        # anteriores se archivan solos en segundo plano. None = nunca
+        self.archive = MonthArchive(os.path.splitext(data_file)[0] + ARCHIVE_DIR_SUFFIX)
+        self.hot_months = hot_months
+        self._dirty = {}
+        # Reentrante y compartido con otros procesos que usen el mismo archivo
+        self._lock = FileLock(data_file)
+        self._compactor = None
+        # Frame ya parseado, válido mientras la firma (mtime, tamaño) del base
+        # y del journal coincida con la registrada.
+        self._frame = None
+        self._frame_signature = None
+        # Sube con cada cambio del frame en memoria, incluidas las ediciones
+        # que todavía no llegaron al disco (valida los puntajes calculados)
+        self.revision = 0
+        # Agregados mensuales persistidos junto al archivo de datos
+        self.aggregates = MonthlyAggregates(data_file + AGGREGATES_SUFFIX, schema)
+        # Sumas acumuladas por día para consultas de rangos arbitrarios
+        self.ranges = PrefixSums(data_file + RANGES_SUFFIX, self.aggregates.sum_columns + [DAYS_SERIES])
+        # Agregados e índice de rangos al día en memoria pero no en disco: se
+        # persisten al compactar, archivar o cerrar, no en cada flush (el
+        # índice crece con el historial). Si el proceso muere antes, el
+        # próximo load los reconstruye desde el frame.
+        self._derived_dirty = False
+        atexit.register(self.persist_derived)
+        # Durabilidad: con flush_interval_ms > 0 save() no toca el disco, sólo
+        # avisa al escritor en segundo plano
+        self._writer = BackgroundWriter(self.flush, flush_interval_ms) if flush_interval_ms > 0 else None
+
+    # --- Lectura ---
+    def _read_journal(self):
+        # Devuelve los registros válidos del journal. Si el último renglón quedó
+        # incompleto (corte durante un append) se descarta y se trunca el archivo
+        # para que el próximo append no quede pegado a basura.
+        if not os.path.exists(self.journal_file):
+            return []
+        records = []
+        valid_offset = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+                valid_offset += len(line)
+        if valid_offset < os.path.getsize(self.journal_file):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid_offset)
+        return records
+
+    def _signature(self):
+        return (file_signature(self.base_path), file_signature(self.journal_file), self.archive.signature())
+
+    def _read_base(self):
+        # Los meses archivados se ignoran aunque sigan en el base (un corte
+        # entre escribir el segmento y reescribir el base): el segmento manda
+        archived = set(self.archive.months())
+        if self.parquet is not None:
+            base_df = self.parquet.read(months=[month for month in self.parquet.months() if month not in archived])
+            if not base_df.empty:
+                base_df['Fecha'] = base_df['Fecha'].dt.strftime('%Y-%m-%d')
+            return base_df
+        if os.path.exists(self.data_file):
+            base_df = pd.read_csv(self.data_file, dtype=self.schema.csv_dtypes())
+            if archived and not base_df.empty:
+                base_df = base_df[~base_df['Fecha'].astype(str).str[:7].isin(archived)]
+            return base_df
+        return pd.DataFrame(columns=self.columns)
+
+    def _read_merged(self):
+        archived = set(self.archive.months())
+        records = [record for record in self._read_journal() if record['Fecha'][:7] not in archived]
+        return merge_patches(self._read_base(), records)
+
+    def load(self):
+        # Devuelve el PlannerFrame compartido del proceso. Sólo se vuelve a
+        # parsear si otro proceso (o una edición manual) cambió los archivos.
+        with self._lock:
+            signature = self._signature()
+            if self._frame is None or signature != self._frame_signature:
+                if self._dirty and self._frame is not None:
+                    # Otro proceso escribió: las ediciones pendientes de este se
+                    # agregan primero al journal para no perderlas al recargar
+                    self.flush(compact=False)
+                    signature = self._signature()
+                with span('load', archivo=self.data_file):
+                    merged = self._read_merged()
+                with span('coerce', filas=len(merged)):
+                    self._frame = PlannerFrame.from_frame(self.schema.coerce(merged))
+                self._frame_signature = signature
+                self.revision += 1
+                self._load_derived(signature)
+                self._maybe_archive()
+            return self._frame
+
+    def _load_derived(self, signature):
+        # Agregados e índice de rangos: se reconstruyen desde el frame sólo si
+        # lo persistido no corresponde a los archivos actuales
+        self._derived_dirty = False
+        if not self.aggregates.load(signature):
+            self.aggregates.rebuild(self._frame.df)
+            # Los meses archivados traen sus agregados precalculados
+            self.aggregates.months.update(self.archive.aggregates())
+            self.aggregates.save(signature)
+        if not self.ranges.load(signature):
+            daily = planner_day_values(self._frame.df, self.aggregates.sum_columns)
+            archived = self.archive.day_values()
+            if not archived.empty:
+                # Un objetivo agregado después de archivar vale 0 en esos meses
+                daily = pd.concat([archived.reindex(columns=daily.columns, fill_value=0.0), daily])
+            self.ranges.rebuild(daily)
+            self.ranges.save(signature)
+
+    def _save_derived(self, signature):
+        self.aggregates.save(signature)
+        self.ranges.save(signature)
+        self._derived_dirty = False
+
+    def persist_derived(self):
+        # Guarda agregados e índice si quedaron cambios sin persistir y el
+        # frame sigue al día con los archivos
+        with self._lock:
+            if self._derived_dirty and self._frame is not None and self._frame_signature == self._signature():
+                with span('save_aggregates'):
+                    self._save_derived(self._frame_signature)
+
+    def _check_not_archived(self, day):
+        if month_key(day) in self.archive:
+            raise ValueError(f"El mes {month_key(day)} está archivado: restauralo para editarlo.")
+
+    def ensure_day(self, day):
+        # Crea la fila del día con los valores por defecto si todavía no existe
+        with self._lock:
+            frame = self.load()
+            if not frame.has_day(day):
+                self._check_not_archived(day)
+                new_row = self.schema.coerce(pd.DataFrame([self.schema.default_row(day)]))
+                frame.insert(new_row.set_index('Fecha'))
+                row = frame.row(day)
+                self.aggregates.add_day(day, row)
+                deltas = {col: row[col] for col in self.aggregates.sum_columns}
+                deltas[DAYS_SERIES] = 1
+                self.ranges.add(day, deltas)
+                self.revision += 1
+                # Sólo la fecha: los valores por defecto se completan al leer, y
+                # así no pisan lo que otro proceso haya guardado para ese día
+                self.mark_dirty(day, columns=())
+            return frame
+
+    def set_value(self, day, col_name, value):
+        with self._lock:
+            frame = self.load()
+            self._check_not_archived(day)
+            old_value = frame.get(day, col_name)
+            if old_value != value:
+                frame.set(day, col_name, value)
+                self.aggregates.apply_change(day, col_name, old_value, value)
+                if col_name in self.aggregates.sum_columns:
+                    self.ranges.add(day, {col_name: float(value) - float(old_value)})
+                self.revision += 1
+                self.mark_dirty(day, columns=[col_name])
+
+    # --- Escritura ---
+    def mark_dirty(self, day, columns=None):
+        # Se guardan la fecha y las columnas tocadas (None = fila completa); los
+        # valores se leen del frame recién al hacer flush
+        with self._lock:
+            key = _fecha_key(day)
+            previous = self._dirty.get(key)
+            if columns is None or (previous is not None and previous[1] is None):
+                changed = None
+            else:
+                changed = set(columns) | (previous[1] if previous is not None else set())
+            self._dirty[key] = (pd.Timestamp(day), changed)
+
+    def _dirty_records(self):
+        records = []
+        for fecha_key, (ts, changed) in self._dirty.items():
+            row = self._frame.row(ts)
+            columns = [col for col in self.columns if col != 'Fecha' and (changed is None or col in changed)]
+            record = {'Fecha': fecha_key}
+            record.update((col, row[col]) for col in columns)
+            records.append(record)
+        return records
+
+    def has_pending(self):
+        return bool(self._dirty)
+
+    def save(self):
+        if self._writer is None:
+            return self.flush()
+        self._writer.request(PROFILER.current_session())
+        return 0
+
+    @property
+    def last_write_error(self):
+        return self._writer.last_error if self._writer is not None else None
+
+    def close(self):
+        # Escribe lo pendiente, detiene el escritor y persiste los derivados
+        if self._writer is not None:
+            self._writer.close()
+        else:
+            self.flush()
+        self.persist_derived()
+
+    def flush(self, compact=True):
+        with self._lock:
+            if not self._dirty:
+                return 0
+            # Si el frame en memoria estaba al día con el disco, sigue estándolo
+            # después del append: las filas escritas salen de él.
+            frame_is_current = self._frame is not None and self._frame_signature == self._signature()
+            with span('save', filas=len(self._dirty)):
+                lines = ''.join(
+                    json.dumps(record, default=json_default, ensure_ascii=False) + '\n'
+                    for record in self._dirty_records()
+                )
+                with open(self.journal_file, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+            written = len(self._dirty)
+            self._dirty.clear()
+            journal_size = os.path.getsize(self.journal_file)
+            if frame_is_current:
+                # Los derivados en memoria ya incluyen estas filas; el disco
+                # se pone al día más tarde (persist_derived)
+                self._frame_signature = self._signature()
+                self._derived_dirty = True
+        if compact and journal_size >= self.compact_threshold:
+            self.compact_in_background()
+        elif compact:
+            # Un proceso que sigue abierto al cambiar de mes también archiva
+            self._maybe_archive()
+        return written
+
+    def compact(self):
+        # Vuelca base + journal en un nuevo archivo base y vacía el journal.
+        # Si se corta entre el rename y el borrado del journal, al recargar se
+        # vuelve a aplicar: reproducir el journal es idempotente.
+        with self._lock:
+            if not os.path.exists(self.journal_file):
+                return
+            frame_is_current = self._frame is not None and self._frame_signature == self._signature()
+            if self.parquet is not None:
+                # Sólo se reescriben las particiones de los meses del journal
+                records = self._read_journal()
+                months = sorted({record['Fecha'][:7] for record in records})
+                base_df = self.parquet.read(months=months)
+                if not base_df.empty:
+                    base_df['Fecha'] = base_df['Fecha'].dt.strftime('%Y-%m-%d')
+                merged = self.schema.coerce(merge_patches(base_df, records))
+                self.parquet.upsert(merged, key_column='Fecha')
+            else:
+                merged = self.schema.coerce(self._read_merged())
+                atomic_write_csv(merged, self.data_file)
+            os.remove(self.journal_file)
+            if frame_is_current:
+                self._frame_signature = self._signature()
+                self._save_derived(self._frame_signature)
+
+    def drop_columns(self, columns):
+        # Quita columnas del archivo base (p. ej. al mudarlas a otro store).
+        # Primero se compacta para que el journal no las vuelva a traer.
+        with self._lock:
+            self.flush(compact=False)
+            self.compact()
+            if self.parquet is not None:
+                for month in self.parquet.months():
+                    month_df = self.parquet.read(months=[month])
+                    self.parquet.write_month(month, month_df.drop(columns=columns, errors='ignore'))
+            elif os.path.exists(self.data_file):
+                base_df = pd.read_csv(self.data_file, dtype=str, keep_default_na=False)
+                atomic_write_csv(base_df.drop(columns=columns, errors='ignore'), self.data_file)
+            self._frame = None
+            self._frame_signature = None
+
+    # --- Archivo de meses cerrados ---
+    def _first_hot_month(self, today=None, hot_months=None):
+        hot_months = self.hot_months if hot_months is None else hot_months
+        return pd.Period(pd.Timestamp(today or pd.Timestamp.now()), freq='M') - (hot_months - 1)
+
+    def _cold_months(self, frame, first_hot, include_retained=False):
+        cold_df = frame.between(frame.df.index[0], first_hot.start_time) if not frame.empty else frame.df
+        cold = set(cold_df.index.to_period('M').strftime('%Y-%m'))
+        if not include_retained:
+            cold -= self.archive.retained()
+        return sorted(cold)
+
+    def _maybe_archive(self):
+        # Dispara el archivado si el base todavía tiene meses fríos
+        if not self.hot_months or self._frame is None:
+            return
+        if self._cold_months(self._frame, self._first_hot_month()):
+            self.archive_in_background()
+
+    def _month_summary(self, month_df):
+        # Lo que el manifiesto guarda del mes para no tener que leer el segmento
+        aggregates = MonthlyAggregates(None, self.schema)
+        aggregates.rebuild(month_df)
+        daily = planner_day_values(month_df, self.aggregates.sum_columns)
+        last_values = {}
+        for col in self.columns:
+            if col == 'Fecha' or col in self.aggregates.sum_columns or self.schema.config[col]['type'] not in ('float', 'int'):
+                continue
+            manual = manual_values(month_df, col)
+            if not manual.empty:
+                last_values[col] = float(manual.iloc[-1])
+        return {
+            'agregados': next(iter(aggregates.months.values())),
+            'diario': {
+                'fechas': daily.index.strftime('%Y-%m-%d').tolist(),
+                'columnas': list(daily.columns),
+                'valores': daily.to_numpy(dtype=float).tolist(),
+            },
+            'ultimos': last_values,
+        }
+
+    def _rewrite_base(self, months):
+        # Quita del base los meses ya archivados
+        if self.parquet is not None:
+            for month in months:
+                path = self.parquet.partition_path(month)
+                if os.path.exists(path):
+                    os.remove(path)
+        else:
+            atomic_write_csv(self.schema.coerce(self._read_merged()), self.data_file)
+
+    def archive_cold_months(self, today=None, hot_months=None, include_retained=False):
+        # Mueve al archivo los meses anteriores a los `hot_months` más
+        # recientes (los restaurados, sólo con `include_retained`). Cada
+        # segmento se escribe (y entra al manifiesto) antes de sacar su mes
+        # del base. Devuelve los meses archivados.
+        hot_months = self.hot_months if hot_months is None else hot_months
+        if not hot_months:
+            return []
+        first_hot = self._first_hot_month(today, hot_months)
+        with self._lock:
+            self.flush(compact=False)
+            frame = self.load()
+            cold = self._cold_months(frame, first_hot, include_retained)
+            if not cold:
+                return []
+            # El journal pasa al base antes de armar los segmentos
+            self.compact()
+            with span('archive', meses=len(cold)):
+                for month in cold:
+                    month_df = frame.month(pd.Period(month, freq='M').start_time)
+                    self.archive.write_month(month, month_df.reset_index(), self._month_summary(month_df))
+                self._rewrite_base(cold)
+            # Los agregados y el índice de rangos no cambian: los meses
+            # archivados siguen contando, ahora desde el manifiesto
+            archived = frame.df.index.to_period('M').strftime('%Y-%m').isin(cold)
+            self._frame = PlannerFrame(frame.df[~archived])
+            self._frame_signature = self._signature()
+            self._save_derived(self._frame_signature)
+        return cold
+
+    def restore_months(self, months=None):
+        # Devuelve meses archivados al base (todos, sin `months`). Se leen y
+        # verifican todos los segmentos antes de tocar nada.
+        with self._lock:
+            months = self.archive.months() if months is None else sorted(months)
+            missing = [month for month in months if month not in self.archive]
+            if missing:
+                raise ValueError(f"Meses no archivados: {', '.join(missing)}")
+            if not months:
+                return []
+            self.flush(compact=False)
+            self.compact()
+            restored_df = self.schema.coerce(pd.concat(
+                [self.archive.read_month(month, dtype=self.schema.csv_dtypes()) for month in months], ignore_index=True
+            ))
+            with span('restore', meses=len(months)):
+                if self.parquet is not None:
+                    self.parquet.upsert(restored_df, key_column='Fecha')
+                else:
+                    base_df = self.schema.coerce(self._read_merged())
+                    merged = pd.concat([restored_df, base_df], ignore_index=True).sort_values('Fecha', kind='stable')
+                    atomic_write_csv(merged, self.data_file)
+                for month in months:
+                    self.archive.remove_month(month)
+            self._frame = None
+            self._frame_signature = None
+        return months
+
+    def _in_background(self, target, name):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=target, name=name, daemon=True)
+        self._compactor.start()
+
+    def compact_in_background(self):
+        self._in_background(self.compact, 'planner-compactor')
+
+    def archive_in_background(self):
+        self._in_background(self.archive_cold_months, 'planner-archiver')
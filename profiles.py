@@ -0,0 +1,44 @@
+import os
+import re
+import unicodedata
+
+
+# --- Perfiles (un shard de datos por persona u hogar) ---
+# El perfil principal usa los archivos de siempre en el directorio de trabajo,
+# así los datos existentes no necesitan migración. Cada perfil adicional vive
+# en su propio directorio dentro de PROFILES_DIR con los mismos nombres de
+# archivo; ningún perfil comparte archivos, locks ni caches con otro.
+PROFILES_DIR = 'perfiles'
+DEFAULT_PROFILE = 'principal'
+
+
+def profile_slug(name):
+    # "Casa García" -> "casa-garcia"
+    ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-')
+
+
+def profile_dir(profile, root=PROFILES_DIR):
+    if profile == DEFAULT_PROFILE:
+        return '.'
+    return os.path.join(root, profile)
+
+
+def profile_path(profile, filename, root=PROFILES_DIR):
+    return os.path.normpath(os.path.join(profile_dir(profile, root), filename))
+
+
+def list_profiles(root=PROFILES_DIR):
+    others = []
+    if os.path.isdir(root):
+        others = sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+    return [DEFAULT_PROFILE] + [name for name in others if name != DEFAULT_PROFILE]
+
+
+def create_profile(name, root=PROFILES_DIR):
+    slug = profile_slug(name)
+    if not slug:
+        raise ValueError("El nombre del perfil tiene que tener al menos una letra o número.")
+    if slug != DEFAULT_PROFILE:
+        os.makedirs(profile_dir(slug, root), exist_ok=True)
+    return slug
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+
+# --- Perfilado de Rutas Calientes ---
+# Spans con nombre alrededor de cada etapa (carga, coerción, render de cada
+# sección, guardado, dibujo de gráficos). Sólo se registran dentro de un rerun
+# con perfilado activo; en cualquier otro caso span() devuelve un context
+# manager vacío compartido, así que el costo con el perfilado apagado es una
+# llamada a función y una lectura de thread-local.
+#
+# El trabajo que un rerun delega a otro hilo (el guardado del escritor en
+# segundo plano) se registra aparte: el hilo abre un registro "background"
+# con las sesiones que lo pidieron y sus spans quedan en cada una de ellas.
+PROFILING_ENV_VAR = 'PLANNER_PROFILING'
+MAX_RERUNS_PER_SESSION = 500
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('record', 'name', 'args', 'start')
+
+    def __init__(self, record, name, args):
+        self.record = record
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        self.record['spans'].append({
+            'name': self.name,
+            'start_ns': self.start,
+            'duration_ns': end - self.start,
+            'args': self.args,
+        })
+        return False
+
+
+class Profiler:
+    def __init__(self, max_reruns=MAX_RERUNS_PER_SESSION):
+        self.max_reruns = max_reruns
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions = defaultdict(lambda: deque(maxlen=self.max_reruns))
+
+    # --- Ciclo de un rerun ---
+    def begin_rerun(self, session_id, enabled=True):
+        # Un rerun interrumpido (st.rerun, st.stop) no llega a end_rerun: su
+        # registro simplemente se descarta al empezar el siguiente.
+        if not enabled:
+            self._local.record = None
+            return
+        self._local.record = self._new_record('rerun', [session_id])
+
+    def begin_background(self, kind, session_ids):
+        # Registro de un hilo de trabajo (kind: 'writer', ...) para las
+        # sesiones que lo pidieron con el perfilado activo; sin ninguna, nada
+        # se registra. Se cierra con end_rerun, como un rerun.
+        session_ids = sorted(session_id for session_id in session_ids if session_id is not None)
+        self._local.record = self._new_record(kind, session_ids) if session_ids else None
+
+    def _new_record(self, kind, session_ids):
+        return {
+            'session': session_ids[0],
+            'sessions': session_ids,
+            'kind': kind,
+            'thread': threading.get_ident(),
+            'start_ns': time.perf_counter_ns(),
+            'wall_time': time.time(),
+            'spans': [],
+        }
+
+    def end_rerun(self):
+        record = getattr(self._local, 'record', None)
+        self._local.record = None
+        if record is None:
+            return None
+        record['duration_ns'] = time.perf_counter_ns() - record['start_ns']
+        with self._lock:
+            for session_id in record.pop('sessions'):
+                self._sessions[session_id].append({**record, 'session': session_id})
+        return record
+
+    def current_session(self):
+        # Sesión del rerun que se está registrando en este hilo, o None
+        record = getattr(self._local, 'record', None)
+        return record['session'] if record is not None and record['kind'] == 'rerun' else None
+
+    def span(self, name, **args):
+        record = getattr(self._local, 'record', None)
+        if record is None:
+            return _NULL_SPAN
+        return _Span(record, name, args)
+
+    # --- Consultas ---
+    def reruns(self, session_id=None):
+        with self._lock:
+            if session_id is not None:
+                return list(self._sessions.get(session_id, ()))
+            return [record for records in self._sessions.values() for record in records]
+
+    def percentiles(self, session_id=None, quantiles=(50, 90, 99)):
+        # Devuelve {nombre: {'n', 'p50', 'p90', 'p99', 'max', 'total'}} en ms
+        durations = defaultdict(list)
+        for record in self.reruns(session_id):
+            durations[record['kind']].append(record['duration_ns'])
+            for span_record in record['spans']:
+                durations[span_record['name']].append(span_record['duration_ns'])
+        summary = {}
+        for name, values in durations.items():
+            values_ms = np.asarray(values, dtype=float) / 1e6
+            row = {'n': len(values_ms)}
+            for q, value in zip(quantiles, np.percentile(values_ms, quantiles)):
+                row[f'p{q}'] = round(float(value), 3)
+            row['max'] = round(float(values_ms.max()), 3)
+            row['total'] = round(float(values_ms.sum()), 3)
+            summary[name] = row
+        return summary
+
+    def clear(self, session_id=None):
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+
+# --- Exportación ---
+def to_jsonl(reruns):
+    # Una línea por span, con su rerun y sesión
+    lines = []
+    for index, record in enumerate(reruns):
+        for span_record in record['spans']:
+            lines.append(json.dumps({
+                'session': record['session'],
+                'rerun': index,
+                'kind': record['kind'],
+                'wall_time': record['wall_time'],
+                'name': span_record['name'],
+                'offset_ms': (span_record['start_ns'] - record['start_ns']) / 1e6,
+                'duration_ms': span_record['duration_ns'] / 1e6,
+                'args': span_record['args'],
+            }, ensure_ascii=False, default=str))
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+
+def to_chrome_trace(reruns):
+    # Formato "Trace Event" (chrome://tracing, Perfetto): eventos completos 'X'
+    # en microsegundos; cada sesión es un proceso y cada hilo su tid.
+    events = []
+    session_pids = {}
+    for record in reruns:
+        pid = session_pids.setdefault(record['session'], len(session_pids) + 1)
+        tid = record['thread']
+        events.append({
+            'name': record['kind'], 'ph': 'X', 'pid': pid, 'tid': tid,
+            'ts': record['start_ns'] / 1000, 'dur': record['duration_ns'] / 1000,
+        })
+        for span_record in record['spans']:
+            events.append({
+                'name': span_record['name'], 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': span_record['start_ns'] / 1000, 'dur': span_record['duration_ns'] / 1000,
+                'args': {key: str(value) for key, value in span_record['args'].items()},
+            })
+    for session, pid in session_pids.items():
+        events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f'sesión {session}'}})
+    return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'})
+
+
+# Perfilador del proceso: lo comparten la app y los stores
+PROFILER = Profiler()
+span = PROFILER.span
+
+
+def profiling_enabled_by_env():
+    return os.environ.get(PROFILING_ENV_VAR, '') not in ('', '0', 'false', 'False')
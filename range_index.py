@@ -0,0 +1,235 @@
+import json
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from file_io import atomic_open
+
+
+# --- Índice de Sumas Prefijas por Día ---
+# Por cada serie (un objetivo diario, o el ingreso/gasto de una categoría) se
+# guarda la suma acumulada día por día desde el primer día con datos. El
+# total de cualquier rango [start, end) es acum[end] - acum[start]: dos
+# lecturas, sin importar cuántos días abarque. Un cambio en un día suma su
+# delta a la cola del arreglo (una operación vectorizada) en lugar de volver
+# a recorrer el historial.
+DAYS_SERIES = 'Días'
+ONE_DAY = np.timedelta64(1, 'D')
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+def finance_series(tipo, categoria):
+    return f"{tipo}:{categoria}"
+
+
+class PrefixSums:
+    def __init__(self, path, series=None):
+        self.path = path
+        # Con series fijas (el planner) un archivo con otras series no sirve;
+        # sin ellas (finanzas) las series aparecen a medida que llegan datos
+        self.fixed = series is not None
+        self.series = list(series or [])
+        self._positions = {name: i for i, name in enumerate(self.series)}
+        self.origin = None
+        # Fila i = suma de los días [origin, origin + i); la fila 0 es cero
+        self.cums = np.zeros((1, len(self.series)))
+
+    @property
+    def days(self):
+        return len(self.cums) - 1
+
+    def covered(self):
+        # Rango [inicio, fin) de días que cubre el índice
+        if self.origin is None:
+            return None
+        start = pd.Timestamp(self.origin).date()
+        return start, start + timedelta(days=self.days)
+
+    # --- Persistencia ---
+    def load(self, signature):
+        # Devuelve True si el archivo persistido corresponde a los datos actuales
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as payload:
+                if str(payload['signature']) != json.dumps(signature):
+                    return False
+                series = [str(name) for name in payload['series']]
+                cums = payload['cums']
+                origin = payload['origin']
+        except (OSError, ValueError, KeyError):
+            return False
+        if self.fixed and series != self.series:
+            return False
+        self.series = series
+        self._positions = {name: i for i, name in enumerate(series)}
+        self.cums = cums
+        self.origin = None if np.isnat(origin) else origin[()]
+        return True
+
+    def save(self, signature):
+        # Con un archivo abierto np.savez no agrega la extensión al nombre
+        with atomic_open(self.path, 'wb') as f:
+            np.savez(
+                f,
+                signature=np.array(json.dumps(signature)),
+                series=np.array(self.series, dtype=str),
+                cums=self.cums,
+                origin=np.datetime64('NaT', 'D') if self.origin is None else self.origin,
+            )
+
+    # --- Construcción completa (sólo cuando no hay archivo válido) ---
+    def rebuild(self, daily):
+        # `daily`: un valor por día y serie, indexado por fecha (puede tener
+        # huecos y días repetidos)
+        self.origin = None
+        self.cums = np.zeros((1, len(self.series)))
+        self.add_daily(daily)
+
+    # --- Actualización por deltas ---
+    def _ensure_series(self, name):
+        if name in self._positions:
+            return
+        self._positions[name] = len(self.series)
+        self.series.append(name)
+        self.cums = np.hstack([self.cums, np.zeros((len(self.cums), 1))])
+
+    def _cover(self, day):
+        # Extiende el arreglo para que incluya `day` y devuelve su posición
+        if self.origin is None:
+            self.origin = day
+            self.cums = np.zeros((2, len(self.series)))
+            return 0
+        offset = int((day - self.origin) // ONE_DAY)
+        if offset < 0:
+            # Días anteriores al origen: sus sumas acumuladas son cero
+            self.cums = np.vstack([np.zeros((-offset, len(self.series))), self.cums])
+            self.origin = day
+            offset = 0
+        elif offset >= self.days:
+            extra = offset - self.days + 1
+            self.cums = np.vstack([self.cums, np.repeat(self.cums[-1:], extra, axis=0)])
+        return offset
+
+    def add(self, day, deltas):
+        # Suma `deltas` ({serie: valor}) al día `day`
+        if not deltas:
+            return
+        for name in deltas:
+            self._ensure_series(name)
+        offset = self._cover(_day(day))
+        columns = [self._positions[name] for name in deltas]
+        self.cums[offset + 1:, columns] += np.array([float(value) for value in deltas.values()])
+
+    def add_daily(self, daily):
+        # Como add, pero para muchos días de una vez (p. ej. una importación):
+        # un solo cumsum en lugar de una actualización de la cola por día
+        if daily.empty:
+            return
+        for name in daily.columns:
+            self._ensure_series(name)
+        days = pd.DatetimeIndex(daily.index).values.astype('datetime64[D]')
+        self._cover(days.min())
+        self._cover(days.max())
+        offsets = (days - self.origin) // ONE_DAY
+        values = np.zeros((self.days, len(self.series)))
+        columns = np.array([self._positions[name] for name in daily.columns], dtype=int)
+        np.add.at(values, (offsets[:, None], columns[None, :]), daily.to_numpy(dtype=float))
+        self.cums[1:] += np.cumsum(values, axis=0)
+
+    # --- Consultas ---
+    def _offset(self, day):
+        # Posición de `day` en el arreglo, recortada a los días cubiertos
+        if self.origin is None:
+            return 0
+        return int(np.clip((_day(day) - self.origin) // ONE_DAY, 0, self.days))
+
+    def totals(self, start, end):
+        # Total de cada serie en [start, end)
+        start_pos = self._offset(start)
+        end_pos = max(self._offset(end), start_pos)
+        return pd.Series(self.cums[end_pos] - self.cums[start_pos], index=self.series, dtype=float)
+
+    def totals_between(self, boundaries):
+        # Totales de cada serie entre fechas consecutivas de `boundaries` (p. ej.
+        # inicios de mes): una resta vectorizada de filas de sumas acumuladas
+        if self.origin is None:
+            return pd.DataFrame(0.0, index=range(max(len(boundaries) - 1, 0)), columns=self.series)
+        days = np.array([_day(day) for day in boundaries], dtype='datetime64[D]')
+        positions = np.clip((days - self.origin) // ONE_DAY, 0, self.days)
+        return pd.DataFrame(np.diff(self.cums[positions], axis=0), columns=self.series)
+
+    def day_values(self, start, end):
+        # Valor de cada serie en cada día de [start, end): restas entre filas
+        # consecutivas de las sumas acumuladas, sin recorrer transacciones
+        days = pd.date_range(start, end, freq='D', inclusive='left')
+        if self.origin is None:
+            return pd.DataFrame(0.0, index=days, columns=self.series)
+        first = (_day(start) - self.origin) // ONE_DAY
+        positions = np.clip(first + np.arange(len(days) + 1), 0, self.days)
+        return pd.DataFrame(np.diff(self.cums[positions], axis=0), index=days, columns=self.series)
+
+    def total(self, name, start, end):
+        position = self._positions.get(name)
+        if position is None:
+            return 0.0
+        start_pos = self._offset(start)
+        end_pos = max(self._offset(end), start_pos)
+        return float(self.cums[end_pos, position] - self.cums[start_pos, position])
+
+
+# --- Valores diarios de cada fuente ---
+def planner_day_values(frame_df, columns):
+    # Objetivos diarios (bool cuenta como 0/1) y un 1 por día registrado
+    daily = frame_df[columns].astype(float)
+    daily[DAYS_SERIES] = 1.0
+    return daily
+
+
+def finance_day_values(totals_df):
+    # `totals_df`: columnas Fecha, Tipo, Categoría, Monto (un total por grupo)
+    if totals_df.empty:
+        return pd.DataFrame(index=pd.DatetimeIndex([]))
+    series = totals_df['Tipo'].astype(str) + ':' + totals_df['Categoría'].astype(str)
+    daily = totals_df.assign(Serie=series).pivot_table(
+        index='Fecha', columns='Serie', values='Monto', aggfunc='sum', fill_value=0.0
+    )
+    daily.index = pd.to_datetime(daily.index)
+    return daily
+
+
+def finance_breakdown(totals):
+    # Separa los totales de finance_series en {tipo: Series por categoría}
+    breakdown = {}
+    for name, value in totals.items():
+        tipo, _, categoria = name.partition(':')
+        breakdown.setdefault(tipo, {})[categoria] = value
+    return {
+        tipo: pd.Series(values, name='Monto', dtype=float).rename_axis('Categoría').sort_values(ascending=False)
+        for tipo, values in breakdown.items()
+    }
+
+
+# --- Rangos predefinidos ---
+def preset_ranges(today):
+    # Rangos [inicio, fin) que terminan hoy (incluido)
+    end = today + timedelta(days=1)
+    quarter_month = 3 * ((today.month - 1) // 3) + 1
+    return {
+        'Últimos 7 días': (end - timedelta(days=7), end),
+        'Últimos 30 días': (end - timedelta(days=30), end),
+        'Últimos 90 días': (end - timedelta(days=90), end),
+        'Trimestre actual': (today.replace(month=quarter_month, day=1), end),
+        'Año actual': (today.replace(month=1, day=1), end),
+    }
+
+
+def previous_range(start, end):
+    # El rango de igual duración inmediatamente anterior
+    length = end - start
+    return start - length, start
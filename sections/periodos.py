@@ -0,0 +1,4 @@
+import streamlit as st
+
+# Página de la sección; planner_app.py registra su render en cada corrida
+st.session_state.section_renders['periodos']()
@@ -0,0 +1,260 @@
+import json
+import os
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from file_io import atomic_write_json
+from planner_aggregates import month_key
+from profiling import span
+
+
+# --- Presupuestos y Alertas de Gastos ---
+# Dos controles sobre los gastos:
+#   - presupuestos mensuales por categoría, cargados por el usuario;
+#   - anomalías: el gasto de cada categoría en cada mes, y el gasto total de
+#     cada día, se comparan con la mediana de los meses (días) anteriores,
+#     usando la desviación absoluta mediana (MAD) como escala.
+# Los montos salen del índice de sumas prefijas (una resta por mes o por día)
+# y las líneas de base de todo el historial se calculan de una vez con
+# ventanas deslizantes de numpy. Una transacción del mes en curso no cambia
+# ninguna línea de base (sólo miran hacia atrás): se recalculan únicamente
+# las filas del mes en curso.
+BASELINE_MONTHS = 6
+MIN_BASELINE_MONTHS = 3
+BASELINE_DAYS = 90
+MIN_BASELINE_DAYS = 30
+ANOMALY_THRESHOLD = 3.5
+# MAD * 1.4826 estima el desvío estándar; con gastos casi fijos (alquiler)
+# la MAD es ~0 y cualquier diferencia sería anómala: la escala mínima es una
+# fracción de la mediana
+MAD_TO_SIGMA = 1.4826
+MIN_RELATIVE_SPREAD = 0.1
+RECENT_DAYS = 30
+
+ALERT_COLUMNS = ['Mes', 'Categoría', 'Gasto', 'Mediana', 'Puntaje']
+DAY_ALERT_COLUMNS = ['Fecha', 'Gasto', 'Mediana', 'Puntaje']
+
+
+# --- Presupuestos ---
+def load_budgets(path):
+    # {categoría: presupuesto mensual}; sin archivo, ningún presupuesto
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            budgets = json.load(f)
+    except ValueError:
+        return {}
+    return {str(categoria): float(monto) for categoria, monto in budgets.items() if monto and float(monto) > 0}
+
+
+def save_budgets(path, budgets):
+    atomic_write_json({categoria: float(monto) for categoria, monto in budgets.items() if monto > 0}, path, indent=2)
+
+
+def budget_status(spent, budgets, today):
+    # Uso de cada presupuesto en el mes de `today`, con la proyección a fin de
+    # mes al ritmo actual
+    budgets = pd.Series(budgets, dtype=float)
+    status = pd.DataFrame({
+        'Presupuesto': budgets,
+        'Gastado': spent.reindex(budgets.index, fill_value=0.0).astype(float),
+    }).rename_axis('Categoría')
+    today = pd.Timestamp(today)
+    status['Restante'] = status['Presupuesto'] - status['Gastado']
+    status['Uso'] = status['Gastado'] / status['Presupuesto']
+    status['Proyección'] = status['Gastado'] * today.days_in_month / today.day
+    status['Estado'] = np.select(
+        [status['Gastado'] > status['Presupuesto'], status['Proyección'] > status['Presupuesto']],
+        ['Excedido', 'En riesgo'], default='En curso'
+    )
+    return status.sort_values('Uso', ascending=False)
+
+
+# --- Líneas de base ---
+def robust_baselines(values, window, min_count):
+    # `values`: matriz (períodos, series). Para cada fila, mediana y escala de
+    # las `window` filas anteriores (NaN si hay menos de `min_count`)
+    rows, columns = values.shape
+    padded = np.vstack([np.full((window, columns), np.nan), values])
+    windows = sliding_window_view(padded, window, axis=0)[:rows]
+    counts = np.sum(~np.isnan(windows), axis=2)
+    with warnings.catch_warnings():
+        # Ventanas todavía vacías al comienzo del historial
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(windows, axis=2)
+        mad = np.nanmedian(np.abs(windows - median[..., None]), axis=2)
+    spread = np.maximum(MAD_TO_SIGMA * mad, MIN_RELATIVE_SPREAD * median)
+    missing = counts < min_count
+    median[missing] = np.nan
+    spread[missing] = np.nan
+    return median, spread
+
+
+def anomaly_scores(values, median, spread):
+    # Desvíos robustos por encima de la mediana; NaN sin línea de base
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = (values - median) / spread
+    scores[~(spread > 0)] = np.nan
+    return scores
+
+
+def _spent_before(finance_index, day):
+    # Gasto acumulado de cada categoría antes de `day`
+    covered = finance_index.covered()
+    if covered is None:
+        return pd.Series(dtype=float)
+    totals = finance_index.totals(covered[0], day)
+    totals = totals[[name.startswith('Gasto:') for name in totals.index]]
+    return totals[totals != 0]
+
+
+class SpendingMonitor:
+    def __init__(self):
+        self.categories = []
+        self.months = pd.PeriodIndex([], freq='M')
+        self.monthly = np.zeros((0, 0))
+        self.monthly_median = np.zeros((0, 0))
+        self.monthly_spread = np.zeros((0, 0))
+        self.days = pd.DatetimeIndex([])
+        self.daily = np.zeros(0)
+        self.daily_median = np.zeros(0)
+        self.daily_spread = np.zeros(0)
+        self._month = None
+        self._frozen = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    # --- Construcción ---
+    def _series(self):
+        return [f"Gasto:{categoria}" for categoria in self.categories]
+
+    def rebuild(self, finance_index, today):
+        # Todo el historial, desde el primer mes con movimientos hasta el de `today`
+        current = pd.Period(pd.Timestamp(today), freq='M')
+        covered = finance_index.covered()
+        first = min(pd.Period(pd.Timestamp(covered[0]), freq='M'), current) if covered else current
+        self.months = pd.period_range(first, current, freq='M')
+        self.categories = sorted(name.split(':', 1)[1] for name in finance_index.series if name.startswith('Gasto:'))
+
+        boundaries = [period.start_time for period in self.months] + [(current + 1).start_time]
+        totals = finance_index.totals_between(boundaries).reindex(columns=self._series(), fill_value=0.0)
+        self.monthly = np.array(totals, dtype=float)
+        self.monthly_median, self.monthly_spread = robust_baselines(self.monthly, BASELINE_MONTHS, MIN_BASELINE_MONTHS)
+
+        end = pd.Timestamp(today).normalize() + pd.Timedelta(days=1)
+        daily = finance_index.day_values(first.start_time, end).reindex(columns=self._series(), fill_value=0.0)
+        self.days = daily.index
+        self.daily = daily.sum(axis=1).to_numpy(dtype=float)
+        median, spread = robust_baselines(self.daily[:, None], BASELINE_DAYS, MIN_BASELINE_DAYS)
+        self.daily_median, self.daily_spread = median[:, 0], spread[:, 0]
+
+    def _update_current_month(self, finance_index, today):
+        # Sólo cambió el mes en curso: su fila mensual (la línea de base mira
+        # los meses anteriores, que no cambiaron) y sus días, con la ventana
+        # de días previos que necesitan
+        current = self.months[-1]
+        self.monthly[-1] = finance_index.totals(current.start_time, (current + 1).start_time).reindex(
+            self._series(), fill_value=0.0
+        ).to_numpy(dtype=float)
+
+        end = pd.Timestamp(today).normalize() + pd.Timedelta(days=1)
+        month_days = finance_index.day_values(current.start_time, end).reindex(columns=self._series(), fill_value=0.0)
+        keep = int(self.days.searchsorted(current.start_time))
+        values = np.concatenate([self.daily[:keep], month_days.sum(axis=1).to_numpy(dtype=float)])
+        tail = values[max(keep - BASELINE_DAYS, 0):]
+        median, spread = robust_baselines(tail[:, None], BASELINE_DAYS, MIN_BASELINE_DAYS)
+        month_rows = len(values) - keep
+        self.days = self.days[:keep].append(month_days.index)
+        self.daily = values
+        self.daily_median = np.concatenate([self.daily_median[:keep], median[len(tail) - month_rows:, 0]])
+        self.daily_spread = np.concatenate([self.daily_spread[:keep], spread[len(tail) - month_rows:, 0]])
+
+    def refresh(self, finance_index, revision, today):
+        # Reconstruye sólo si cambió algo anterior al mes en curso (una
+        # transacción con fecha vieja, otro proceso), si apareció una
+        # categoría nueva o si empezó otro mes
+        signature = [revision, pd.Timestamp(today).strftime('%Y-%m-%d')]
+        with self._lock:
+            if signature == self._signature:
+                return self
+            month_start = pd.Timestamp(today).replace(day=1)
+            frozen = _spent_before(finance_index, month_start)
+            categories = {name.split(':', 1)[1] for name in finance_index.series if name.startswith('Gasto:')}
+            if (self._month == month_key(today) and self._frozen is not None and frozen.equals(self._frozen)
+                    and categories <= set(self.categories)):
+                with span('spending_update'):
+                    self._update_current_month(finance_index, today)
+            else:
+                with span('spending_rebuild'):
+                    self.rebuild(finance_index, today)
+            self._month = month_key(today)
+            self._frozen = frozen
+            self._signature = signature
+            return self
+
+    # --- Consultas ---
+    def month_spent(self, day):
+        # Gasto de cada categoría en el mes de `day`
+        position = self.months.searchsorted(pd.Period(pd.Timestamp(day), freq='M'))
+        if position >= len(self.months) or self.months[position] != pd.Period(pd.Timestamp(day), freq='M'):
+            return pd.Series(0.0, index=self.categories, dtype=float)
+        return pd.Series(self.monthly[position], index=self.categories, dtype=float)
+
+    def category_alerts(self, months=None):
+        # (mes, categoría) con gasto anómalo, del más reciente al más antiguo;
+        # con `months`, sólo los últimos `months` meses
+        scores = anomaly_scores(self.monthly, self.monthly_median, self.monthly_spread)
+        if months is not None:
+            scores[:-months] = np.nan
+        rows, columns = np.nonzero(scores > ANOMALY_THRESHOLD)
+        alerts = pd.DataFrame({
+            'Mes': self.months[rows].strftime('%Y-%m'),
+            'Categoría': np.array(self.categories, dtype=object)[columns],
+            'Gasto': self.monthly[rows, columns],
+            'Mediana': self.monthly_median[rows, columns],
+            'Puntaje': scores[rows, columns],
+        }, columns=ALERT_COLUMNS)
+        return alerts.sort_values(['Mes', 'Puntaje'], ascending=[False, False], ignore_index=True)
+
+    def day_alerts(self, days=RECENT_DAYS):
+        # Días con gasto total anómalo entre los últimos `days`
+        scores = anomaly_scores(self.daily, self.daily_median, self.daily_spread)
+        recent = np.arange(len(scores)) >= len(scores) - days
+        positions = np.nonzero(recent & (scores > ANOMALY_THRESHOLD))[0][::-1]
+        return pd.DataFrame({
+            'Fecha': self.days[positions].date,
+            'Gasto': self.daily[positions],
+            'Mediana': self.daily_median[positions],
+            'Puntaje': scores[positions],
+        }, columns=DAY_ALERT_COLUMNS)
+
+    def check(self, day, categoria):
+        # Alertas que dispara un gasto recién registrado: su categoría en su
+        # mes y el total de su día
+        alerts = []
+        month = pd.Period(pd.Timestamp(day), freq='M')
+        row = self.months.searchsorted(month)
+        if row < len(self.months) and self.months[row] == month and categoria in self.categories:
+            column = self.categories.index(categoria)
+            cell = (slice(row, row + 1), slice(column, column + 1))
+            score = anomaly_scores(self.monthly[cell], self.monthly_median[cell], self.monthly_spread[cell])[0, 0]
+            if score > ANOMALY_THRESHOLD:
+                alerts.append(
+                    f"El gasto en {categoria} de {month.strftime('%m/%Y')} (${self.monthly[row, column]:.2f}) es "
+                    f"inusualmente alto: la mediana de los meses anteriores es ${self.monthly_median[row, column]:.2f}."
+                )
+        position = self.days.searchsorted(pd.Timestamp(day))
+        if position < len(self.days) and self.days[position] == pd.Timestamp(day):
+            cell = slice(position, position + 1)
+            score = anomaly_scores(self.daily[cell], self.daily_median[cell], self.daily_spread[cell])[0]
+            if score > ANOMALY_THRESHOLD:
+                alerts.append(
+                    f"El gasto total del {pd.Timestamp(day).strftime('%d/%m/%Y')} (${self.daily[position]:.2f}) es "
+                    f"inusualmente alto: la mediana de los días anteriores es ${self.daily_median[position]:.2f}."
+                )
+        return alerts
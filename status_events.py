@@ -0,0 +1,228 @@
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from file_io import atomic_write_json, file_signature
+from file_lock import FileLock
+
+
+# --- Registro de Eventos de Estado (Salud y Proyectos) ---
+# Los turnos de salud y el estado de los proyectos no son métricas diarias:
+# cambian pocas veces. En lugar de copiarlos en cada fila del planner se
+# guarda un evento (ítem, fecha, nuevo estado) por cada cambio, en un archivo
+# de solo-agregado, y el estado actual en una pequeña instantánea
+# materializada. El registro completo permite responder "¿cuándo terminé?".
+STATUS_SECTIONS = ('health', 'projects')
+EVENTS_FILE = 'status_events.jsonl'
+SNAPSHOT_SUFFIX = '.snapshot.json'
+EVENT_COLUMNS = ['Ítem', 'Fecha', 'Estado']
+
+
+def status_items(objectives_config):
+    # {ítem: valor por defecto} de los objetivos que se registran como eventos
+    items = {}
+    for name, config in objectives_config.items():
+        if config['section'] in STATUS_SECTIONS:
+            items[name] = (config.get('options') or [''])[0] if config['type'] == 'str' else False
+    return items
+
+
+def daily_config(objectives_config):
+    # La configuración sin los objetivos de estado: lo que queda en cada fila
+    return {name: config for name, config in objectives_config.items() if config['section'] not in STATUS_SECTIONS}
+
+
+def _day_str(day):
+    return pd.Timestamp(day).strftime('%Y-%m-%d')
+
+
+class StatusEventLog:
+    def __init__(self, path, items):
+        self.path = path
+        self.snapshot_path = path + SNAPSHOT_SUFFIX
+        self.items = dict(items)
+        self._lock = FileLock(path)
+        self._events = None
+        self._signature = None
+        self._states = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    # --- Lectura ---
+    def _read_events(self):
+        events = []
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        break
+        return events
+
+    def _refresh(self):
+        # La instantánea sólo vale si corresponde al archivo de eventos actual;
+        # si no, se recalcula reproduciendo los eventos (son pocos)
+        with self._lock:
+            signature = file_signature(self.path)
+            if self._states is not None and signature == self._signature:
+                return
+            self._events = None
+            states = None
+            if os.path.exists(self.snapshot_path):
+                try:
+                    with open(self.snapshot_path, encoding='utf-8') as f:
+                        payload = json.load(f)
+                    # JSON guarda la firma como lista
+                    if payload.get('signature') == (list(signature) if signature is not None else None):
+                        states = payload['states']
+                except ValueError:
+                    states = None
+            if states is None:
+                states = self._replay(self.events())
+                self._save_snapshot(states, signature)
+            self._states = states
+            self._signature = signature
+
+    def _replay(self, events):
+        # Estado de cada ítem según el último evento por fecha (a igual fecha
+        # gana el registrado después)
+        states = {}
+        for event in sorted(events, key=lambda event: event['Fecha']):
+            states[event['Ítem']] = {'Estado': event['Estado'], 'Fecha': event['Fecha']}
+        return states
+
+    def _save_snapshot(self, states, signature):
+        atomic_write_json({'signature': signature, 'states': states}, self.snapshot_path)
+
+    def events(self):
+        with self._lock:
+            if self._events is None or file_signature(self.path) != self._signature:
+                self._events = self._read_events()
+            return self._events
+
+    def current(self, item):
+        self._refresh()
+        state = self._states.get(item)
+        return state['Estado'] if state is not None else self.items.get(item)
+
+    def states(self):
+        self._refresh()
+        return {item: self.current(item) for item in self.items}
+
+    def states_on(self, days):
+        # Estado de cada ítem al final de cada día de `days` (DataFrame días ×
+        # ítems), en una sola pasada sobre los eventos en vez de un replay por día
+        days = pd.DatetimeIndex(pd.to_datetime(list(days)))
+        table = pd.DataFrame(index=days, columns=list(self.items), dtype=object)
+        history = self.history()
+        history = history[history['Ítem'].isin(self.items)]
+        if not history.empty:
+            # Por fecha y en orden de registro: a igual fecha gana el último
+            changes = history.assign(Fecha=pd.to_datetime(history['Fecha'])).drop_duplicates(
+                subset=['Fecha', 'Ítem'], keep='last'
+            ).pivot(index='Fecha', columns='Ítem', values='Estado')
+            changes = changes.reindex(changes.index.union(days)).ffill().reindex(days)
+            table.update(changes)
+        for item, default in self.items.items():
+            table[item] = table[item].where(table[item].notna(), default)
+        return table
+
+    def signature(self):
+        # Cambia con cada evento agregado; valida los puntajes calculados
+        return file_signature(self.path)
+
+    def history(self, item=None):
+        df = pd.DataFrame(self.events(), columns=EVENT_COLUMNS + ['Registrado'])
+        if item is not None:
+            df = df[df['Ítem'] == item]
+        return df.sort_values(by='Fecha', kind='stable').reset_index(drop=True)
+
+    def reached_on(self, item, state):
+        # Fecha en la que el ítem pasó por última vez a `state`, si hoy sigue así
+        self._refresh()
+        current = self._states.get(item)
+        if current is None or current['Estado'] != state:
+            return None
+        return current['Fecha']
+
+    # --- Escritura ---
+    def append_events(self, events):
+        with self._lock:
+            self._refresh()
+            known_events = self._events
+            lines = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            # La instantánea se actualiza en el lugar: no hace falta releer
+            states = self._states
+            if known_events is not None:
+                self._events = known_events + list(events)
+            for event in sorted(events, key=lambda event: event['Fecha']):
+                previous = states.get(event['Ítem'])
+                if previous is None or event['Fecha'] >= previous['Fecha']:
+                    states[event['Ítem']] = {'Estado': event['Estado'], 'Fecha': event['Fecha']}
+            self._signature = file_signature(self.path)
+            self._states = states
+            self._save_snapshot(states, self._signature)
+
+    def set_state(self, item, day, state):
+        # Sólo registra un evento si el estado realmente cambió
+        with self._lock:
+            self._refresh()
+            if self.current(item) == state:
+                return False
+            self.append_events([{
+                'Ítem': item, 'Fecha': _day_str(day), 'Estado': state,
+                'Registrado': datetime.now().isoformat(timespec='seconds'),
+            }])
+            return True
+
+    # --- Migración desde columnas diarias ---
+    def import_daily_columns(self, frame_df):
+        # Un evento por cada día en que el valor de la columna cambió respecto
+        # del día anterior (o del valor por defecto, en el primer día)
+        events = []
+        if not frame_df.empty:
+            for item, default in self.items.items():
+                if item not in frame_df.columns:
+                    continue
+                col = frame_df[item].astype(object)
+                changed = col.ne(col.shift(1, fill_value=default))
+                for ts, value in col[changed].items():
+                    events.append({
+                        'Ítem': item, 'Fecha': _day_str(ts), 'Estado': value.item() if hasattr(value, 'item') else value,
+                        'Registrado': 'migración',
+                    })
+        with self._lock:
+            if events:
+                self.append_events(events)
+            elif not self.exists():
+                open(self.path, 'a', encoding='utf-8').close()
+        return len(events)
+
+
+def migrate_status_columns(data_file, event_log, legacy_schema, base_format='csv'):
+    # Una sola vez por perfil: si todavía no hay archivo de eventos, los
+    # estados se derivan de las columnas diarias y éstas se quitan del archivo
+    # del planner. Los eventos se escriben antes de tocar el planner, así un
+    # corte a mitad de camino sólo deja columnas sobrantes que se ignoran.
+    if event_log.exists():
+        return 0
+    from planner_storage import PlannerStore
+
+    legacy_store = PlannerStore(data_file, legacy_schema, base_format=base_format)
+    with legacy_store._lock:
+        if event_log.exists():
+            return 0
+        frame_df = legacy_store.load().df
+        imported = event_log.import_daily_columns(frame_df)
+        legacy_store.drop_columns(list(event_log.items))
+    return imported
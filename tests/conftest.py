@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Los módulos viven en la raíz del repositorio, sin paquete instalable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from planner_objectives import ObjectivesConfig  # noqa: E402
+from planner_schema import compile_schema  # noqa: E402
+from planner_storage import PlannerStore  # noqa: E402
+from status_events import daily_config  # noqa: E402
+
+
+@pytest.fixture
+def schema():
+    return compile_schema(daily_config(ObjectivesConfig.defaults().objectives))
+
+
+@pytest.fixture
+def open_store(tmp_path, schema):
+    # Stores sobre el mismo archivo de datos; se cierran al terminar el test
+    stores = []
+
+    def _open(**options):
+        options.setdefault('flush_interval_ms', 0)
+        store = PlannerStore(str(tmp_path / 'planner_data.csv'), schema, **options)
+        stores.append(store)
+        return store
+
+    yield _open
+    for store in stores:
+        store.close()
+
+
+def fill_days(store, start, days, values=None):
+    # Un día registrado por fecha desde `start`, con `values` ({columna: valor})
+    for day in pd.date_range(start, periods=days, freq='D'):
+        store.ensure_day(day)
+        for col_name, value in (values or {}).items():
+            store.set_value(day, col_name, value)
+    store.flush(compact=False)
@@ -0,0 +1,80 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from balance_ledger import BalanceLedger, monthly_overrides
+from range_index import PrefixSums
+
+
+@pytest.fixture
+def finance_index(tmp_path):
+    # Enero: +1000 -300; febrero: -200; marzo sin movimientos; abril: +50
+    index = PrefixSums(str(tmp_path / 'ranges.npz'))
+    index.add_daily(pd.DataFrame(
+        {'Ingreso:Sueldo': [1000.0, 0.0, 50.0], 'Gasto:Comida': [300.0, 200.0, 0.0]},
+        index=pd.to_datetime(['2026-01-10', '2026-02-03', '2026-04-20']),
+    ))
+    return index
+
+
+def _planner(rows):
+    # rows: (fecha, Balance_Inicial, Balance_Inicial_Manual)
+    df = pd.DataFrame(rows, columns=['Fecha', 'Balance_Inicial', 'Balance_Inicial_Manual'])
+    return df.set_index(pd.to_datetime(df.pop('Fecha')))
+
+
+def test_closings_chain_into_openings(tmp_path, finance_index):
+    ledger = BalanceLedger(str(tmp_path / 'ledger.json'))
+    ledger.rebuild(finance_index, {}, date(2026, 5, 2))
+    history = ledger.history()
+    assert list(history.index) == ['2026-01', '2026-02', '2026-03', '2026-04', '2026-05']
+    assert list(history['Apertura']) == [0.0, 700.0, 500.0, 500.0, 550.0]
+    assert list(history['Cierre']) == [700.0, 500.0, 500.0, 550.0, 550.0]
+    assert ledger.balance_at(date(2026, 4, 19), finance_index) == 500.0
+    assert ledger.balance_at(date(2026, 4, 20), finance_index) == 550.0
+
+
+def test_manual_balance_restarts_the_chain(tmp_path, finance_index):
+    ledger = BalanceLedger(str(tmp_path / 'ledger.json'))
+    ledger.rebuild(finance_index, {'2026-02': 2000.0}, date(2026, 4, 30))
+    months = ledger.months
+    assert months['2026-01']['Cierre'] == 700.0
+    assert (months['2026-02']['Apertura'], months['2026-02']['Manual']) == (2000.0, True)
+    assert months['2026-04']['Cierre'] == 1850.0
+
+
+def test_explicit_zero_is_a_manual_balance(tmp_path, finance_index):
+    planner_df = _planner([
+        ('2026-02-01', 0.0, True),
+        ('2026-02-02', 0.0, False),
+        ('2026-03-01', 0.0, False),
+        # Datos anteriores a la marca: un valor distinto de cero ya es manual
+        ('2026-04-01', 900.0, False),
+    ])
+    overrides = monthly_overrides(planner_df)
+    assert overrides == {'2026-02': 0.0, '2026-04': 900.0}
+    ledger = BalanceLedger(str(tmp_path / 'ledger.json'))
+    ledger.rebuild(finance_index, overrides, date(2026, 4, 30))
+    assert ledger.months['2026-02']['Apertura'] == 0.0
+    assert ledger.months['2026-03']['Apertura'] == -200.0
+    assert ledger.months['2026-04']['Apertura'] == 900.0
+
+
+def test_unmarked_zeros_are_not_overrides():
+    assert monthly_overrides(_planner([('2026-02-01', 0.0, False)])) == {}
+    # Sin la columna de la marca, como en los datos anteriores a ella
+    legacy = _planner([('2026-02-01', 0.0, False), ('2026-02-05', 300.0, False)]).drop(columns='Balance_Inicial_Manual')
+    assert monthly_overrides(legacy) == {'2026-02': 300.0}
+
+
+def test_refresh_reuses_the_persisted_snapshot(tmp_path, finance_index):
+    path = str(tmp_path / 'ledger.json')
+    BalanceLedger(path).refresh(finance_index, {}, 7, date(2026, 4, 30))
+    reopened = BalanceLedger(path)
+    # Con la misma firma no hace falta el índice: se lee del archivo
+    reopened.refresh(None, {}, 7, date(2026, 4, 30))
+    assert reopened.months['2026-04']['Cierre'] == 550.0
+    # Otra revisión de las transacciones: se recalcula
+    reopened.refresh(PrefixSums(str(tmp_path / 'empty.npz')), {}, 8, date(2026, 4, 30))
+    assert reopened.months == {}
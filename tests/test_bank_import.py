@@ -0,0 +1,185 @@
+import io
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from bank_import import (
+    DEFAULT_CATEGORY_RULES, OFX_MAPPING, ColumnMapping, ImportHashIndex, categorize, import_statement, iter_csv_chunks,
+    iter_ofx_chunks, load_category_rules, normalize_chunk, transaction_hashes,
+)
+from transaction_store import SqliteTransactionStore
+
+
+@pytest.fixture
+def stores(tmp_path):
+    transactions = SqliteTransactionStore(str(tmp_path / 'transactions.db'))
+    hashes = ImportHashIndex(str(tmp_path / 'import_hashes.db'))
+    yield transactions, hashes
+    transactions.close()
+    hashes.close()
+
+
+def _csv(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def _import(stores, text, **options):
+    transactions, hashes = stores
+    return import_statement(_csv(text), transactions, hashes, **options)
+
+
+OFX_SGML = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20260105120000[-3:ART]
+<TRNAMT>-1234.50
+<NAME>SUPERMERCADO DIA
+<MEMO>Sucursal 12
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20260106
+<TRNAMT>250000.00
+<NAME>HABERES ENERO
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+OFX_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT</TRNTYPE><DTPOSTED>20260105</DTPOSTED><TRNAMT>-1234.50</TRNAMT><NAME>SUPERMERCADO DIA</NAME><MEMO>Sucursal 12</MEMO></STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT</TRNTYPE><DTPOSTED>20260106</DTPOSTED><TRNAMT>250000.00</TRNAMT><NAME>HABERES ENERO</NAME></STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+# --- Lectura y normalización ---
+def _normalized(text, mapping=None):
+    mapping = mapping or ColumnMapping()
+    chunks = [normalize_chunk(raw, mapping, DEFAULT_CATEGORY_RULES) for raw in iter_csv_chunks(_csv(text), mapping)]
+    return pd.concat([chunk for chunk, _ in chunks]), sum(invalid for _, invalid in chunks)
+
+
+def test_csv_with_decimal_comma_and_thousands_dots():
+    mapping = ColumnMapping(sep=';', decimal=',', thousands='.')
+    chunk, invalid = _normalized(
+        'Fecha;Monto;Descripción\n'
+        '05/01/2026;-1.234,50;Supermercado\n'
+        '06/01/2026;$ 250.000,00;Haberes\n'
+        '07/01/2026;abc;Ilegible\n'
+        '32/01/2026;-10,00;Fecha inválida\n',
+        mapping
+    )
+    assert invalid == 2
+    assert list(chunk['Monto']) == [1234.5, 250000.0]
+    assert [str(fecha) for fecha in chunk['Fecha']] == ['2026-01-05', '2026-01-06']
+
+
+def test_sign_decides_the_type_without_a_type_column():
+    chunk, invalid = _normalized('Fecha,Monto,Descripción\n05/01/2026,-10,Café\n05/01/2026,20,Sueldo\n05/01/2026,0,Nada\n')
+    # Montos en valor absoluto; un monto cero no es un movimiento
+    assert list(zip(chunk['Tipo'], chunk['Monto'])) == [('Gasto', 10.0), ('Ingreso', 20.0)]
+    assert invalid == 1
+
+
+def test_type_column_wins_over_the_sign():
+    mapping = ColumnMapping(tipo='Tipo')
+    chunk, _ = _normalized('Fecha,Monto,Tipo,Descripción\n05/01/2026,10,gasto,Café\n05/01/2026,-5,otro,Ajuste\n', mapping)
+    # Un tipo desconocido se resuelve por el signo
+    assert list(chunk['Tipo']) == ['Gasto', 'Gasto']
+
+
+@pytest.mark.parametrize('text', [OFX_SGML, OFX_XML], ids=['sgml', 'xml'])
+def test_ofx_statements(text):
+    raws = list(iter_ofx_chunks(io.BytesIO(text.encode('latin-1'))))
+    chunk, invalid = normalize_chunk(pd.concat(raws), OFX_MAPPING, DEFAULT_CATEGORY_RULES)
+    assert invalid == 0
+    assert [str(fecha) for fecha in chunk['Fecha']] == ['2026-01-05', '2026-01-06']
+    assert list(chunk['Tipo']) == ['Gasto', 'Ingreso']
+    assert list(chunk['Monto']) == [1234.5, 250000.0]
+    assert list(chunk['Descripción']) == ['SUPERMERCADO DIA Sucursal 12', 'HABERES ENERO']
+    assert list(chunk['Categoría']) == ['Alimentos', 'Sueldo']
+
+
+def test_ofx_chunks_split_by_record_count():
+    records = ''.join(f"<STMTTRN><DTPOSTED>202601{day:02d}<TRNAMT>-1<NAME>x{day}</STMTTRN>\n" for day in range(1, 8))
+    sizes = [len(raw) for raw in iter_ofx_chunks(io.BytesIO(records.encode('latin-1')), chunk_rows=3)]
+    assert sizes == [3, 3, 1]
+
+
+# --- Categorías ---
+def test_default_rules_match_whole_words_in_order():
+    descriptions = pd.Series(['Préstamo personal', 'Personal - factura', 'Hotel Las Vegas', 'Metrogas', 'Gas Natural', 'Cuota gimnasio'])
+    assert list(categorize(descriptions, DEFAULT_CATEGORY_RULES)) == [
+        'Deudas', 'Servicios', 'Otros', 'Otros', 'Servicios', 'Deudas',
+    ]
+
+
+def test_load_category_rules(tmp_path):
+    assert load_category_rules(str(tmp_path / 'no_existe.json')) == DEFAULT_CATEGORY_RULES
+    path = tmp_path / 'reglas.json'
+    path.write_text('{"\\\\bkiosco": "Kiosco"}', encoding='utf-8')
+    assert load_category_rules(str(path)) == {r'\bkiosco': 'Kiosco'}
+    path.write_text('{"kiosco(": "Kiosco"}', encoding='utf-8')
+    with pytest.raises(ValueError, match='Kiosco'):
+        load_category_rules(str(path))
+    path.write_text('["kiosco"]', encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_category_rules(str(path))
+
+
+# --- Deduplicación ---
+def test_reimporting_a_statement_adds_nothing(stores):
+    statement = (
+        "Fecha,Monto,Descripción\n"
+        "05/01/2026,-10.00,Café\n"
+        "05/01/2026,-10.00,Café\n"
+        "06/01/2026,1500.00,Sueldo enero\n"
+    )
+    first = _import(stores, statement)
+    # Dos cafés iguales el mismo día son dos movimientos, no un duplicado
+    assert (first['importadas'], first['duplicadas']) == (3, 0)
+    again = _import(stores, statement)
+    assert (again['importadas'], again['duplicadas']) == (0, 3)
+    assert len(stores[0].all()) == 3
+
+
+def test_refund_is_not_a_duplicate_of_the_expense(stores):
+    _import(stores, "Fecha,Monto,Descripción\n05/01/2026,-50.00,Tienda X\n")
+    refund = _import(stores, "Fecha,Monto,Descripción\n05/01/2026,50.00,Tienda X\n")
+    assert (refund['importadas'], refund['duplicadas']) == (1, 0)
+    assert sorted(stores[0].all()['Tipo']) == ['Gasto', 'Ingreso']
+
+
+def test_version_1_hashes_are_migrated(tmp_path):
+    # Una base de la versión 1 con el gasto ya importado (hash sin tipo)
+    transactions = SqliteTransactionStore(str(tmp_path / 'transactions.db'))
+    transactions.add('2026-01-05', 'Gasto', 'Otros', 50.0, 'Tienda X')
+    raw = pd.DataFrame({'Fecha': ['05/01/2026'], 'Monto': ['-50.00'], 'Descripción': ['Tienda X']})
+    expense, _ = normalize_chunk(raw, ColumnMapping(), DEFAULT_CATEGORY_RULES)
+    legacy_hash, = transaction_hashes(expense, {}, with_type=False)
+    db_path = str(tmp_path / 'import_hashes.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE import_hashes (hash TEXT PRIMARY KEY)')
+    conn.execute('INSERT INTO import_hashes (hash) VALUES (?)', (legacy_hash,))
+    conn.commit()
+    conn.close()
+
+    hashes = ImportHashIndex(db_path)
+    try:
+        assert hashes.has_legacy
+        # El reintegro tiene el mismo hash viejo, pero el gasto guardado es de otro tipo
+        refund = import_statement(_csv("Fecha,Monto,Descripción\n05/01/2026,50.00,Tienda X\n"), transactions, hashes)
+        assert (refund['importadas'], refund['duplicadas']) == (1, 0)
+        # El extracto viejo sigue reconociéndose, y queda registrado con el hash nuevo
+        expense_statement = "Fecha,Monto,Descripción\n05/01/2026,-50.00,Tienda X\n"
+        again = import_statement(_csv(expense_statement), transactions, hashes)
+        assert (again['importadas'], again['duplicadas']) == (0, 1)
+        assert hashes.existing(transaction_hashes(expense, {}))
+    finally:
+        transactions.close()
+        hashes.close()
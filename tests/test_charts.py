@@ -0,0 +1,49 @@
+import pytest
+
+import charts
+from charts import ChartCache, ChartSpec, render_png
+
+
+def _spec(y=(1, 2, 3), **style):
+    style.setdefault('title', 'Gastos')
+    return ChartSpec('bar', ['a', 'b', 'c'], y, xlabel='Categoría', ylabel='Monto', **style)
+
+
+def test_cache_key_depends_on_content_only():
+    assert _spec().cache_key() == _spec().cache_key()
+    assert _spec().cache_key() != _spec(y=(1, 2, 4)).cache_key()
+    assert _spec().cache_key() != _spec(color='salmon').cache_key()
+    assert _spec().cache_key() != _spec(title='Ingresos').cache_key()
+
+
+def test_render_png_leaves_no_pyplot_figures():
+    pyplot = pytest.importorskip('matplotlib.pyplot')
+    before = pyplot.get_fignums()
+    png = render_png(_spec())
+    assert png.startswith(b'\x89PNG')
+    assert pyplot.get_fignums() == before
+
+
+def test_cache_hits_skip_rendering(monkeypatch):
+    renders = []
+    monkeypatch.setattr(charts, 'render_png', lambda spec: renders.append(spec) or b'png')
+    cache = ChartCache()
+    assert cache.get_png(_spec()) == b'png'
+    assert cache.get_png(_spec()) == b'png'
+    assert (cache.hits, cache.misses, len(renders)) == (1, 1, 1)
+
+
+def test_cache_evicts_least_recently_used_by_bytes(monkeypatch):
+    monkeypatch.setattr(charts, 'render_png', lambda spec: bytes(40))
+    cache = ChartCache(max_bytes=100)
+    first, second, third = _spec(y=(1,)), _spec(y=(2,)), _spec(y=(3,))
+    cache.get_png(first)
+    cache.get_png(second)
+    cache.get_png(first)
+    cache.get_png(third)
+    # El menos usado (second) sale para volver a entrar en 100 bytes
+    assert (len(cache), cache.size_bytes) == (2, 80)
+    cache.get_png(first)
+    assert cache.hits == 2
+    cache.get_png(second)
+    assert cache.misses == 4
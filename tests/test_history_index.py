@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from history_index import HistoryFilter, TransactionHistory, description_tokens
+
+
+def _rows(*rows, start_id=0):
+    # rows: (fecha, tipo, categoría, monto, descripción)
+    df = pd.DataFrame(rows, columns=['Fecha', 'Tipo', 'Categoría', 'Monto', 'Descripción'])
+    df['id'] = range(start_id, start_id + len(df))
+    return df
+
+
+def _history():
+    history = TransactionHistory()
+    history.append(_rows(
+        ('2026-01-03', 'Gasto', 'Comida', 12.5, 'Café Martínez'),
+        ('2026-01-01', 'Ingreso', 'Sueldo', 1000.0, 'Sueldo enero'),
+        ('2026-01-03', 'Gasto', 'Transporte', 3.0, 'Subte línea C'),
+        ('2026-01-02', 'Gasto', 'Comida', 40.0, 'Supermercado Coto'),
+        ('2026-01-02', 'Gasto', 'Comida', 8.0, 'Café de la esquina'),
+    ))
+    return history
+
+
+def test_description_tokens_fold_accents_and_case():
+    assert description_tokens('Café Martínez 2x1') == {'cafe', 'martinez', '2x1'}
+    assert description_tokens(None) == set()
+
+
+def test_inverted_index_maps_tokens_to_distinct_descriptions():
+    history = _history()
+    cafe = history.postings['cafe']
+    assert sorted(history._descripcion_codes.names[code] for code in cafe) == ['Café Martínez', 'Café de la esquina']
+    # Una descripción repetida no se vuelve a tokenizar
+    history.append(_rows(('2026-01-04', 'Gasto', 'Comida', 13.0, 'Café Martínez'), start_id=10))
+    assert len(history.postings['cafe']) == 2
+
+
+def test_text_filter_matches_word_prefixes():
+    history = _history()
+    page, total = history.page(HistoryFilter(texto='caf'))
+    assert total == 2
+    assert list(page['Descripción']) == ['Café Martínez', 'Café de la esquina']
+    # Todos los tokens tienen que aparecer; "su" es prefijo de "Subte", "Sueldo" y "Supermercado"
+    assert history.page(HistoryFilter(texto='su'))[1] == 3
+    assert list(history.page(HistoryFilter(texto='super coto'))[0]['Monto']) == [40.0]
+    # Un prefijo en medio de la palabra no cuenta
+    assert history.page(HistoryFilter(texto='ermercado'))[1] == 0
+
+
+def test_filters_combine():
+    history = _history()
+    page, total = history.page(HistoryFilter(tipo='Gasto', categorias=['Comida'], monto_min=10))
+    assert total == 2
+    assert list(page['Monto']) == [12.5, 40.0]
+    assert history.page(HistoryFilter(categorias=['Inexistente']))[1] == 0
+    assert history.page(HistoryFilter(monto_max=5))[1] == 1
+
+
+def test_pages_are_newest_first_and_count_the_whole_selection():
+    history = _history()
+    first, total = history.page(HistoryFilter(), offset=0, limit=2)
+    second, _ = history.page(HistoryFilter(), offset=2, limit=2)
+    last, _ = history.page(HistoryFilter(), offset=4, limit=2)
+    assert total == 5
+    # A igual fecha, la última registrada primero
+    assert list(first['Descripción']) == ['Subte línea C', 'Café Martínez']
+    assert list(second['Descripción']) == ['Café de la esquina', 'Supermercado Coto']
+    assert list(last['Descripción']) == ['Sueldo enero']
+    assert history.page(HistoryFilter(), offset=10)[0].empty
+
+
+def test_append_merges_into_the_existing_order():
+    rng = np.random.default_rng(0)
+    count = 2000
+    history = TransactionHistory()
+    history.append(pd.DataFrame({
+        'id': np.arange(count),
+        'Fecha': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 300, count), 'D'),
+        'Tipo': 'Gasto', 'Categoría': 'Comida', 'Monto': 1.0, 'Descripción': 'x',
+    }))
+    history.page(HistoryFilter())
+    order = history._order
+    # Filas con fechas nuevas, repetidas y anteriores, y ids intercalados
+    history.append(_rows(
+        ('2021-06-01', 'Gasto', 'Comida', 1.0, 'nueva'),
+        ('2020-03-15', 'Gasto', 'Comida', 2.0, 'medio'),
+        ('2019-12-31', 'Gasto', 'Comida', 3.0, 'vieja'),
+        ('2020-03-15', 'Gasto', 'Comida', 4.0, 'medio'),
+        start_id=count,
+    ))
+    assert history._order is not order
+    expected = np.lexsort((-history.ids, -history.fechas.astype(np.int64)))
+    assert np.array_equal(history.order(), expected)
+    page, total = history.page(HistoryFilter(texto='medio'))
+    assert total == 2
+    assert list(page['Monto']) == [4.0, 2.0]
+    assert history.page(HistoryFilter(), limit=1)[0]['Descripción'].iloc[0] == 'nueva'
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from conftest import fill_days
+
+
+def _snapshot(store):
+    return store.load().df.copy(), dict(store.aggregates.months)
+
+
+def test_archive_verify_restore_round_trip(open_store):
+    store = open_store()
+    fill_days(store, '2026-01-01', 120, {'Agua_Litros': 2.0, 'Lectura_Paginas': 10})
+    frame_before, aggregates_before = _snapshot(store)
+
+    archived = store.archive_cold_months(today=pd.Timestamp('2026-04-30'), hot_months=2)
+    assert archived == ['2026-01', '2026-02']
+    assert store.archive.verify() == []
+    # Los meses archivados siguen contando en agregados e índice de rangos
+    assert dict(store.aggregates.months) == aggregates_before
+    assert store.ranges.totals(pd.Timestamp('2026-01-01'), pd.Timestamp('2026-05-01'))['Días'] == 120
+    with pytest.raises(ValueError):
+        store.set_value(pd.Timestamp('2026-01-15'), 'Agua_Litros', 5.0)
+
+    reopened = open_store()
+    assert len(reopened.load()) == 120 - 31 - 28
+    assert dict(reopened.aggregates.months) == aggregates_before
+
+    restored = reopened.restore_months()
+    assert restored == ['2026-01', '2026-02']
+    assert reopened.archive.months() == []
+    frame_after, aggregates_after = _snapshot(open_store())
+    pd.testing.assert_frame_equal(frame_after, frame_before)
+    assert aggregates_after == aggregates_before
+    # Los restaurados quedan retenidos: el archivado automático no los toca
+    assert reopened.archive_cold_months(today=pd.Timestamp('2026-04-30'), hot_months=2) == []
+
+
+def test_verify_detects_corrupted_segment(open_store):
+    store = open_store()
+    fill_days(store, '2026-01-01', 60)
+    store.archive_cold_months(today=pd.Timestamp('2026-03-31'), hot_months=1)
+    segment = store.archive.segment_path('2026-01')
+    with open(segment, 'r+b') as f:
+        f.seek(20)
+        f.write(b'\x00\x00\x00')
+
+    problems = store.archive.verify()
+    assert [month for month, _ in problems] == ['2026-01']
+    with pytest.raises(ValueError):
+        store.restore_months(['2026-01'])
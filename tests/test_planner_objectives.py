@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from planner_aggregates import PROJECT_DONE_STATE
+from planner_objectives import ObjectivesConfig, daily_streaks, score_months
+from range_index import DAYS_SERIES
+
+
+@pytest.fixture
+def config():
+    return ObjectivesConfig.defaults()
+
+
+# --- Validación ---
+def _payload(**changes):
+    payload = ObjectivesConfig.defaults().to_dict()
+    payload.update(changes)
+    return payload
+
+
+def _objective(**config):
+    return {'display': 'X', 'type': 'float', 'section': 'daily', **config}
+
+
+@pytest.mark.parametrize('payload, message', [
+    ([], 'objeto JSON'),
+    ({'objetivo': {}}, 'Claves desconocidas'),
+    (_payload(objetivos=[]), "'objetivos'"),
+    (_payload(objetivos={'A': 'float'}), "Objetivo 'A'"),
+    (_payload(objetivos={'A': {'display': 'A', 'type': 'float'}}), 'faltan las claves section'),
+    (_payload(objetivos={'A': _objective(step='15')}), "'step'"),
+    (_payload(objetivos={'A': _objective(type='fecha')}), 'tipo inválido'),
+    (_payload(objetivos={'A': _objective(section='otra')}), 'sección inválida'),
+    (_payload(objetivos={'A': _objective(type='str')}), 'options'),
+    (_payload(objetivos={'A': _objective(goal_monthly=0)}), 'goal_monthly'),
+    (_payload(objetivos={'A': _objective(goal_daily_avg='2')}), 'goal_daily_avg'),
+    (_payload(cuantitativos='Agua_Litros'), "'cuantitativos'"),
+    (_payload(cuantitativos=['Inexistente']), 'Inexistente'),
+    (_payload(booleanos=['Agua_Litros']), 'sí/no'),
+    (_payload(pesos={'Agua_Litros': '0.5'}), "'pesos'"),
+    (_payload(pesos={'Inexistente': 0.5}), 'Inexistente'),
+    (_payload(pesos={'Agua_Litros': -1}), 'negativo'),
+    (_payload(umbral_bonificacion=1.5), 'umbral'),
+    (_payload(umbral_bonificacion=True), 'umbral'),
+])
+def test_malformed_configs_raise_value_error(payload, message):
+    with pytest.raises(ValueError, match=message):
+        ObjectivesConfig.from_dict(payload)
+
+
+@pytest.mark.parametrize('name', ['Fecha', DAYS_SERIES, 'Salud_General'])
+def test_reserved_objective_names(config, name):
+    objectives = {**config.objectives, name: _objective()}
+    with pytest.raises(ValueError, match='reservados'):
+        ObjectivesConfig.from_dict(_payload(objetivos=objectives))
+
+
+@pytest.mark.parametrize('key, name', [('cuantitativos', 'Agua_Litros'), ('booleanos', 'Comida Saludable')])
+def test_repeated_scored_objectives(config, key, name):
+    names = config.to_dict()[key]
+    with pytest.raises(ValueError, match='repite objetivos: ' + name):
+        ObjectivesConfig.from_dict(_payload(**{key: names + [name]}))
+
+
+def test_missing_keys_take_the_defaults(config):
+    custom = ObjectivesConfig.from_dict({'umbral_bonificacion': 0.5})
+    assert custom.bonus_threshold == 0.5
+    assert custom.objectives == config.objectives
+    assert custom.schema_hash == config.schema_hash
+    assert custom.hash != config.hash
+
+
+# --- Puntajes ---
+def _old_score_month(config, month_df, last_states):
+    # El cálculo por mes que hacía la app antes de vectorizar: un DataFrame
+    # con los días registrados del mes y los estados de su último día
+    total_days_logged = len(month_df)
+    category_progress = {}
+    for obj_name in config.quant:
+        goal_monthly = config.objectives[obj_name].get('goal_monthly')
+        goal_daily_avg = config.objectives[obj_name].get('goal_daily_avg')
+        if goal_monthly:
+            progress = min(month_df[obj_name].sum() / goal_monthly, 1.0)
+        elif goal_daily_avg:
+            progress = min(month_df[obj_name].mean() / goal_daily_avg, 1.0)
+        else:
+            progress = 0
+        category_progress[obj_name] = progress
+    for obj_name in config.bools:
+        category_progress[obj_name] = month_df[obj_name].mean() if total_days_logged > 0 else 0
+    health = config.section('health', 'bool')
+    projects = config.section('projects')
+    category_progress['Salud_General'] = sum(bool(last_states[obj]) for obj in health) / len(health)
+    category_progress['Proyectos_General'] = sum(last_states[proj] == PROJECT_DONE_STATE for proj in projects) / len(projects)
+    pesos = config.weights
+    overall_progress = sum(category_progress.get(obj, 0) * pesos.get(obj, 0) for obj in pesos.keys())
+    return category_progress, overall_progress / sum(pesos.values())
+
+
+def _random_history(config, rng, months):
+    days = pd.date_range(f'{months[0]}-01', pd.Period(months[-1]).end_time.normalize(), freq='D')
+    # Algunos días sin registrar
+    days = days[rng.random(len(days)) < 0.8]
+    daily = pd.DataFrame({
+        'Entrenamiento_Minutos': rng.choice([0.0, 30.0, 45.0], len(days)),
+        'Agua_Litros': rng.uniform(0, 3, len(days)),
+        'Meditacion_Minutos': rng.choice([0.0, 10.0, 20.0], len(days)),
+        'Lectura_Paginas': rng.integers(0, 20, len(days)).astype(float),
+        'Horas Extra': rng.choice([0.0, 2.0], len(days)),
+        'Entrenamiento_Hecho': rng.random(len(days)) < 0.6,
+        'Comida Saludable': rng.random(len(days)) < 0.7,
+    }, index=days)
+    states = pd.DataFrame({
+        **{name: rng.random(len(months)) < 0.5 for name in config.section('health', 'bool')},
+        **{name: rng.choice([PROJECT_DONE_STATE, 'En progreso'], len(months)) for name in config.section('projects')},
+    }, index=months)
+    return daily, states
+
+
+def test_scores_match_the_old_per_month_calculation(config):
+    rng = np.random.default_rng(7)
+    months = ['2026-01', '2026-02', '2026-03', '2026-04']
+    daily, states = _random_history(config, rng, months)
+    # Un mes sin registros en el medio
+    daily = daily[daily.index.strftime('%Y-%m') != '2026-03']
+    keys = daily.index.strftime('%Y-%m')
+    sums = daily.astype(float).groupby(keys).sum()
+    days = [int((keys == month).sum()) for month in months]
+    scores = score_months(config, months, days, sums, states)
+
+    for position, month in enumerate(months):
+        if days[position] == 0:
+            assert scores['overall'][position] == pytest.approx(
+                (config.weights['Salud_General'] * scores['progress']['Salud_General'].iloc[position]
+                 + config.weights['Proyectos_General'] * scores['progress']['Proyectos_General'].iloc[position])
+                / sum(config.weights.values())
+            )
+            assert not scores['bonus'][position]
+            continue
+        progress, overall = _old_score_month(config, daily[keys == month], states.loc[month])
+        for name, value in progress.items():
+            assert scores['progress'][name].iloc[position] == pytest.approx(value), (month, name)
+        assert scores['overall'][position] == pytest.approx(overall)
+        assert scores['bonus'][position] == (overall >= config.bonus_threshold)
+
+
+def test_bonus_streak_is_cut_by_a_month_without_bonus():
+    config = ObjectivesConfig.from_dict({'umbral_bonificacion': 0.01})
+    months = ['2026-01', '2026-02', '2026-03', '2026-04']
+    sums = pd.DataFrame({'Agua_Litros': [60.0, 60.0, 0.0, 60.0]}, index=months)
+    scores = score_months(config, months, [30, 28, 0, 30], sums, pd.DataFrame(index=months))
+    assert list(scores['bonus']) == [True, True, False, True]
+    assert list(scores['bonus_streak']) == [1, 2, 0, 1]
+
+
+def _old_streaks(config, day_values):
+    # Rachas día por día, como las contaba la app
+    goal_monthly, goal_daily_avg = config.goals()
+    targets = {}
+    for name, monthly, daily in zip(config.quant, goal_monthly, goal_daily_avg):
+        if not np.isnan(monthly):
+            targets[name] = lambda day, monthly=monthly: monthly / day.days_in_month
+        elif not np.isnan(daily):
+            targets[name] = lambda day, daily=daily: daily
+    targets.update({name: (lambda day: 0.5) for name in config.bools})
+    best, current = {}, {}
+    for name, target in targets.items():
+        run, previous = 0, 0
+        best[name] = {}
+        for day, row in day_values.iterrows():
+            previous = run
+            met = row[DAYS_SERIES] > 0 and row.get(name, 0.0) >= target(day)
+            run = run + 1 if met else 0
+            month = day.strftime('%Y-%m')
+            best[name][month] = max(best[name].get(month, 0), run)
+        current[name] = run if run else previous
+    return best, current
+
+
+def test_daily_streaks_match_a_day_by_day_count(config):
+    rng = np.random.default_rng(11)
+    months = ['2026-01', '2026-02', '2026-03']
+    daily, _ = _random_history(config, rng, months)
+    all_days = pd.date_range('2026-01-01', '2026-03-31', freq='D')
+    day_values = daily.astype(float).reindex(all_days).fillna(0.0)
+    day_values[DAYS_SERIES] = all_days.isin(daily.index).astype(float)
+
+    best, current = daily_streaks(config, day_values)
+    expected_best, expected_current = _old_streaks(config, day_values)
+    for name in expected_best:
+        assert best[name].to_dict() == expected_best[name], name
+        assert current[name] == expected_current[name], name
+
+
+def test_daily_streaks_without_data(config):
+    best, current = daily_streaks(config, pd.DataFrame())
+    assert best.empty
+    assert (current == 0).all()
@@ -0,0 +1,102 @@
+import json
+import os
+
+import pandas as pd
+
+from conftest import fill_days
+from planner_storage import PlannerStore, merge_patches, wait_for_writers
+from profiling import PROFILER
+
+
+def test_journal_replay_discards_torn_last_line(open_store):
+    store = open_store()
+    fill_days(store, '2026-01-01', 3, {'Agua_Litros': 2.0})
+    journal = store.journal_file
+    valid_size = os.path.getsize(journal)
+    # Un corte durante el append deja un renglón sin '\n'
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"Fecha": "2026-01-02", "Agua_Litros": 9')
+
+    reopened = open_store()
+    frame = reopened.load()
+    assert len(frame) == 3
+    assert frame.get(pd.Timestamp('2026-01-02'), 'Agua_Litros') == 2.0
+    # El renglón roto se trunca para que el próximo append no quede pegado
+    assert os.path.getsize(journal) == valid_size
+    reopened.set_value(pd.Timestamp('2026-01-03'), 'Agua_Litros', 3.0)
+    reopened.flush(compact=False)
+    with open(journal, encoding='utf-8') as f:
+        assert all(json.loads(line) for line in f)
+
+
+def test_concurrent_edits_merge_by_column(open_store):
+    day = pd.Timestamp('2026-02-10')
+    first = open_store()
+    fill_days(first, day, 1)
+    second = open_store()
+    second.load()
+
+    # Cada store edita una columna distinta del mismo día
+    first.set_value(day, 'Agua_Litros', 2.5)
+    second.set_value(day, 'Lectura_Paginas', 40)
+    first.flush(compact=False)
+    second.flush(compact=False)
+
+    frame = open_store().load()
+    assert frame.get(day, 'Agua_Litros') == 2.5
+    assert frame.get(day, 'Lectura_Paginas') == 40
+
+
+def test_compaction_keeps_values_and_empties_journal(open_store):
+    store = open_store()
+    fill_days(store, '2026-03-01', 5, {'Meditacion_Minutos': 10.0})
+    store.set_value(pd.Timestamp('2026-03-02'), 'Meditacion_Minutos', 25.0)
+    store.flush(compact=False)
+    store.compact()
+
+    assert not os.path.exists(store.journal_file)
+    frame = open_store().load()
+    assert len(frame) == 5
+    assert frame.get(pd.Timestamp('2026-03-02'), 'Meditacion_Minutos') == 25.0
+    assert open_store().load().df['Meditacion_Minutos'].sum() == 65.0
+
+
+def test_merge_patches_last_non_null_value_wins():
+    base = pd.DataFrame({'Fecha': ['2026-01-01'], 'Agua_Litros': [1.0], 'Horas Extra': [2.0]})
+    records = [
+        {'Fecha': '2026-01-01', 'Agua_Litros': 3.0},
+        {'Fecha': '2026-01-01', 'Horas Extra': 5.0},
+        {'Fecha': '2026-01-02', 'Agua_Litros': 1.5},
+    ]
+    merged = merge_patches(base, records).set_index('Fecha')
+    assert merged.loc['2026-01-01', 'Agua_Litros'] == 3.0
+    assert merged.loc['2026-01-01', 'Horas Extra'] == 5.0
+    assert merged.loc['2026-01-02', 'Agua_Litros'] == 1.5
+
+
+def test_derived_indexes_survive_close_and_reopen(open_store):
+    store = open_store()
+    fill_days(store, '2026-04-01', 10, {'Agua_Litros': 2.0})
+    store.close()
+
+    reopened = open_store()
+    reopened.load()
+    assert reopened.aggregates.month('2026-04-15')['sums']['Agua_Litros'] == 20.0
+    totals = reopened.ranges.totals(pd.Timestamp('2026-04-01'), pd.Timestamp('2026-05-01'))
+    assert totals['Agua_Litros'] == 20.0
+
+
+def test_background_writer_records_save_spans_in_the_session(tmp_path, schema):
+    store = PlannerStore(str(tmp_path / 'planner_data.csv'), schema, flush_interval_ms=10)
+    try:
+        store.ensure_day(pd.Timestamp('2026-01-05'))
+        PROFILER.begin_rerun('sesion-test')
+        store.save()
+        PROFILER.end_rerun()
+        wait_for_writers()
+        names = {span['name'] for record in PROFILER.reruns('sesion-test') for span in record['spans']}
+        assert 'save' in names
+        assert 'writer' in PROFILER.percentiles('sesion-test')
+    finally:
+        PROFILER.clear('sesion-test')
+        store.close()
@@ -0,0 +1,83 @@
+import json
+import threading
+
+from profiling import Profiler, to_chrome_trace, to_jsonl
+
+
+def _rerun(profiler, session_id, *names):
+    profiler.begin_rerun(session_id)
+    for name in names:
+        with profiler.span(name, filas=1):
+            pass
+    return profiler.end_rerun()
+
+
+def test_spans_outside_a_profiled_rerun_are_not_recorded():
+    profiler = Profiler()
+    with profiler.span('load'):
+        pass
+    profiler.begin_rerun('s1', enabled=False)
+    with profiler.span('load'):
+        pass
+    assert profiler.end_rerun() is None
+    assert profiler.reruns() == []
+
+
+def test_percentiles_per_session_and_for_the_process():
+    profiler = Profiler()
+    _rerun(profiler, 's1', 'load', 'save')
+    _rerun(profiler, 's1', 'load')
+    _rerun(profiler, 's2', 'load')
+    assert profiler.percentiles('s1')['load']['n'] == 2
+    assert profiler.percentiles('s1')['rerun']['n'] == 2
+    assert profiler.percentiles()['load']['n'] == 3
+    assert set(profiler.percentiles()['save']) == {'n', 'p50', 'p90', 'p99', 'max', 'total'}
+    profiler.clear('s1')
+    assert [record['session'] for record in profiler.reruns()] == ['s2']
+
+
+def test_reruns_per_session_are_bounded():
+    profiler = Profiler(max_reruns=3)
+    for _ in range(5):
+        _rerun(profiler, 's1', 'load')
+    assert len(profiler.reruns('s1')) == 3
+
+
+def test_spans_from_another_thread_need_their_own_record():
+    profiler = Profiler()
+    profiler.begin_rerun('s1')
+    session_id = profiler.current_session()
+
+    def writer():
+        # Sin registro propio el span del hilo se pierde; con begin_background queda en la sesión
+        with profiler.span('lost'):
+            pass
+        profiler.begin_background('writer', [session_id, None])
+        with profiler.span('save'):
+            pass
+        profiler.end_rerun()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    thread.join()
+    profiler.end_rerun()
+
+    summary = profiler.percentiles('s1')
+    assert set(summary) == {'rerun', 'writer', 'save'}
+    assert summary['rerun']['n'] == summary['writer']['n'] == 1
+    # Sin sesiones que perfilen, el hilo no registra nada
+    profiler.begin_background('writer', [None])
+    assert profiler.current_session() is None
+    assert profiler.end_rerun() is None
+
+
+def test_exports():
+    profiler = Profiler()
+    _rerun(profiler, 's1', 'load', 'save')
+    reruns = profiler.reruns()
+    lines = [json.loads(line) for line in to_jsonl(reruns).splitlines()]
+    assert [line['name'] for line in lines] == ['load', 'save']
+    assert lines[0]['args'] == {'filas': 1} and lines[0]['kind'] == 'rerun'
+    trace = json.loads(to_chrome_trace(reruns))
+    names = [event['name'] for event in trace['traceEvents']]
+    assert names == ['rerun', 'load', 'save', 'process_name']
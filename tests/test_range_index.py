@@ -0,0 +1,94 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from range_index import PrefixSums, finance_day_values, preset_ranges, previous_range
+
+
+def _daily(rng, days=120):
+    index = pd.date_range('2025-11-20', periods=days, freq='D')
+    daily = pd.DataFrame({'a': rng.integers(0, 5, days), 'b': rng.random(days)}, index=index)
+    # Huecos y días repetidos
+    return pd.concat([daily.iloc[::3], daily.iloc[5:10]])
+
+
+def _brute_total(daily, name, start, end):
+    index = daily.index
+    return float(daily[name][(index >= pd.Timestamp(start)) & (index < pd.Timestamp(end))].sum())
+
+
+def test_range_totals_match_a_brute_force_sum(tmp_path):
+    rng = np.random.default_rng(1)
+    daily = _daily(rng)
+    sums = PrefixSums(str(tmp_path / 'ranges.npz'), ['a', 'b'])
+    sums.rebuild(daily)
+    for _ in range(50):
+        start, end = sorted(pd.Timestamp('2025-11-01') + pd.to_timedelta(rng.integers(0, 160, 2), 'D'))
+        for name in ('a', 'b'):
+            assert sums.total(name, start, end) == pytest.approx(_brute_total(daily, name, start, end))
+    # Un rango fuera de lo cubierto, o invertido, es cero
+    assert sums.total('a', date(2020, 1, 1), date(2020, 2, 1)) == 0
+    assert sums.total('a', date(2026, 3, 1), date(2026, 1, 1)) == 0
+    assert sums.total('otra', date(2020, 1, 1), date(2030, 1, 1)) == 0
+
+
+def test_deltas_match_a_rebuild(tmp_path):
+    rng = np.random.default_rng(2)
+    daily = _daily(rng)
+    incremental = PrefixSums(str(tmp_path / 'a.npz'), ['a', 'b'])
+    incremental.add_daily(daily.iloc[:20])
+    for day, row in daily.iloc[20:].iterrows():
+        incremental.add(day, row.to_dict())
+    # Un día anterior al origen y otro posterior al último
+    incremental.add('2025-10-01', {'a': 7})
+    incremental.add('2026-06-01', {'b': 1.5})
+    full = PrefixSums(str(tmp_path / 'b.npz'), ['a', 'b'])
+    extra = pd.DataFrame({'a': [7.0, 0.0], 'b': [0.0, 1.5]}, index=pd.to_datetime(['2025-10-01', '2026-06-01']))
+    full.rebuild(pd.concat([daily, extra]))
+    assert incremental.covered() == full.covered()
+    np.testing.assert_allclose(incremental.cums, full.cums)
+
+
+def test_totals_between_and_day_values(tmp_path):
+    sums = PrefixSums(str(tmp_path / 'ranges.npz'))
+    sums.add_daily(pd.DataFrame({'Gasto:Comida': [10.0, 5.0, 2.0]}, index=pd.to_datetime(['2026-01-31', '2026-02-01', '2026-03-15'])))
+    months = sums.totals_between([date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1), date(2026, 4, 1)])
+    assert list(months['Gasto:Comida']) == [10.0, 5.0, 2.0]
+    days = sums.day_values(date(2026, 1, 30), date(2026, 2, 3))
+    assert list(days['Gasto:Comida']) == [0.0, 10.0, 5.0, 0.0]
+    assert sums.totals(date(2026, 1, 1), date(2027, 1, 1))['Gasto:Comida'] == 17.0
+
+
+def test_saved_index_is_reused_only_for_the_same_signature(tmp_path):
+    path = str(tmp_path / 'ranges.npz')
+    sums = PrefixSums(path, ['a'])
+    sums.add('2026-01-05', {'a': 3})
+    sums.save(['v1', 10])
+    loaded = PrefixSums(path, ['a'])
+    assert loaded.load(['v1', 10])
+    assert loaded.total('a', date(2026, 1, 1), date(2026, 2, 1)) == 3
+    assert not PrefixSums(path, ['a']).load(['v2', 10])
+    # Series fijas distintas: el archivo no sirve
+    assert not PrefixSums(path, ['a', 'b']).load(['v1', 10])
+
+
+def test_finance_day_values_pivot_by_type_and_category():
+    totals = pd.DataFrame({
+        'Fecha': ['2026-01-05', '2026-01-05', '2026-01-06'],
+        'Tipo': ['Gasto', 'Ingreso', 'Gasto'],
+        'Categoría': ['Comida', 'Sueldo', 'Comida'],
+        'Monto': [10.0, 100.0, 4.0],
+    })
+    daily = finance_day_values(totals)
+    assert list(daily['Gasto:Comida']) == [10.0, 4.0]
+    assert list(daily['Ingreso:Sueldo']) == [100.0, 0.0]
+
+
+def test_preset_and_previous_ranges():
+    today = date(2026, 5, 20)
+    ranges = preset_ranges(today)
+    assert ranges['Últimos 7 días'] == (date(2026, 5, 14), date(2026, 5, 21))
+    assert ranges['Trimestre actual'] == (date(2026, 4, 1), date(2026, 5, 21))
+    assert previous_range(*ranges['Últimos 7 días']) == (date(2026, 5, 7), date(2026, 5, 14))
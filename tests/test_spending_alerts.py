@@ -0,0 +1,97 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from range_index import PrefixSums
+from spending_alerts import (
+    MAD_TO_SIGMA, MIN_RELATIVE_SPREAD, SpendingMonitor, anomaly_scores, budget_status, load_budgets, robust_baselines,
+    save_budgets,
+)
+
+
+def test_baselines_match_a_loop_over_previous_windows():
+    rng = np.random.default_rng(3)
+    values = rng.gamma(2.0, 50.0, size=(40, 3))
+    values[5, 1] = np.nan
+    median, spread = robust_baselines(values, window=6, min_count=3)
+    for row in range(len(values)):
+        for column in range(values.shape[1]):
+            window = values[max(row - 6, 0):row, column]
+            window = window[~np.isnan(window)]
+            if len(window) < 3:
+                assert np.isnan(median[row, column]) and np.isnan(spread[row, column])
+                continue
+            expected_median = np.median(window)
+            expected_spread = max(MAD_TO_SIGMA * np.median(np.abs(window - expected_median)), MIN_RELATIVE_SPREAD * expected_median)
+            assert median[row, column] == pytest.approx(expected_median)
+            assert spread[row, column] == pytest.approx(expected_spread)
+
+
+def test_fixed_expenses_use_a_minimum_spread():
+    values = np.array([[1000.0]] * 6 + [[1050.0], [1500.0]])
+    median, spread = robust_baselines(values, window=6, min_count=3)
+    scores = anomaly_scores(values, median, spread)
+    # Sin la escala mínima la MAD es 0 y un +5% sería anómalo
+    assert scores[6, 0] == pytest.approx(0.5)
+    assert scores[7, 0] > 3.5
+    assert np.isnan(scores[0, 0])
+
+
+def _finance_index(tmp_path, today):
+    # Seis meses de comida estable y un mes actual con un gasto fuera de lo común
+    index = PrefixSums(str(tmp_path / 'ranges.npz'))
+    days = pd.date_range(end=today, periods=200, freq='D')
+    comida = np.full(len(days), 10.0)
+    comida[-1] = 1500.0
+    index.add_daily(pd.DataFrame({'Gasto:Comida': comida, 'Gasto:Alquiler': np.where(days.day == 1, 500.0, 0.0)}, index=days))
+    return index
+
+
+def test_monitor_flags_unusual_months_and_days(tmp_path):
+    today = date(2026, 6, 15)
+    index = _finance_index(tmp_path, today)
+    monitor = SpendingMonitor().refresh(index, 1, today)
+    alerts = monitor.category_alerts(months=1)
+    assert list(alerts['Categoría']) == ['Comida']
+    assert list(alerts['Mes']) == ['2026-06']
+    day_alerts = monitor.day_alerts()
+    # El día del alquiler también se sale del gasto diario habitual
+    assert sorted(day_alerts['Fecha']) == [date(2026, 6, 1), today]
+    assert len(monitor.check(today, 'Comida')) == 2
+    assert monitor.check(today, 'Alquiler') == [monitor.check(today, 'Comida')[1]]
+
+
+def test_current_month_update_matches_a_rebuild(tmp_path):
+    today = date(2026, 6, 15)
+    index = _finance_index(tmp_path, today)
+    monitor = SpendingMonitor().refresh(index, 1, today)
+    # Un gasto nuevo del mes en curso: sólo se recalcula el mes actual
+    index.add(today, {'Gasto:Comida': 20.0})
+    monitor.refresh(index, 2, today)
+    rebuilt = SpendingMonitor()
+    rebuilt.rebuild(index, today)
+    np.testing.assert_allclose(monitor.monthly, rebuilt.monthly)
+    np.testing.assert_allclose(monitor.daily, rebuilt.daily)
+    np.testing.assert_allclose(monitor.daily_median, rebuilt.daily_median, equal_nan=True)
+    np.testing.assert_allclose(monitor.daily_spread, rebuilt.daily_spread, equal_nan=True)
+
+
+def test_budget_status_projects_the_month():
+    spent = pd.Series({'Comida': 300.0, 'Ocio': 50.0, 'Ropa': 200.0})
+    status = budget_status(spent, {'Comida': 400.0, 'Ocio': 200.0, 'Ropa': 100.0, 'Viajes': 500.0}, date(2026, 6, 15))
+    assert status.loc['Ropa', 'Estado'] == 'Excedido'
+    # 300 en 15 días: 600 a fin de mes
+    assert status.loc['Comida', 'Proyección'] == 600.0
+    assert status.loc['Comida', 'Estado'] == 'En riesgo'
+    assert status.loc['Ocio', 'Estado'] == 'En curso'
+    assert status.loc['Viajes', 'Gastado'] == 0.0
+    assert list(status.index)[0] == 'Ropa'
+
+
+def test_budgets_round_trip(tmp_path):
+    path = str(tmp_path / 'budgets.json')
+    assert load_budgets(path) == {}
+    save_budgets(path, {'Comida': 400, 'Ocio': 0})
+    assert load_budgets(path) == {'Comida': 400.0}
@@ -0,0 +1,67 @@
+import json
+
+import pandas as pd
+
+from status_events import StatusEventLog
+
+ITEMS = {'Turno_Dentista': False, 'Proyecto_Web': 'No iniciado'}
+
+
+def _log(tmp_path):
+    return StatusEventLog(str(tmp_path / 'status_events.jsonl'), ITEMS)
+
+
+def test_only_changes_are_recorded(tmp_path):
+    log = _log(tmp_path)
+    assert log.states() == ITEMS
+    assert not log.set_state('Proyecto_Web', '2026-01-05', 'No iniciado')
+    assert log.set_state('Proyecto_Web', '2026-01-05', 'En progreso')
+    assert not log.set_state('Proyecto_Web', '2026-01-06', 'En progreso')
+    assert log.set_state('Proyecto_Web', '2026-01-20', 'Completado')
+    assert len(log.events()) == 2
+    assert log.current('Proyecto_Web') == 'Completado'
+    assert log.reached_on('Proyecto_Web', 'Completado') == '2026-01-20'
+    assert log.reached_on('Proyecto_Web', 'En progreso') is None
+
+
+def test_states_on_replays_events_for_many_days(tmp_path):
+    log = _log(tmp_path)
+    log.set_state('Turno_Dentista', '2026-01-03', True)
+    log.set_state('Proyecto_Web', '2026-01-02', 'En progreso')
+    # Dos cambios el mismo día: gana el registrado después
+    log.set_state('Proyecto_Web', '2026-01-04', 'Pausado')
+    log.set_state('Proyecto_Web', '2026-01-04', 'Completado')
+    table = log.states_on(pd.date_range('2026-01-01', '2026-01-05'))
+    assert list(table['Proyecto_Web']) == ['No iniciado', 'En progreso', 'En progreso', 'Completado', 'Completado']
+    assert list(table['Turno_Dentista']) == [False, False, True, True, True]
+
+
+def test_snapshot_is_rebuilt_when_events_change_on_disk(tmp_path):
+    log = _log(tmp_path)
+    log.set_state('Proyecto_Web', '2026-01-02', 'En progreso')
+    with open(log.snapshot_path, encoding='utf-8') as f:
+        assert json.load(f)['states']['Proyecto_Web']['Estado'] == 'En progreso'
+    # Otro proceso agrega un evento: la instantánea ya no corresponde al archivo
+    other = _log(tmp_path)
+    other.set_state('Proyecto_Web', '2026-01-09', 'Completado')
+    assert log.current('Proyecto_Web') == 'Completado'
+    assert _log(tmp_path).current('Proyecto_Web') == 'Completado'
+
+
+def test_torn_last_event_is_ignored(tmp_path):
+    log = _log(tmp_path)
+    log.set_state('Turno_Dentista', '2026-01-03', True)
+    with open(log.path, 'a', encoding='utf-8') as f:
+        f.write('{"Ítem": "Turno_Dentista", "Fe')
+    assert _log(tmp_path).current('Turno_Dentista') is True
+
+
+def test_daily_columns_become_change_events(tmp_path):
+    log = _log(tmp_path)
+    frame_df = pd.DataFrame(
+        {'Proyecto_Web': ['No iniciado', 'En progreso', 'En progreso', 'Completado'], 'Turno_Dentista': [False] * 4},
+        index=pd.date_range('2026-01-01', periods=4),
+    )
+    assert log.import_daily_columns(frame_df) == 2
+    history = log.history('Proyecto_Web')
+    assert list(zip(history['Fecha'], history['Estado'])) == [('2026-01-02', 'En progreso'), ('2026-01-04', 'Completado')]
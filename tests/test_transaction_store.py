@@ -0,0 +1,43 @@
+from datetime import date
+
+from transaction_store import SqliteTransactionStore
+
+
+def test_revision_bumps_across_connections(tmp_path):
+    path = str(tmp_path / 'transactions.db')
+    first = SqliteTransactionStore(path)
+    second = SqliteTransactionStore(path)
+    try:
+        assert first.revision() == second.revision() == 0
+        first.range_index()
+        second.range_index()
+
+        first.add(date(2026, 1, 5), 'Gasto', 'Comida', 10.0)
+        second.add(date(2026, 1, 6), 'Gasto', 'Comida', 100.0)
+        first.add_many([(date(2026, 1, 7), 'Gasto', 'Comida', 1.0, ''), (date(2026, 1, 8), 'Ingreso', 'Sueldo', 500.0, '')])
+
+        # Una revisión por lote, vista igual desde las dos conexiones
+        assert first.revision() == second.revision() == 3
+        # Los índices en memoria de cada conexión se ponen al día con lo que escribió la otra
+        for store in (first, second):
+            index = store.range_index()
+            assert index.total('Gasto:Comida', date(2026, 1, 1), date(2026, 2, 1)) == 111.0
+            assert index.total('Ingreso:Sueldo', date(2026, 1, 1), date(2026, 2, 1)) == 500.0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_range_index_persists_on_close(tmp_path):
+    path = str(tmp_path / 'transactions.db')
+    store = SqliteTransactionStore(path)
+    store.range_index()
+    store.add(date(2026, 3, 1), 'Gasto', 'Transporte', 42.0)
+    store.close()
+
+    reopened = SqliteTransactionStore(path)
+    try:
+        assert reopened.ranges.load(reopened.revision())
+        assert reopened.ranges.total('Gasto:Transporte', date(2026, 3, 1), date(2026, 3, 2)) == 42.0
+    finally:
+        reopened.close()
@@ -0,0 +1,314 @@
+import atexit
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from history_index import HISTORY_PAGE_SIZE, TransactionHistory
+from profiling import span
+from range_index import PrefixSums, finance_day_values
+
+
+# --- Almacenamiento de Transacciones Financieras ---
+TRANSACTION_COLUMNS = ['Fecha', 'Tipo', 'Categoría', 'Monto', 'Descripción']
+RANGES_SUFFIX = '.ranges.npz'
+
+
+def _iso(day):
+    return day.isoformat() if hasattr(day, 'isoformat') else str(day)
+
+
+class TransactionStore:
+    # Interfaz común para los backends de transacciones. Los rangos de fechas
+    # son semiabiertos: [start, end).
+    def add(self, fecha, tipo, categoria, monto, descripcion=''):
+        raise NotImplementedError
+
+    def close(self):
+        self.persist_ranges()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(*row)
+
+    def is_empty(self):
+        raise NotImplementedError
+
+    def all(self):
+        raise NotImplementedError
+
+    def range(self, start, end):
+        raise NotImplementedError
+
+    def totals_by_type(self, start, end):
+        raise NotImplementedError
+
+    def totals_by_category(self, start, end, tipo='Gasto'):
+        raise NotImplementedError
+
+    def totals_by_day(self, start, end, tipo='Gasto'):
+        raise NotImplementedError
+
+    def daily_totals(self):
+        # Un total por (Fecha, Tipo, Categoría) de todo el historial
+        raise NotImplementedError
+
+    def revision(self):
+        # Valor que cambia con cada escritura; valida el índice de rangos
+        raise NotImplementedError
+
+    # --- Índice de rangos ---
+    # Sumas acumuladas por día de cada tipo y categoría (ver range_index.py),
+    # persistidas junto a los datos. Las escrituras de este proceso las
+    # actualizan por deltas en memoria y el archivo se reescribe recién al
+    # cerrar (crece con el historial: no se reescribe en cada inserción); si
+    # escribió otro proceso se reconstruyen.
+    def _init_ranges(self, path):
+        self.ranges = PrefixSums(path)
+        self._ranges_revision = None
+        self._ranges_dirty = False
+        self._ranges_lock = threading.Lock()
+        atexit.register(self.persist_ranges)
+
+    def persist_ranges(self):
+        with self._ranges_lock:
+            if self._ranges_dirty:
+                self.ranges.save(self._ranges_revision)
+                self._ranges_dirty = False
+
+    def range_index(self):
+        revision = self.revision()
+        with self._ranges_lock:
+            if revision != self._ranges_revision:
+                if not self.ranges.load(revision):
+                    with span('rebuild_ranges'):
+                        self.ranges.rebuild(finance_day_values(self.daily_totals()))
+                    self.ranges.save(revision)
+                self._ranges_revision = revision
+                self._ranges_dirty = False
+            return self.ranges
+
+    def _index_rows(self, rows_df, before, after):
+        # Sólo si el índice estaba al día justo antes de esta escritura
+        with self._ranges_lock:
+            if self._ranges_revision is None or self._ranges_revision != before:
+                return
+            self.ranges.add_daily(finance_day_values(rows_df))
+            self._ranges_revision = after
+            self._ranges_dirty = True
+
+    def categories(self, tipo=None):
+        # Categorías con movimientos (de un tipo, si se indica), sin leer filas
+        prefix = f"{tipo}:" if tipo else ''
+        names = {name.split(':', 1)[1] for name in self.range_index().series if name.startswith(prefix)}
+        return sorted(names)
+
+    # --- Índice del historial ---
+    # Copia columnar en memoria de todas las filas (ver history_index.py)
+    # para paginar y filtrar el historial sin volver a consultar el backend.
+    # Se arma la primera vez que se pide y después se le agregan las filas
+    # que escribe este proceso; si escribió otro proceso se rearma.
+    def _init_history(self):
+        self._history = None
+        self._history_revision = None
+        self._history_lock = threading.Lock()
+
+    def _history_rows(self):
+        # Todas las filas con Fecha, Tipo, Categoría, Monto, Descripción (e
+        # 'id', si el backend lo tiene)
+        raise NotImplementedError
+
+    def history_index(self):
+        revision = self.revision()
+        with self._history_lock:
+            if self._history is None or revision != self._history_revision:
+                with span('rebuild_history'):
+                    history = TransactionHistory()
+                    history.append(self._history_rows())
+                self._history = history
+                self._history_revision = revision
+            return self._history
+
+    def history_page(self, filters, offset=0, limit=HISTORY_PAGE_SIZE):
+        # (DataFrame de la página, total de filas que pasan el filtro)
+        history = self.history_index()
+        with self._history_lock, span('history_page'):
+            return history.page(filters, offset, limit)
+
+    def _history_added(self, rows_df, before, after):
+        with self._history_lock:
+            if self._history is None or self._history_revision != before:
+                return
+            self._history.append(rows_df)
+            self._history_revision = after
+
+
+class SqliteTransactionStore(TransactionStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            categoria TEXT NOT NULL,
+            monto REAL NOT NULL,
+            descripcion TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS idx_transactions_fecha ON transactions (fecha);
+        CREATE INDEX IF NOT EXISTS idx_transactions_tipo_fecha ON transactions (tipo, fecha);
+        CREATE INDEX IF NOT EXISTS idx_transactions_categoria_fecha ON transactions (categoria, fecha);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # Streamlit atiende cada sesión en su propio hilo: una sola conexión
+        # compartida, serializada con un lock.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(self.SCHEMA)
+            self._conn.commit()
+        self._init_ranges(db_path + RANGES_SUFFIX)
+        self._init_history()
+
+    def close(self):
+        self.persist_ranges()
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql, params=()):
+        with span('sqlite_query', sql=sql[:60]), self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- Escritura ---
+    def add(self, fecha, tipo, categoria, monto, descripcion=''):
+        self.add_many([(fecha, tipo, categoria, monto, descripcion)])
+
+    def add_many(self, rows):
+        # Un solo commit por lote
+        params = [
+            (_iso(fecha), tipo, categoria, float(monto), descripcion or '')
+            for fecha, tipo, categoria, monto, descripcion in rows
+        ]
+        if not params:
+            return 0
+        with self._lock:
+            with self._conn:
+                # BEGIN IMMEDIATE toma el lock de escritura antes de leer la
+                # revisión: otro proceso que inserta a la vez espera y lee la
+                # revisión ya incrementada (si no, los dos escribirían la misma)
+                self._conn.execute('BEGIN IMMEDIATE')
+                before = self._revision()
+                (last_id,), = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM transactions').fetchall()
+                self._conn.executemany(
+                    'INSERT INTO transactions (fecha, tipo, categoria, monto, descripcion) VALUES (?, ?, ?, ?, ?)',
+                    params
+                )
+                after = before + 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('revision', ?)", (str(after),)
+                )
+                added = self._conn.execute(
+                    'SELECT id, fecha, tipo, categoria, monto, descripcion FROM transactions WHERE id > ? ORDER BY id',
+                    (last_id,)
+                ).fetchall()
+        added_df = pd.DataFrame(added, columns=['id'] + TRANSACTION_COLUMNS)
+        self._index_rows(added_df.drop(columns=['id', 'Descripción']), before, after)
+        self._history_added(added_df, before, after)
+        return len(params)
+
+    def _revision(self):
+        # Se llama con el lock tomado
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return int(row[0]) if row else 0
+
+    def revision(self):
+        with self._lock:
+            return self._revision()
+
+    # --- Lectura ---
+    def is_empty(self):
+        return not self._query('SELECT 1 FROM transactions LIMIT 1')
+
+    def _to_frame(self, rows):
+        df = pd.DataFrame(rows, columns=TRANSACTION_COLUMNS)
+        df['Fecha'] = pd.to_datetime(df['Fecha']).dt.date
+        return df
+
+    def all(self):
+        rows = self._query(
+            'SELECT fecha, tipo, categoria, monto, descripcion FROM transactions ORDER BY fecha DESC, id DESC'
+        )
+        return self._to_frame(rows)
+
+    def range(self, start, end):
+        rows = self._query(
+            'SELECT fecha, tipo, categoria, monto, descripcion FROM transactions '
+            'WHERE fecha >= ? AND fecha < ? ORDER BY fecha, id',
+            (_iso(start), _iso(end))
+        )
+        return self._to_frame(rows)
+
+    def totals_by_type(self, start, end):
+        totals = {'Ingreso': 0.0, 'Gasto': 0.0}
+        for tipo in totals:
+            (total,), = self._query(
+                'SELECT COALESCE(SUM(monto), 0) FROM transactions WHERE tipo = ? AND fecha >= ? AND fecha < ?',
+                (tipo, _iso(start), _iso(end))
+            )
+            totals[tipo] = total
+        return totals
+
+    def totals_by_category(self, start, end, tipo='Gasto'):
+        rows = self._query(
+            'SELECT categoria, SUM(monto) AS total FROM transactions '
+            'WHERE tipo = ? AND fecha >= ? AND fecha < ? GROUP BY categoria ORDER BY total DESC',
+            (tipo, _iso(start), _iso(end))
+        )
+        return pd.Series({categoria: total for categoria, total in rows}, name='Monto', dtype=float).rename_axis('Categoría')
+
+    def totals_by_day(self, start, end, tipo='Gasto'):
+        rows = self._query(
+            'SELECT fecha, SUM(monto) FROM transactions '
+            'WHERE tipo = ? AND fecha >= ? AND fecha < ? GROUP BY fecha ORDER BY fecha',
+            (tipo, _iso(start), _iso(end))
+        )
+        index = pd.to_datetime([fecha for fecha, _ in rows]).date
+        return pd.Series([total for _, total in rows], index=index, name='Monto', dtype=float).rename_axis('Fecha')
+
+    def daily_totals(self):
+        rows = self._query(
+            'SELECT fecha, tipo, categoria, SUM(monto) FROM transactions GROUP BY fecha, tipo, categoria'
+        )
+        return pd.DataFrame(rows, columns=['Fecha', 'Tipo', 'Categoría', 'Monto'])
+
+    def _history_rows(self):
+        rows = self._query('SELECT id, fecha, tipo, categoria, monto, descripcion FROM transactions')
+        return pd.DataFrame(rows, columns=['id'] + TRANSACTION_COLUMNS)
+
+    # --- Migración ---
+    def migrate_from_csv(self, csv_path):
+        # Importa una sola vez el CSV histórico; el archivo original no se toca
+        if self._query("SELECT 1 FROM meta WHERE key = 'csv_migrated'"):
+            return 0
+        imported = 0
+        if os.path.exists(csv_path):
+            legacy_df = pd.read_csv(csv_path)
+            if not legacy_df.empty:
+                legacy_df['Fecha'] = pd.to_datetime(legacy_df['Fecha'], errors='coerce').dt.date
+                legacy_df = legacy_df.dropna(subset=['Fecha', 'Monto'])
+                legacy_df['Descripción'] = legacy_df['Descripción'].fillna('').astype(str)
+                imported = self.add_many(legacy_df[TRANSACTION_COLUMNS].itertuples(index=False, name=None))
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_migrated', ?)",
+                    (str(imported),)
+                )
+        return imported